@@ -0,0 +1,329 @@
+import argparse
+import json
+import os
+import resource
+import subprocess
+import sys
+import tempfile
+import time
+from collections import defaultdict
+
+# Make the jobs_project package importable
+jobs_project_dir = os.path.abspath(os.path.join(os.path.dirname(__file__), '..', 'jobs_project'))
+sys.path.insert(0, jobs_project_dir)
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from generate_feed import generate_feeds
+
+# The stages of a benchmark, each run in its own process so that its peak RSS is its own
+# (and because the Twisted reactor cannot be restarted):
+#   parse:  JobSpider alone, reading and extracting the feeds
+#   ingest: JobSpider and JobsProjectPipeline, writing to the stores
+STAGES = ['parse', 'ingest']
+
+class LatencyRecorder:
+    """
+    Collects the duration of each call of the instrumented methods, together with the
+    number of items each call handled (1 for per-item calls, the batch size for flushes).
+    """
+    def __init__(self):
+        self.calls = defaultdict(list)
+
+    def timed(self, name, function, count=None):
+        """
+        Wraps the given function so that each call is recorded under the given name.
+
+        Args:
+            name (str): The name of the measured stage.
+            function (callable): The function to measure.
+            count (callable): Returns the number of items of a call from its positional arguments (default: 1).
+        """
+        calls = self.calls[name]
+
+        def wrapper(*args, **kwargs):
+            start = time.perf_counter()
+            try:
+                return function(*args, **kwargs)
+            finally:
+                calls.append((time.perf_counter() - start, count(args) if count else 1))
+        return wrapper
+
+    def summary(self):
+        """
+        Summarizes the recorded calls of each stage: items, total seconds, items per second and
+        the p50/p99 per-item latency (the call duration divided by its items for batch calls).
+        """
+        summary = {}
+        for name, calls in self.calls.items():
+            if not calls:
+                continue
+            items = sum(count for _, count in calls)
+            seconds = sum(duration for duration, _ in calls)
+            latencies = sorted(duration / count for duration, count in calls if count)
+            summary[name] = {
+                'calls': len(calls),
+                'items': items,
+                'seconds': seconds,
+                'items_per_second': items / seconds if seconds else None,
+                'p50_us': percentile(latencies, 50) * 1e6,
+                'p99_us': percentile(latencies, 99) * 1e6,
+            }
+        return summary
+
+def percentile(values, percent):
+    """
+    Returns the given percentile of the sorted values (nearest rank), 0 if there are none.
+    """
+    if not values:
+        return 0.0
+    rank = max(0, min(len(values) - 1, int(round(percent / 100 * len(values))) - 1))
+    return values[rank]
+
+def install_stand_ins(redis_backend, mongo_backend, postgres_backend):
+    """
+    Replaces the database clients used by the infra connectors with in-process stand-ins:
+    fakeredis for Redis, mongomock for MongoDB and a null PostgreSQL connection that only adapts
+    (quotes) the values it is sent. 'local' keeps the real clients, connected through the usual
+    environment variables (e.g. to a local redis-server, mongod or postgres).
+    """
+    if redis_backend == 'fake':
+        import fakeredis
+        import redis
+        server = fakeredis.FakeServer()
+        redis.StrictRedis = redis.Redis = lambda *args, **kwargs: fakeredis.FakeStrictRedis(server=server)
+
+    if mongo_backend == 'fake':
+        import mongomock
+        import pymongo
+        client = mongomock.MongoClient()
+        # The connectors read the port before creating the client
+        os.environ.setdefault('MONGO_PORT', '27017')
+        pymongo.MongoClient = lambda *args, **kwargs: client
+
+    if postgres_backend == 'null':
+        import psycopg2
+        import infra.postgresql_connector
+        psycopg2.connect = lambda *args, **kwargs: NullConnection()
+        infra.postgresql_connector.execute_values = null_execute_values
+
+def quote_values(values):
+    """
+    Adapts the values the way psycopg2 does before sending them, so that the client-side
+    cost of a write is measured even though nothing is sent.
+    """
+    from psycopg2.extensions import adapt
+    quoted = []
+    for value in values:
+        adapted = adapt(value)
+        if hasattr(adapted, 'encoding'):
+            adapted.encoding = 'utf8'
+        quoted.append(adapted.getquoted())
+    return b','.join(quoted)
+
+def null_execute_values(cursor, query, rows, template=None, page_size=100, fetch=False):
+    for values in rows:
+        quote_values(values)
+    cursor.rowcount = len(rows)
+    return [] if fetch else None
+
+class NullCursor:
+    description = None
+    rowcount = -1
+
+    def execute(self, query, params=None):
+        if params:
+            quote_values(params)
+
+    def fetchall(self):
+        return []
+
+    def fetchmany(self, size=None):
+        return []
+
+    def close(self):
+        pass
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+class NullConnection:
+    closed = 0
+    autocommit = False
+
+    class info:
+        transaction_status = 0
+
+    def cursor(self, *args, **kwargs):
+        return NullCursor()
+
+    def commit(self):
+        pass
+
+    def rollback(self):
+        pass
+
+    def reset(self):
+        pass
+
+    def close(self):
+        self.closed = 1
+
+def peak_rss_mb():
+    """
+    Returns the peak resident set size of this process in MB (ru_maxrss is in KB on Linux, bytes on macOS).
+    """
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak / (1024 * 1024) if sys.platform == 'darwin' else peak / 1024
+
+def run_stage(stage, feeds, overrides, redis_backend, mongo_backend, postgres_backend):
+    """
+    Crawls the feeds in this process and returns the measurements of the stage.
+    """
+    os.environ.setdefault('SCRAPY_SETTINGS_MODULE', 'jobs_project.settings')
+    from scrapy.crawler import CrawlerProcess
+    from scrapy.utils.project import get_project_settings
+    from jobs_project.pipelines import JobsProjectPipeline
+    from jobs_project.spiders.json_spider import JobSpider
+
+    install_stand_ins(redis_backend, mongo_backend, postgres_backend)
+    recorder = LatencyRecorder()
+
+    def batch_size(args):
+        # The batch of a flush is the argument following self
+        return len(args[1])
+
+    class BenchmarkSpider(JobSpider):
+        build_item = recorder.timed('extract', JobSpider.build_item)
+
+    class BenchmarkPipeline(JobsProjectPipeline):
+        process_item = recorder.timed('pipeline', JobsProjectPipeline.process_item)
+        prepare_record = recorder.timed('prepare', JobsProjectPipeline.prepare_record)
+        claim_records = recorder.timed('dedup', JobsProjectPipeline.claim_records, count=batch_size)
+        flush_postgres = recorder.timed('postgres', JobsProjectPipeline.flush_postgres, count=batch_size)
+        flush_mongo = recorder.timed('mongo', JobsProjectPipeline.flush_mongo, count=batch_size)
+        flush_jsonl = recorder.timed('jsonl', JobsProjectPipeline.flush_jsonl, count=batch_size)
+
+    settings = get_project_settings()
+    settings.set('LOG_LEVEL', 'WARNING', priority='cmdline')
+    settings.set('ITEM_PIPELINES', {BenchmarkPipeline: 300} if stage == 'ingest' else {}, priority='cmdline')
+    # Keep the spilled batches of a stalled store out of the working directory
+    settings.set('WRITE_SPILL_DIR', tempfile.mkdtemp(prefix='bench-spill-'))
+    # And the JSON Lines file of the jsonl sink (JOB_SINKS)
+    settings.set('JSONL_SINK_PATH', os.path.join(tempfile.mkdtemp(prefix='bench-jsonl-'), '{spider}-{shard}.jsonl.gz'))
+    for name, value in overrides.items():
+        settings.set(name, value, priority='cmdline')
+
+    process = CrawlerProcess(settings)
+    crawler = process.create_crawler(BenchmarkSpider)
+    process.crawl(crawler, input=','.join(feeds))
+    start = time.perf_counter()
+    process.start()
+    elapsed = time.perf_counter() - start
+
+    stats = crawler.stats.get_stats()
+    items = stats.get('item_scraped_count', 0) + stats.get('item_dropped_count', 0)
+    return {
+        'stage': stage,
+        'items': items,
+        'seconds': elapsed,
+        'items_per_second': items / elapsed if elapsed else None,
+        'peak_rss_mb': peak_rss_mb(),
+        'stages': recorder.summary(),
+    }
+
+def run_stage_process(stage, feeds, args):
+    """
+    Runs a stage in a child process and returns its measurements.
+    """
+    command = [
+        sys.executable, os.path.abspath(__file__), '--run-stage', stage, '--feeds', ','.join(feeds),
+        '--redis', args.redis, '--mongo', args.mongo, '--postgres', args.postgres,
+    ]
+    for setting in args.set:
+        command += ['-s', setting]
+    result = subprocess.run(command, stdout=subprocess.PIPE, check=True)
+    # The measurements are the last line of the output, after anything printed during the crawl
+    return json.loads(result.stdout.decode().strip().splitlines()[-1])
+
+def print_report(results):
+    """
+    Prints the throughput and peak RSS of each stage, followed by the per-item latencies
+    of the parts of the stage.
+    """
+    print(f"{'stage':10} {'items':>10} {'seconds':>9} {'items/s':>10} {'peak RSS MB':>12}")
+    for result in results:
+        print(
+            f"{result['stage']:10} {result['items']:>10} {result['seconds']:>9.2f} "
+            f"{result['items_per_second'] or 0:>10.0f} {result['peak_rss_mb']:>12.1f}"
+        )
+    print()
+    print(f"{'stage':10} {'part':10} {'calls':>8} {'items':>10} {'items/s':>10} {'p50 us':>9} {'p99 us':>9}")
+    for result in results:
+        for name, part in result['stages'].items():
+            print(
+                f"{result['stage']:10} {name:10} {part['calls']:>8} {part['items']:>10} "
+                f"{part['items_per_second'] or 0:>10.0f} {part['p50_us']:>9.1f} {part['p99_us']:>9.1f}"
+            )
+
+def parse_overrides(settings):
+    """
+    Parses NAME=VALUE setting overrides, decoding JSON values (numbers, booleans, dicts).
+    """
+    overrides = {}
+    for setting in settings:
+        name, _, value = setting.partition('=')
+        try:
+            overrides[name] = json.loads(value)
+        except ValueError:
+            overrides[name] = value
+    return overrides
+
+def main():
+    arg_parser = argparse.ArgumentParser(
+        description='Measures the ingest throughput of JobSpider and JobsProjectPipeline on synthetic feeds.'
+    )
+    arg_parser.add_argument('--jobs', type=int, default=100000, help='Number of synthetic jobs generated')
+    arg_parser.add_argument('--files', type=int, default=2, help='Number of synthetic feed files')
+    arg_parser.add_argument('--duplicate-rate', type=float, default=0.1,
+                            help='Share of the synthetic jobs repeating an earlier req_id')
+    arg_parser.add_argument('--feeds', default='',
+                            help='Comma-separated feed files to crawl instead of generating synthetic ones')
+    arg_parser.add_argument('--stages', default=','.join(STAGES),
+                            help=f'Comma-separated stages to run ({", ".join(STAGES)})')
+    arg_parser.add_argument('--redis', choices=['fake', 'local'], default='fake',
+                            help='fakeredis, or the Redis server of the environment variables')
+    arg_parser.add_argument('--mongo', choices=['fake', 'local'], default='fake',
+                            help='mongomock, or the MongoDB server of the environment variables')
+    arg_parser.add_argument('--postgres', choices=['null', 'local'], default='null',
+                            help='A null connection that only adapts the values, or the PostgreSQL server '
+                                 'of the environment variables')
+    arg_parser.add_argument('-s', '--set', action='append', default=[], metavar='NAME=VALUE',
+                            help='Scrapy setting override, may be repeated')
+    arg_parser.add_argument('--json', help='Also write the measurements to this JSON file')
+    arg_parser.add_argument('--run-stage', choices=STAGES, help=argparse.SUPPRESS)
+    args = arg_parser.parse_args()
+
+    if args.run_stage:
+        result = run_stage(
+            args.run_stage, args.feeds.split(','), parse_overrides(args.set), args.redis, args.mongo, args.postgres
+        )
+        print(json.dumps(result))
+        return
+
+    with tempfile.TemporaryDirectory() as feeds_dir:
+        if args.feeds:
+            feeds = args.feeds.split(',')
+        else:
+            feeds = generate_feeds(feeds_dir, args.jobs, args.files, args.duplicate_rate)
+        results = [run_stage_process(stage, feeds, args) for stage in args.stages.split(',')]
+
+    print_report(results)
+    if args.json:
+        with open(args.json, 'w') as f:
+            json.dump(results, f, indent=2)
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,76 @@
+import argparse
+import os
+import sys
+import timeit
+import ijson
+from dateutil import parser
+
+# Make the jobs_project package importable
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..', 'jobs_project')))
+
+from jobs_project.timestamps import parse_timestamp
+
+def load_samples(paths, limit):
+    """
+    Collects the update_date and create_date strings of the jobs in the given feed files.
+    """
+    samples = []
+    for path in paths:
+        with open(path, 'rb') as f:
+            for job in ijson.items(f, 'jobs.item'):
+                job_data = job.get('data', {})
+                for field in ('update_date', 'create_date'):
+                    if job_data.get(field):
+                        samples.append(job_data[field])
+                if len(samples) >= limit:
+                    return samples[:limit]
+    return samples
+
+def main():
+    arg_parser = argparse.ArgumentParser(
+        description='Compares dateutil with the fast-path timestamp parsing on the timestamps of real feeds.'
+    )
+    arg_parser.add_argument('feeds', nargs='+', help='Paths of the s01/s02-shaped JSON feed files')
+    arg_parser.add_argument('--limit', type=int, default=100000, help='Maximum number of timestamps sampled')
+    arg_parser.add_argument('--repeat', type=int, default=5, help='Number of timed runs, the best one is reported')
+    args = arg_parser.parse_args()
+
+    samples = load_samples(args.feeds, args.limit)
+    if not samples:
+        sys.exit('No timestamps found in the given feeds')
+    print(f'{len(samples)} timestamps, {len(set(samples))} distinct')
+
+    # Both parsers must agree on every sample
+    mismatches = [value for value in samples if parse_timestamp(value) != parser.parse(value)]
+    if mismatches:
+        sys.exit(f'{len(mismatches)} timestamps parsed differently, e.g. {mismatches[0]!r}')
+
+    def run_dateutil():
+        for value in samples:
+            parser.parse(value)
+
+    def run_fast_uncached():
+        for value in samples:
+            parse_timestamp.__wrapped__(value)
+
+    def run_fast_cached():
+        parse_timestamp.cache_clear()
+        for value in samples:
+            parse_timestamp(value)
+
+    results = {}
+    for name, function in (
+        ('dateutil.parser.parse', run_dateutil),
+        ('fast path (no cache)', run_fast_uncached),
+        ('fast path (memoized)', run_fast_cached),
+    ):
+        best = min(timeit.repeat(function, number=1, repeat=args.repeat))
+        results[name] = best
+        print(f'{name:24} {best * 1e6 / len(samples):8.3f} us/timestamp')
+
+    baseline = results['dateutil.parser.parse']
+    for name, best in results.items():
+        print(f'{name:24} {baseline / best:8.1f}x')
+
+if __name__ == '__main__':
+    main()
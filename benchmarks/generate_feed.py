@@ -0,0 +1,160 @@
+import argparse
+import json
+import os
+import random
+import sys
+from datetime import datetime, timedelta, timezone
+
+# Make the jobs_project package importable
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..', 'jobs_project')))
+
+from jobs_project.items import JobsProjectItem
+
+CITIES = [
+    ('Austin', 'TX', 'US', '73301', 30.2672, -97.7431),
+    ('Seattle', 'WA', 'US', '98101', 47.6062, -122.3321),
+    ('New York', 'NY', 'US', '10001', 40.7128, -74.0060),
+    ('Toronto', 'ON', 'CA', 'M5H', 43.6532, -79.3832),
+    ('London', '', 'GB', 'EC1A', 51.5074, -0.1278),
+    ('Berlin', '', 'DE', '10115', 52.5200, 13.4050),
+    ('Istanbul', '', 'TR', '34000', 41.0082, 28.9784),
+]
+TITLES = ['Software Engineer', 'Data Analyst', 'Registered Nurse', 'Sales Associate', 'Store Manager',
+          'Warehouse Associate', 'Product Designer', 'Customer Service Representative', 'Accountant']
+CATEGORIES = ['Engineering', 'Healthcare', 'Retail', 'Finance', 'Logistics', 'Customer Service', 'Design']
+TAGS = ['python', 'sql', 'full-time', 'part-time', 'remote', 'entry-level', 'senior', 'benefits', 'weekend']
+WORDS = ('responsible team customer support develop manage projects experience required skills '
+         'communication growth opportunity benefits schedule flexible training environment').split()
+EPOCH = datetime(2024, 1, 1, tzinfo=timezone.utc)
+
+def format_timestamp(value, millis=False):
+    """
+    Formats a timestamp the way the feeds do, alternating between their two ISO-8601 variants.
+    """
+    if millis:
+        return value.strftime('%Y-%m-%dT%H:%M:%S.') + f'{value.microsecond // 1000:03d}Z'
+    return value.strftime('%Y-%m-%dT%H:%M:%S%z')
+
+def generate_job(index, rng, description_words):
+    """
+    Builds the 'data' object of one synthetic job, with every field of JobsProjectItem
+    except the content hash computed by the pipeline.
+
+    Args:
+        index (int): The index of the job, used to derive its slug and req_id.
+        rng (random.Random): The random number generator.
+        description_words (int): The approximate number of words of the description.
+
+    Returns:
+        dict: The job data.
+    """
+    city, state, country_code, postal_code, latitude, longitude = rng.choice(CITIES)
+    title = rng.choice(TITLES)
+    category = rng.choice(CATEGORIES)
+    created = EPOCH + timedelta(seconds=rng.randrange(365 * 24 * 3600))
+    updated = created + timedelta(seconds=rng.randrange(30 * 24 * 3600))
+    salary_min = rng.randrange(20, 120) * 1000
+    paragraphs = [
+        ' '.join(rng.choice(WORDS) for _ in range(50)) for _ in range(max(1, description_words // 50))
+    ]
+    return {
+        'slug': f'{title.lower().replace(" ", "-")}-{index}',
+        'language': 'en',
+        'languages': ['en'],
+        'req_id': f'R{index}',
+        'title': title,
+        'description': ''.join(f'<p>{paragraph}</p>' for paragraph in paragraphs),
+        'street_address': f'{rng.randrange(1, 9999)} Main St',
+        'city': city,
+        'state': state,
+        'country_code': country_code,
+        'postal_code': postal_code,
+        'location_type': rng.choice(['ONSITE', 'REMOTE', 'HYBRID']),
+        'latitude': latitude + rng.uniform(-0.2, 0.2),
+        'longitude': longitude + rng.uniform(-0.2, 0.2),
+        'categories': [{'name': category}],
+        'tags': rng.sample(TAGS, 3),
+        'tags5': rng.sample(TAGS, 1),
+        'tags6': [],
+        'brand': rng.choice(['Acme', 'Globex', 'Initech', 'Umbrella']),
+        'promotion_value': rng.randrange(0, 5),
+        'salary_currency': 'CAD' if country_code == 'CA' else 'USD',
+        'salary_value': str(salary_min + 10000),
+        'salary_min_value': salary_min,
+        'salary_max_value': salary_min + 20000,
+        'benefits': rng.sample(['401k', 'dental', 'vision', 'pto'], 2),
+        'employment_type': rng.choice(['FULL_TIME', 'PART_TIME', 'CONTRACTOR']),
+        'hiring_organization': rng.choice(['Acme Corp', 'Globex Inc', 'Initech LLC']),
+        'source': 'ats',
+        'apply_url': f'https://jobs.example.com/apply/{index}',
+        'internal': rng.random() < 0.1,
+        'searchable': True,
+        'applyable': True,
+        'li_easy_applyable': rng.random() < 0.3,
+        'ats_code': rng.choice(['icims', 'workday', 'taleo']),
+        'meta_data': {'googlejobs': {'derived_info': {'job_categories': [category]}}},
+        'update_date': format_timestamp(updated),
+        'create_date': format_timestamp(created, millis=True),
+        'category': [category],
+        'full_location': f'{city}, {state or country_code}',
+        'short_location': city,
+    }
+
+# The generator must produce every field the spider extracts
+_missing = set(JobsProjectItem.fields) - {'content_hash'} - set(generate_job(0, random.Random(0), 50))
+assert not _missing, f'generate_job is missing the fields {sorted(_missing)}'
+
+def write_feed(path, indexes, rng, description_words):
+    """
+    Writes one s01/s02-shaped feed file ({"jobs": [{"data": {...}}, ...]}), one job at a time.
+    """
+    with open(path, 'w') as f:
+        f.write('{"jobs": [')
+        for position, index in enumerate(indexes):
+            if position:
+                f.write(',\n')
+            json.dump({'data': generate_job(index, rng, description_words)}, f)
+        f.write(']}\n')
+
+def generate_feeds(output_dir, jobs, files=2, duplicate_rate=0.1, description_words=200, seed=0):
+    """
+    Generates synthetic feed files, splitting the jobs evenly between them. A share of the jobs
+    repeats the req_id of an earlier job, so that the duplicate detection has work to do.
+
+    Returns:
+        list: The paths of the generated feed files.
+    """
+    rng = random.Random(seed)
+    os.makedirs(output_dir, exist_ok=True)
+    indexes = [
+        rng.randrange(index) if index and rng.random() < duplicate_rate else index
+        for index in range(jobs)
+    ]
+    paths = []
+    per_file = -(-jobs // files)
+    for number in range(files):
+        path = os.path.join(output_dir, f's{number + 1:02d}.json')
+        write_feed(path, indexes[number * per_file:(number + 1) * per_file], rng, description_words)
+        paths.append(path)
+    return paths
+
+def main():
+    arg_parser = argparse.ArgumentParser(description='Generates synthetic s01/s02-shaped job feeds.')
+    arg_parser.add_argument('output_dir', help='Directory the feed files are written to')
+    arg_parser.add_argument('--jobs', type=int, default=100000, help='Total number of jobs')
+    arg_parser.add_argument('--files', type=int, default=2, help='Number of feed files')
+    arg_parser.add_argument('--duplicate-rate', type=float, default=0.1,
+                            help='Share of the jobs repeating the req_id of an earlier job')
+    arg_parser.add_argument('--description-words', type=int, default=200,
+                            help='Approximate number of words of each description')
+    arg_parser.add_argument('--seed', type=int, default=0, help='Seed of the random number generator')
+    args = arg_parser.parse_args()
+
+    paths = generate_feeds(
+        args.output_dir, args.jobs, args.files, args.duplicate_rate, args.description_words, args.seed
+    )
+    for path in paths:
+        print(f'{path}: {os.path.getsize(path) / 1e6:.1f} MB')
+
+if __name__ == '__main__':
+    main()
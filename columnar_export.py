@@ -0,0 +1,216 @@
+import json
+import pyarrow as pa
+import pyarrow.dataset as ds
+import pyarrow.parquet as pq
+from infra.description_store import load_codec, restore_descriptions, restore_document_descriptions
+from infra.postgresql_connector import export_jobs_query
+
+# Typed columns of the exported jobs, list and dictionary fields are exported as JSON strings
+JOB_FIELDS = [
+    ('slug', pa.string()),
+    ('language', pa.string()),
+    ('languages', pa.string()),
+    ('req_id', pa.string()),
+    ('title', pa.string()),
+    ('description', pa.string()),
+    ('street_address', pa.string()),
+    ('city', pa.string()),
+    ('state', pa.string()),
+    ('country_code', pa.string()),
+    ('postal_code', pa.string()),
+    ('location_type', pa.string()),
+    ('latitude', pa.float64()),
+    ('longitude', pa.float64()),
+    ('categories', pa.string()),
+    ('tags', pa.string()),
+    ('tags5', pa.string()),
+    ('tags6', pa.string()),
+    ('brand', pa.string()),
+    ('promotion_value', pa.string()),
+    ('salary_currency', pa.string()),
+    ('salary_value', pa.float64()),
+    ('salary_min_value', pa.float64()),
+    ('salary_max_value', pa.float64()),
+    ('benefits', pa.string()),
+    ('employment_type', pa.string()),
+    ('hiring_organization', pa.string()),
+    ('source', pa.string()),
+    ('apply_url', pa.string()),
+    ('internal', pa.bool_()),
+    ('searchable', pa.bool_()),
+    ('applyable', pa.bool_()),
+    ('li_easy_applyable', pa.bool_()),
+    ('ats_code', pa.string()),
+    ('meta_data', pa.string()),
+    ('update_date', pa.timestamp('us', tz='UTC')),
+    ('create_date', pa.timestamp('us', tz='UTC')),
+    ('category', pa.string()),
+    ('full_location', pa.string()),
+    ('short_location', pa.string()),
+    ('content_hash', pa.string()),
+]
+
+POSTGRES_SCHEMA = pa.schema([('id', pa.int64())] + JOB_FIELDS)
+MONGO_SCHEMA = pa.schema([('_id', pa.string())] + JOB_FIELDS)
+
+# Columns that can be derived from the exported ones to partition the files by
+DERIVED_PARTITIONS = {
+    'create_month': lambda batch: pa.array(
+        [value.strftime('%Y-%m') if value is not None else None for value in batch.column('create_date').to_pylist()],
+        type=pa.string()
+    ),
+}
+
+def postgres_select_query():
+    """
+    Builds the SELECT query of the exported columns, casting NUMERIC columns to floating point,
+    followed by the compressed descriptions (see export_jobs_query).
+
+    Returns:
+        str: The query.
+    """
+    columns = []
+    for field in POSTGRES_SCHEMA:
+        if pa.types.is_floating(field.type):
+            columns.append(f'raw_table.{field.name}::DOUBLE PRECISION AS {field.name}')
+        else:
+            columns.append(f'raw_table.{field.name}')
+    return export_jobs_query(columns)
+
+def convert_value(value, field_type):
+    """
+    Converts a database value to the Python value of the Arrow column type.
+    """
+    if value is None:
+        return None
+    if pa.types.is_string(field_type) and not isinstance(value, str):
+        if isinstance(value, (dict, list)):
+            return json.dumps(value, default=str)
+        return str(value)
+    if pa.types.is_floating(field_type) and not isinstance(value, float):
+        return float(value)
+    return value
+
+def to_record_batch(records, schema):
+    """
+    Builds a typed Arrow record batch from a batch of records.
+
+    Args:
+        records (list): The records, as dictionaries keyed by column name.
+        schema (pyarrow.Schema): The schema of the record batch, fields missing from a record are null.
+
+    Returns:
+        pyarrow.RecordBatch: The record batch.
+    """
+    arrays = [
+        pa.array([convert_value(record.get(field.name), field.type) for record in records], type=field.type)
+        for field in schema
+    ]
+    return pa.RecordBatch.from_arrays(arrays, schema=schema)
+
+def add_partition_columns(batch, partition_by):
+    """
+    Appends the derived partition columns (e.g. create_month) to the record batch.
+    """
+    for name in partition_by:
+        if name in DERIVED_PARTITIONS and name not in batch.schema.names:
+            batch = batch.append_column(name, DERIVED_PARTITIONS[name](batch))
+    return batch
+
+def write_columnar(batches, schema, path, file_format='parquet', compression='zstd', partition_by=None):
+    """
+    Writes record batches to a Parquet or Arrow IPC (Feather) file, or to a partitioned dataset directory.
+
+    The batches are consumed one at a time, so that only one batch is held in memory.
+
+    Args:
+        batches (iterable): The record batches to write.
+        schema (pyarrow.Schema): The schema of the record batches.
+        path (str): The path of the file, or of the dataset directory when partitioning.
+        file_format (str): 'parquet' or 'feather'.
+        compression (str): The compression codec (e.g. 'zstd', 'snappy', 'lz4', or 'none').
+        partition_by (list): The columns to partition the dataset by (hive-style directories).
+
+    Returns:
+        int: The number of written rows.
+    """
+    compression = None if compression == 'none' else compression
+    written = 0
+
+    def counted(batches):
+        nonlocal written
+        for batch in batches:
+            written += batch.num_rows
+            yield batch
+
+    if partition_by:
+        for name in partition_by:
+            if name in DERIVED_PARTITIONS:
+                schema = schema.append(pa.field(name, pa.string()))
+            elif name not in schema.names:
+                raise ValueError(f"Unknown partition column: {name}")
+        if file_format == 'parquet':
+            file_options = ds.ParquetFileFormat().make_write_options(compression=compression)
+        else:
+            file_options = ds.IpcFileFormat().make_write_options(compression=compression)
+        ds.write_dataset(
+            counted(add_partition_columns(batch, partition_by) for batch in batches),
+            path,
+            schema=schema,
+            format='parquet' if file_format == 'parquet' else 'ipc',
+            partitioning=ds.partitioning(pa.schema([schema.field(name) for name in partition_by]), flavor='hive'),
+            file_options=file_options,
+            existing_data_behavior='delete_matching'
+        )
+        return written
+
+    if file_format == 'parquet':
+        with pq.ParquetWriter(path, schema, compression=compression or 'none') as writer:
+            for batch in counted(batches):
+                writer.write_batch(batch)
+    else:
+        options = pa.ipc.IpcWriteOptions(compression=compression)
+        with pa.OSFile(path, 'wb') as sink, pa.ipc.new_file(sink, schema, options=options) as writer:
+            for batch in counted(batches):
+                writer.write_batch(batch)
+    return written
+
+def export_postgres_columnar(pg_conn, path, batch_size, file_format='parquet', compression='zstd', partition_by=None):
+    """
+    Streams 'raw_table' from a server-side cursor to a columnar file in typed record batches.
+
+    Returns:
+        int: The number of exported rows.
+    """
+    codec = load_codec(pg_conn.description_dictionaries())
+    description_index = POSTGRES_SCHEMA.names.index('description')
+
+    def batches():
+        for columns, rows in pg_conn.stream_query(postgres_select_query(), batch_size=batch_size):
+            rows = restore_descriptions(rows, description_index, codec)
+            yield to_record_batch([dict(zip(columns, row)) for row in rows], POSTGRES_SCHEMA)
+
+    return write_columnar(batches(), POSTGRES_SCHEMA, path, file_format, compression, partition_by)
+
+def export_mongo_columnar(mongo_conn, path, batch_size, file_format='parquet', compression='zstd', partition_by=None):
+    """
+    Streams 'raw_collection' from a batched cursor to a columnar file in typed record batches.
+
+    Returns:
+        int: The number of exported documents.
+    """
+    codec = load_codec(mongo_conn.description_dictionaries())
+
+    def batches():
+        for documents in mongo_conn.iter_data(batch_size=batch_size, projection={'location': False}):
+            restore_document_descriptions(documents, mongo_conn.get_descriptions, codec)
+            yield to_record_batch(documents, MONGO_SCHEMA)
+
+    return write_columnar(batches(), MONGO_SCHEMA, path, file_format, compression, partition_by)
+
+def output_path(name, file_format, partition_by):
+    """
+    Returns the output path of an export: a file, or a directory when partitioning.
+    """
+    extension = 'parquet' if file_format == 'parquet' else 'arrow'
+    return f'{name}_{extension}' if partition_by else f'{name}.{extension}'
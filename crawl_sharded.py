@@ -0,0 +1,86 @@
+import argparse
+import glob
+import os
+import subprocess
+import sys
+
+# Directory containing scrapy.cfg, the crawler processes are started from there
+project_dir = os.path.abspath(os.path.join(os.path.dirname(__file__), 'jobs_project'))
+sys.path.insert(0, project_dir)
+
+from scrapy.settings import Settings
+from jobs_project.pipelines import setup_crawl_stores
+
+def count_input_files(input_patterns):
+    """
+    Counts the input files matched by the comma-separated glob patterns or directories,
+    resolved the same way as JobSpider.get_input_files.
+    """
+    files = set()
+    for pattern in input_patterns.split(','):
+        pattern = pattern.strip()
+        if os.path.isdir(pattern):
+            pattern = os.path.join(pattern, '*.json')
+        files.update(os.path.abspath(path) for path in glob.glob(pattern) if os.path.isfile(path))
+    return len(files)
+
+def crawl_settings(overrides):
+    """
+    Returns the settings of the crawler processes: those of settings.py with the NAME=VALUE overrides
+    passed with -s, applied the way Scrapy applies them.
+    """
+    settings = Settings()
+    settings.setmodule('jobs_project.settings', priority='project')
+    settings.setdict(dict(override.split('=', 1) for override in overrides), priority='cmdline')
+    return settings
+
+def main():
+    arg_parser = argparse.ArgumentParser(
+        description='Starts one Scrapy crawler process per core, each crawling its own shard of the input files.'
+    )
+    arg_parser.add_argument('--input', required=True,
+                            help='Comma-separated glob patterns or directories of the JSON files to crawl')
+    arg_parser.add_argument('--processes', type=int, default=os.cpu_count() or 1,
+                            help='Number of crawler processes (default: number of cores)')
+    arg_parser.add_argument('-s', '--set', action='append', default=[], metavar='NAME=VALUE',
+                            help='Scrapy setting passed to every crawler process')
+    args = arg_parser.parse_args()
+
+    # Absolute paths, since the crawlers run from the Scrapy project directory
+    input_patterns = ','.join(os.path.abspath(pattern.strip()) for pattern in args.input.split(','))
+
+    # There is no point in starting more processes than there are files to shard
+    shard_count = max(1, min(args.processes, count_input_files(input_patterns)))
+    print(f'Starting {shard_count} crawler processes')
+    settings = crawl_settings(args.set)
+    # The processes would all create the tables and indexes and migrate the dedup keys at once,
+    # which concurrent schema changes do not survive, so it is done once before starting them
+    if settings.getbool('STORE_SETUP', True):
+        print('Setting up the stores')
+        setup_crawl_stores(settings)
+    # Each process serves its metrics (with METRICS_ENABLED) on its own port, from METRICS_PORT on
+    base_port = settings.getint('METRICS_PORT', 6080)
+
+    processes = []
+    for shard_index in range(shard_count):
+        command = [
+            sys.executable, '-m', 'scrapy', 'crawl', 'job_spider',
+            '-a', f'input={input_patterns}',
+            '-a', f'shard_index={shard_index}',
+            '-a', f'shard_count={shard_count}',
+            # Each process would only see its own claims in an in-process Bloom filter
+            '-s', 'BLOOM_FILTER_ENABLED=False',
+        ]
+        for setting in args.set:
+            command.extend(['-s', setting])
+        command.extend(['-s', f'METRICS_PORT={base_port + shard_index}', '-s', 'STORE_SETUP=False'])
+        processes.append(subprocess.Popen(command, cwd=project_dir))
+
+    failed = [shard_index for shard_index, process in enumerate(processes) if process.wait() != 0]
+    if failed:
+        print(f'Crawler processes of shards {failed} failed')
+        sys.exit(1)
+    print('All crawler processes finished')
+
+if __name__ == '__main__':
+    main()
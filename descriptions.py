@@ -0,0 +1,72 @@
+import sys
+import os
+import argparse
+
+# Add the project root directory to the Python path (since I can not use __init__.py in the infra directory)
+project_root = os.path.abspath(os.path.dirname(__file__))
+sys.path.insert(0, project_root)
+
+from infra.postgresql_connector import PostgreSQLConnector
+from infra.description_store import DescriptionCodec, load_codec, train_dictionary
+
+def sample_descriptions(pg_conn, sample_size):
+    """
+    Samples the stored descriptions, inline or compressed.
+
+    Returns:
+        list: The descriptions.
+    """
+    rows = pg_conn.execute_query(
+        'SELECT description FROM raw_table WHERE description IS NOT NULL ORDER BY random() LIMIT %s',
+        (sample_size,)
+    )
+    descriptions = [row[0] for row in rows]
+    if len(descriptions) < sample_size:
+        codec = load_codec(pg_conn.description_dictionaries())
+        rows = pg_conn.execute_query(
+            'SELECT dictionary_id, body FROM job_descriptions ORDER BY random() LIMIT %s',
+            (sample_size - len(descriptions),)
+        )
+        descriptions += [codec.decompress(dictionary_id, body) for dictionary_id, body in rows]
+    return descriptions
+
+def main():
+    arg_parser = argparse.ArgumentParser(
+        description='Trains the preset dictionary of the compressed descriptions (DESCRIPTION_DICTIONARY_PATH) '
+                    'on a sample of the descriptions stored in PostgreSQL.'
+    )
+    arg_parser.add_argument('output', help='The dictionary file to write')
+    arg_parser.add_argument('--sample-size', type=int, default=5000, help='Number of sampled descriptions')
+    arg_parser.add_argument('--size', type=int, default=32768, help='Maximum size of the dictionary in bytes')
+    arg_parser.add_argument('--holdout', type=float, default=0.2,
+                            help='Share of the sample left out of the training to measure the compression on')
+    args = arg_parser.parse_args()
+
+    pg_conn = PostgreSQLConnector()
+    try:
+        descriptions = sample_descriptions(pg_conn, args.sample_size)
+    finally:
+        pg_conn.close_connection()
+
+    # The sample is in random order, its tail is held out of the training
+    held_out = descriptions[len(descriptions) - int(len(descriptions) * args.holdout):] if args.holdout > 0 else []
+    training = descriptions[:len(descriptions) - len(held_out)]
+
+    dictionary = train_dictionary(training, args.size)
+    with open(args.output, 'wb') as f:
+        f.write(dictionary)
+    print(f"Wrote a {len(dictionary)} byte dictionary trained on {len(training)} descriptions to {args.output}")
+
+    # Compare the compressed size of the held-out descriptions without and with the dictionary, as the
+    # descriptions the dictionary was trained on would overstate the gain
+    original = sum(len(description.encode('utf-8')) for description in held_out)
+    plain = sum(len(DescriptionCodec().compress(description).body) for description in held_out)
+    trained = sum(len(DescriptionCodec(dictionary).compress(description).body) for description in held_out)
+    if original:
+        print(
+            f"Held-out sample of {len(held_out)} descriptions: {original} bytes, {plain / original:.1%} compressed, "
+            f"{trained / original:.1%} with the dictionary"
+        )
+
+if __name__ == '__main__':
+    main()
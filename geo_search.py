@@ -0,0 +1,108 @@
+import sys
+import os
+import argparse
+import json
+import pymongo
+
+# Add the project root directory to the Python path (since I can not use __init__.py in the infra directory)
+project_root = os.path.abspath(os.path.dirname(__file__))
+sys.path.insert(0, project_root)
+
+from infra.postgresql_connector import PostgreSQLConnector, GEO_RESULT_COLUMNS
+from infra.mongodb_connector import MongoDBConnector
+
+def search_postgres(args):
+    """
+    Runs the location search on PostgreSQL (geohash index).
+
+    Returns:
+        list: The matching jobs, as dictionaries of GEO_RESULT_COLUMNS (and distance_km).
+    """
+    pg_conn = PostgreSQLConnector()
+    try:
+        if args.command == 'near':
+            rows = pg_conn.find_jobs_near(args.latitude, args.longitude, args.radius_km, limit=args.limit)
+            return [dict(zip(GEO_RESULT_COLUMNS + ['distance_km'], row)) for row in rows]
+        rows = pg_conn.find_jobs_within(args.south, args.west, args.north, args.east, limit=args.limit)
+        return [dict(zip(GEO_RESULT_COLUMNS, row)) for row in rows]
+    finally:
+        pg_conn.close_connection()
+
+def search_mongo(args):
+    """
+    Runs the location search on MongoDB (2dsphere index).
+
+    Returns:
+        list: The matching jobs, as dictionaries of GEO_RESULT_COLUMNS (and distance_km).
+    """
+    mongo_conn = MongoDBConnector()
+    try:
+        if args.command == 'near':
+            documents = mongo_conn.find_near(args.latitude, args.longitude, args.radius_km, limit=args.limit)
+            columns = GEO_RESULT_COLUMNS + ['distance_km']
+        else:
+            documents = mongo_conn.find_within(args.south, args.west, args.north, args.east, limit=args.limit)
+            columns = GEO_RESULT_COLUMNS
+        return [{column: document.get(column) for column in columns} for document in documents]
+    finally:
+        mongo_conn.close_connection()
+
+def print_results(jobs):
+    """
+    Prints the matching jobs, one line each, nearest first for radius searches.
+    """
+    for job in jobs:
+        distance = f"{job['distance_km']:8.2f} km  " if 'distance_km' in job else ''
+        print(
+            f"{distance}{job['req_id']:<14} {job['title']} - {job['hiring_organization'] or ''} "
+            f"({job['short_location'] or job['country_code'] or ''}, {job['latitude']:.5f}, {job['longitude']:.5f})"
+        )
+    print(f"{len(jobs)} jobs")
+
+def main():
+    arg_parser = argparse.ArgumentParser(
+        description='Searches the stored jobs by location, with the geohash index of PostgreSQL '
+                    'or the 2dsphere index of MongoDB.'
+    )
+    commands = arg_parser.add_subparsers(dest='command', required=True)
+    # The options of the searches
+    search_options = argparse.ArgumentParser(add_help=False)
+    search_options.add_argument('--store', choices=['postgres', 'mongo'], default='postgres',
+                                help='The database searched')
+    search_options.add_argument('--limit', type=int, default=100, help='Maximum number of jobs returned')
+    search_options.add_argument('--json', action='store_true', help='Print the jobs as JSON lines')
+
+    near_parser = commands.add_parser(
+        'near', parents=[search_options], help='The jobs within a distance of a location, nearest first'
+    )
+    near_parser.add_argument('latitude', type=float)
+    near_parser.add_argument('longitude', type=float)
+    near_parser.add_argument('radius_km', type=float, help='Maximum distance in kilometers')
+
+    box_parser = commands.add_parser('box', parents=[search_options], help='The jobs within a bounding box')
+    box_parser.add_argument('south', type=float, help='Minimum latitude')
+    box_parser.add_argument('west', type=float, help='Western longitude (greater than east across the antimeridian)')
+    box_parser.add_argument('north', type=float, help='Maximum latitude')
+    box_parser.add_argument('east', type=float, help='Eastern longitude')
+
+    commands.add_parser('backfill', help='Indexes the MongoDB locations and sets those of the jobs stored before')
+    args = arg_parser.parse_args()
+
+    if args.command == 'backfill':
+        mongo_conn = MongoDBConnector()
+        try:
+            mongo_conn.create_index([('location', pymongo.GEOSPHERE)])
+            print(f"Set the location of {mongo_conn.backfill_locations()} MongoDB documents")
+        finally:
+            mongo_conn.close_connection()
+        return
+
+    jobs = search_postgres(args) if args.store == 'postgres' else search_mongo(args)
+    if args.json:
+        for job in jobs:
+            print(json.dumps(job, default=str))
+    else:
+        print_results(jobs)
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,179 @@
+import os
+from motor.motor_asyncio import AsyncIOMotorClient
+from pymongo.errors import BulkWriteError, DuplicateKeyError, PyMongoError
+from pymongo.write_concern import WriteConcern
+from infra.description_store import dictionary_id
+from infra.mongodb_connector import (
+    DUPLICATE_REQ_IDS_PIPELINE, REQ_ID_INDEX_NAME, job_index_models, stale_document_ids, upsert_filter
+)
+
+class AsyncMongoDBConnector:
+    """
+    asyncio counterpart of MongoDBConnector, backed by Motor.
+    """
+    def __init__(self, write_concern=None):
+        """
+        Args:
+            write_concern (dict): Optional write concern options (e.g. {'w': 1, 'j': False}) for the collection.
+        """
+        self.client = self.connect_mongodb()
+        self.db = self.client['jobs_db']
+        self.collection = self.db['raw_collection']
+        if write_concern is not None:
+            self.collection = self.collection.with_options(write_concern=WriteConcern(**write_concern))
+
+    def connect_mongodb(self):
+        """
+        Creates the asyncio client of the MongoDB database. Connections are opened lazily.
+
+        Returns:
+            motor.motor_asyncio.AsyncIOMotorClient: The MongoDB client object.
+        """
+        try:
+            return AsyncIOMotorClient(
+                host=os.getenv('MONGO_HOST'),
+                port=int(os.getenv('MONGO_PORT')),
+                username=os.getenv('MONGO_INITDB_ROOT_USERNAME'),
+                password=os.getenv('MONGO_INITDB_ROOT_PASSWORD')
+            )
+        except PyMongoError as e:
+            print(f"Error connecting to MongoDB: {e}")
+            raise
+
+    async def insert_data(self, data):
+        """
+        Inserts the given data into the MongoDB collection.
+
+        Args:
+            data (dict): The data to be inserted into the MongoDB collection.
+        """
+        try:
+            await self.collection.insert_one(data)
+        except PyMongoError as e:
+            print(f"Error inserting data into MongoDB: {e}")
+            raise
+
+    async def upsert_data(self, document, key='req_id'):
+        """
+        Inserts or updates the given document, matched on the given key, unless the stored document
+        is more recent (see upsert_filter).
+
+        Args:
+            document (dict): The document to be upserted into the MongoDB collection.
+            key (str): The field identifying the document.
+        """
+        try:
+            await self.collection.update_one(upsert_filter(document, key), {'$set': document}, upsert=True)
+        except DuplicateKeyError:
+            # The stored document is more recent and left untouched
+            pass
+        except PyMongoError as e:
+            print(f"Error upserting data into MongoDB: {e}")
+            raise
+
+    async def delete_job(self, req_id, content_hash):
+        """
+        Deletes the given version of a job, e.g. to undo a write that failed on the other database.
+        """
+        try:
+            await self.collection.delete_one({'req_id': req_id, 'content_hash': content_hash})
+        except PyMongoError as e:
+            print(f"Error deleting data from MongoDB: {e}")
+            raise
+
+    async def insert_description(self, blob):
+        """
+        Stores a compressed description, unless it is already stored (see MongoDBConnector.insert_descriptions).
+
+        Args:
+            blob (DescriptionBlob): The compressed description.
+        """
+        try:
+            await self.db['raw_descriptions'].insert_one(
+                {'_id': blob.hash, 'dictionary_id': blob.dictionary_id, 'body': blob.body}
+            )
+        except DuplicateKeyError:
+            pass
+        except PyMongoError as e:
+            print(f"Error inserting description into MongoDB: {e}")
+            raise
+
+    async def insert_description_dictionary(self, dictionary):
+        """
+        Stores a preset dictionary of the compressed descriptions, if it is not stored yet.
+        """
+        try:
+            await self.db['description_dictionaries'].update_one(
+                {'_id': dictionary_id(dictionary)}, {'$setOnInsert': {'dictionary': dictionary}}, upsert=True
+            )
+        except PyMongoError as e:
+            print(f"Error inserting dictionary into MongoDB: {e}")
+            raise
+
+    async def create_index(self, keys, **kwargs):
+        """
+        Creates an index on the MongoDB collection if it does not exist.
+        """
+        try:
+            await self.collection.create_index(keys, **kwargs)
+        except PyMongoError as e:
+            print(f"Error creating index in MongoDB: {e}")
+            raise
+
+    async def create_job_indexes(self):
+        """
+        Creates the indexes of the jobs (JOB_INDEXES) if they do not exist, in a single command.
+        """
+        try:
+            await self.collection.create_indexes(job_index_models(await self.collection.index_information()))
+        except PyMongoError as e:
+            print(f"Error creating indexes in MongoDB: {e}")
+            raise
+
+    async def create_upsert_index(self):
+        """
+        Makes the req_id index unique, as required by the upsert mode (see MongoDBConnector.create_upsert_index).
+        """
+        try:
+            index_information = await self.collection.index_information()
+            if index_information.get(REQ_ID_INDEX_NAME, {}).get('unique'):
+                return
+            groups = await self.collection.aggregate(DUPLICATE_REQ_IDS_PIPELINE, allowDiskUse=True).to_list(None)
+            stale_ids = stale_document_ids(groups)
+            for start in range(0, len(stale_ids), 1000):
+                await self.collection.delete_many({'_id': {'$in': stale_ids[start:start + 1000]}})
+            if REQ_ID_INDEX_NAME in index_information:
+                await self.collection.drop_index(REQ_ID_INDEX_NAME)
+            await self.collection.create_index('req_id', name=REQ_ID_INDEX_NAME, unique=True)
+        except PyMongoError as e:
+            print(f"Error creating the unique req_id index in MongoDB: {e}")
+            raise
+
+    async def insert_many_data(self, documents, ordered=False):
+        """
+        Inserts the given documents into the MongoDB collection in a single bulk operation.
+
+        Args:
+            documents (list): The documents to be inserted into the MongoDB collection.
+            ordered (bool): Whether to stop at the first failing document.
+
+        Returns:
+            list: The write errors of the documents that could not be inserted (empty if all succeeded).
+        """
+        try:
+            await self.collection.insert_many(documents, ordered=ordered)
+            return []
+        except BulkWriteError as e:
+            write_errors = e.details.get('writeErrors', [])
+            for error in write_errors:
+                print(f"Error inserting document {error.get('index')} into MongoDB: {error.get('errmsg')}")
+            return write_errors
+        except PyMongoError as e:
+            print(f"Error inserting data into MongoDB: {e}")
+            raise
+
+    def close_connection(self):
+        """
+        Closes the connection to the MongoDB database.
+        """
+        self.client.close()
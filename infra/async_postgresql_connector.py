@@ -0,0 +1,153 @@
+import psycopg
+import os
+from psycopg.conninfo import make_conninfo
+from psycopg.types.json import Jsonb
+from psycopg_pool import AsyncConnectionPool
+from infra.description_store import dictionary_id
+from infra.postgresql_connector import (
+    CREATE_JOBS_TABLE_QUERY, CREATE_UPSERT_INDEX_QUERY, adapt_json_values, build_upsert_query
+)
+
+class AsyncPostgreSQLConnector:
+    """
+    asyncio counterpart of PostgreSQLConnector, backed by a psycopg 3 connection pool
+    so that several queries can be in flight at once.
+    """
+    def __init__(self, min_size=1, max_size=10):
+        self.pool = AsyncConnectionPool(
+            make_conninfo(
+                dbname=os.getenv("SQL_NAME"),
+                user=os.getenv("SQL_USER"),
+                password=os.getenv("SQL_PASSWORD"),
+                host=os.getenv("SQL_HOST"),
+                port=os.getenv("SQL_PORT"),
+            ),
+            min_size=min_size,
+            max_size=max_size,
+            open=False
+        )
+
+    async def connect_postgresql(self):
+        """
+        Opens the connection pool to the PostgreSQL database.
+        """
+        await self.pool.open()
+
+    async def execute_query(self, query, params=None):
+        """
+        Executes the given query on a pooled connection and returns the result.
+
+        Args:
+            query (str): The SQL query to be executed.
+            params (tuple): The parameters to be passed to the query.
+
+        Returns:
+            list: The result of the query execution.
+
+        Raises:
+            psycopg.Error: An error occurred while executing the query.
+        """
+        try:
+            async with self.pool.connection() as conn:
+                cursor = await conn.execute(query, params)
+                if query.strip().lower().startswith("select"):
+                    return await cursor.fetchall()
+                return None
+        except psycopg.Error as e:
+            print(f"Database error: {e}")
+            raise
+
+    async def close_connection(self):
+        """
+        Closes the connection pool to the PostgreSQL database.
+        """
+        await self.pool.close()
+
+    async def create_jobs_table(self):
+        """
+        Creates the jobs table in the PostgreSQL database.
+        """
+        await self.execute_query(CREATE_JOBS_TABLE_QUERY)
+
+    async def create_upsert_index(self):
+        """
+        Creates the unique index on req_id required by the upsert mode (see PostgreSQLConnector.create_upsert_index).
+        """
+        await self.execute_query(CREATE_UPSERT_INDEX_QUERY)
+
+    async def insert_jobs_data(self, field_names, field_values, values):
+        """
+        Inserts the job data into the PostgreSQL database.
+
+        Args:
+            field_names (str): The comma-separated field names.
+            field_values (str): The comma-separated field values.
+            values (list): The list of values to be inserted.
+        """
+        insert_query = f'INSERT INTO raw_table ({field_names}) VALUES ({field_values})'
+        await self.execute_query(insert_query, adapt_json_values(field_names, values, Jsonb))
+
+    async def upsert_jobs_data(self, field_names, values):
+        """
+        Inserts or updates the job data keyed on req_id (see build_upsert_query).
+
+        Args:
+            field_names (str): The comma-separated field names (must include req_id and content_hash).
+            values (list): The list of values to be upserted.
+        """
+        field_values = ', '.join(['%s'] * len(values))
+        await self.execute_query(
+            build_upsert_query(field_names, f'({field_values})'), adapt_json_values(field_names, values, Jsonb)
+        )
+
+    async def delete_job(self, req_id, content_hash):
+        """
+        Deletes the given version of a job, e.g. to undo a write that failed on the other database.
+        """
+        await self.execute_query(
+            'DELETE FROM raw_table WHERE req_id = %s AND content_hash = %s', (req_id, content_hash)
+        )
+
+    async def insert_description(self, blob):
+        """
+        Stores a compressed description, unless it is already stored (see PostgreSQLConnector.insert_descriptions).
+
+        Args:
+            blob (DescriptionBlob): The compressed description.
+        """
+        await self.execute_query(
+            'INSERT INTO job_descriptions (hash, dictionary_id, body) VALUES (%s, %s, %s) ON CONFLICT (hash) DO NOTHING',
+            tuple(blob)
+        )
+
+    async def insert_description_dictionary(self, dictionary):
+        """
+        Stores a preset dictionary of the compressed descriptions, if it is not stored yet.
+        """
+        await self.execute_query(
+            'INSERT INTO job_description_dictionaries (id, dictionary) VALUES (%s, %s) ON CONFLICT (id) DO NOTHING',
+            (dictionary_id(dictionary), dictionary)
+        )
+
+    async def insert_jobs_batch(self, field_names, rows):
+        """
+        Inserts multiple rows of job data in a single transaction (pipelined executemany).
+
+        Args:
+            field_names (str): The comma-separated field names.
+            rows (list): The list of value sequences to be inserted, one per job.
+
+        Raises:
+            psycopg.Error: An error occurred while inserting the batch, the whole batch is rolled back.
+        """
+        field_values = ', '.join(['%s'] * len(rows[0]))
+        insert_query = f'INSERT INTO raw_table ({field_names}) VALUES ({field_values})'
+        try:
+            async with self.pool.connection() as conn:
+                async with conn.cursor() as cursor:
+                    await cursor.executemany(
+                        insert_query, [adapt_json_values(field_names, values, Jsonb) for values in rows]
+                    )
+        except psycopg.Error as e:
+            print(f"Database error: {e}")
+            raise
@@ -0,0 +1,117 @@
+import redis
+import redis.asyncio
+import os
+
+class AsyncRedisConnector:
+    """
+    asyncio counterpart of RedisConnector, backed by redis.asyncio.
+    """
+    def __init__(self):
+        self.conn = self.connect_redis()
+
+    def connect_redis(self):
+        """
+        Creates the asyncio client of the Redis database using the environment variables.
+        Connections are opened lazily by the client's connection pool.
+
+        Returns:
+            redis.asyncio.StrictRedis: The client object of the Redis database.
+        """
+        return redis.asyncio.StrictRedis(
+            host=os.getenv('REDIS_HOST'),
+            port=os.getenv('REDIS_PORT'),
+            db=os.getenv('REDIS_DB') or 0
+        )
+
+    async def exists_key(self, key):
+        """
+        Checks if the given key exists in the Redis database.
+        """
+        try:
+            return await self.conn.exists(key)
+        except redis.RedisError as e:
+            print(f"Error checking key existence in Redis: {e}")
+            raise
+
+    async def claim_key(self, key, value=1):
+        """
+        Atomically sets the given key only if it does not exist yet (SET NX).
+
+        Returns:
+            bool: True if the key was claimed, False if it already existed.
+        """
+        try:
+            return bool(await self.conn.set(key, value, nx=True))
+        except redis.RedisError as e:
+            print(f"Error claiming key in Redis: {e}")
+            raise
+
+    async def swap_key(self, key, value):
+        """
+        Atomically sets the given key and returns its previous value (SET GET).
+
+        Returns:
+            str: The previous value of the key, or None if it did not exist.
+        """
+        try:
+            previous = await self.conn.set(key, value, get=True)
+            return previous.decode('utf-8') if isinstance(previous, bytes) else previous
+        except redis.RedisError as e:
+            print(f"Error swapping key in Redis: {e}")
+            raise
+
+    async def swap_keys(self, keys, values):
+        """
+        Atomically sets each of the given keys to its value and returns the previous values (SET GET)
+        in a single pipelined round trip.
+
+        Returns:
+            list: The previous value of each key, or None for the keys that did not exist.
+        """
+        try:
+            pipe = self.conn.pipeline(transaction=False)
+            for key, value in zip(keys, values):
+                pipe.set(key, value, get=True)
+            return [
+                previous.decode('utf-8') if isinstance(previous, bytes) else previous
+                for previous in await pipe.execute()
+            ]
+        except redis.RedisError as e:
+            print(f"Error swapping keys in Redis: {e}")
+            raise
+
+    async def claim_keys(self, keys, value=1):
+        """
+        Atomically claims each of the given keys (SET NX) in a single pipelined round trip.
+
+        Returns:
+            list: A boolean per key, True if the key was claimed, False if it already existed.
+        """
+        try:
+            pipe = self.conn.pipeline(transaction=False)
+            for key in keys:
+                pipe.set(key, value, nx=True)
+            return [bool(result) for result in await pipe.execute()]
+        except redis.RedisError as e:
+            print(f"Error claiming keys in Redis: {e}")
+            raise
+
+    async def release_key(self, key):
+        """
+        Deletes the given claimed key, so that it is claimed again the next time it is seen.
+        """
+        try:
+            await self.conn.delete(key)
+        except redis.RedisError as e:
+            print(f"Error deleting key from Redis: {e}")
+            raise
+
+    async def close_connection(self):
+        """
+        Closes the connections to the Redis database.
+        """
+        try:
+            await self.conn.aclose()
+        except redis.RedisError as e:
+            print(f"Error closing Redis connection: {e}")
+            raise
@@ -0,0 +1,169 @@
+import hashlib
+import re
+import zlib
+from collections import Counter, namedtuple
+
+# A compressed description, stored once per distinct description (content-addressed by its hash)
+# in the job_descriptions table and the raw_descriptions collection
+DescriptionBlob = namedtuple('DescriptionBlob', ['hash', 'dictionary_id', 'body'])
+
+# zlib uses at most the last 32 KB of a preset dictionary
+MAX_DICTIONARY_SIZE = 32768
+# Splits descriptions into the segments counted by train_dictionary: around tags and after sentences
+SEGMENT_PATTERN = re.compile(r'(?<=[>.!?])\s*|(?=<)')
+WORD_PATTERN = re.compile(r'\w{4,}')
+
+def description_hash(description):
+    """
+    Returns the content address of a description (128-bit BLAKE2b, as 32 hex digits).
+    """
+    return hashlib.blake2b(description.encode('utf-8'), digest_size=16).hexdigest()
+
+def dictionary_id(dictionary):
+    """
+    Returns the identifier of a preset dictionary, stored with the descriptions compressed with it.
+    """
+    return hashlib.blake2b(dictionary, digest_size=8).hexdigest()
+
+def train_dictionary(descriptions, size=MAX_DICTIONARY_SIZE, min_count=2):
+    """
+    Builds a zlib preset dictionary from sample descriptions: the segments (HTML tags, sentences,
+    and words) shared by the most samples, weighted by their length, with the most common ones last
+    since zlib finds the end of the dictionary with the shortest distances.
+
+    Args:
+        descriptions (iterable): The sample descriptions.
+        size (int): The maximum size of the dictionary in bytes.
+        min_count (int): The minimum number of samples a segment must appear in.
+
+    Returns:
+        bytes: The dictionary, empty if the samples share no segment.
+    """
+    counts = Counter()
+    for description in descriptions:
+        segments = {segment for segment in SEGMENT_PATTERN.split(description) if len(segment) >= 8}
+        segments.update(word + ' ' for word in WORD_PATTERN.findall(description))
+        counts.update(segments)
+
+    segments = sorted(
+        ((count, segment.encode('utf-8')) for segment, count in counts.items() if count >= min_count),
+        key=lambda entry: entry[0] * len(entry[1]),
+        reverse=True
+    )
+    selected = []
+    used = 0
+    for count, segment in segments:
+        if used + len(segment) <= size:
+            selected.append((count, segment))
+            used += len(segment)
+    selected.sort(key=lambda entry: entry[0])
+    return b''.join(segment for _, segment in selected)
+
+class DescriptionCodec:
+    """
+    Compresses descriptions with raw deflate (zlib without its header and checksum), optionally
+    with a preset dictionary of the boilerplate shared by many descriptions, and decompresses
+    them with the dictionary they were compressed with.
+    """
+    def __init__(self, dictionary=b'', level=9):
+        """
+        Args:
+            dictionary (bytes): The preset dictionary used for compression (see train_dictionary), empty for none.
+            level (int): The zlib compression level.
+        """
+        self.dictionary = dictionary[-MAX_DICTIONARY_SIZE:]
+        self.dictionary_id = dictionary_id(self.dictionary) if self.dictionary else None
+        self.level = level
+        self.dictionaries = {}
+        if self.dictionary:
+            self.dictionaries[self.dictionary_id] = self.dictionary
+
+    def add_dictionary(self, dictionary):
+        """
+        Makes a dictionary available for decompression (e.g. one loaded from the database).
+        """
+        self.dictionaries[dictionary_id(dictionary)] = dictionary
+
+    def compress(self, description, content_hash=None):
+        """
+        Compresses a description.
+
+        Args:
+            description (str): The description.
+            content_hash (str): The hash of the description, computed if None.
+
+        Returns:
+            DescriptionBlob: The compressed description.
+        """
+        if self.dictionary:
+            compressor = zlib.compressobj(self.level, zlib.DEFLATED, -15, zdict=self.dictionary)
+        else:
+            compressor = zlib.compressobj(self.level, zlib.DEFLATED, -15)
+        body = compressor.compress(description.encode('utf-8')) + compressor.flush()
+        return DescriptionBlob(content_hash or description_hash(description), self.dictionary_id, body)
+
+    def decompress(self, dictionary_id, body):
+        """
+        Decompresses a description stored by compress.
+
+        Raises:
+            KeyError: The dictionary of the description is unknown.
+        """
+        if dictionary_id:
+            decompressor = zlib.decompressobj(-15, zdict=self.dictionaries[dictionary_id])
+        else:
+            decompressor = zlib.decompressobj(-15)
+        return (decompressor.decompress(bytes(body)) + decompressor.flush()).decode('utf-8')
+
+def load_codec(dictionaries):
+    """
+    Creates the codec decompressing the descriptions stored with the given preset dictionaries.
+    """
+    codec = DescriptionCodec()
+    for dictionary in dictionaries:
+        codec.add_dictionary(dictionary)
+    return codec
+
+def restore_descriptions(rows, description_index, codec):
+    """
+    Restores the compressed descriptions of rows exported with export_jobs_query, whose last two
+    columns are the dictionary_id and body of the description.
+
+    Args:
+        rows (list): The exported rows.
+        description_index (int): The index of the description column.
+        codec (DescriptionCodec): The codec, with the dictionaries of the descriptions.
+
+    Returns:
+        list: The rows (as lists), with the description and without the last two columns.
+    """
+    restored = []
+    for row in rows:
+        values = list(row[:-2])
+        if row[-1] is not None:
+            values[description_index] = codec.decompress(row[-2], row[-1])
+        restored.append(values)
+    return restored
+
+def restore_document_descriptions(documents, fetch_descriptions, codec):
+    """
+    Restores the compressed descriptions of a batch of documents in place, fetching each distinct
+    description of the batch once.
+
+    Args:
+        documents (list): The documents.
+        fetch_descriptions (callable): Returns the (dictionary_id, body) of the given hashes, keyed by
+            hash (e.g. MongoDBConnector.get_descriptions).
+        codec (DescriptionCodec): The codec, with the dictionaries of the descriptions.
+    """
+    hashes = {
+        document['description_hash'] for document in documents
+        if document.get('description_hash') and document.get('description') is None
+    }
+    if not hashes:
+        return
+    descriptions = fetch_descriptions(hashes)
+    for document in documents:
+        compressed = descriptions.get(document.get('description_hash'))
+        if compressed is not None and document.get('description') is None:
+            document['description'] = codec.decompress(*compressed)
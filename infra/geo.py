@@ -0,0 +1,172 @@
+import math
+
+# The geohash alphabet, in ASCII order so that geohashes sort like their cells (with the "C" collation)
+BASE32 = '0123456789bcdefghjkmnpqrstuvwxyz'
+# Mean Earth radius
+EARTH_RADIUS_KM = 6371.0088
+# The largest geohash precision, the precision of the geohash column of raw_table
+MAX_PRECISION = 9
+# The highest latitude of the vertices of box_polygons
+POLE_LATITUDE = 89.9999
+
+def valid_coordinates(latitude, longitude):
+    """
+    Checks that a latitude and longitude are numbers within their ranges (not None or NaN).
+    """
+    return (
+        isinstance(latitude, (int, float)) and isinstance(longitude, (int, float))
+        and -90 <= latitude <= 90 and -180 <= longitude <= 180
+    )
+
+def geojson_point(latitude, longitude):
+    """
+    Builds the GeoJSON point of a MongoDB 2dsphere index.
+
+    Returns:
+        dict: The point, or None if the coordinates are missing or out of range.
+    """
+    if not valid_coordinates(latitude, longitude):
+        return None
+    return {'type': 'Point', 'coordinates': [longitude, latitude]}
+
+def box_polygons(south, west, north, east, max_width=90.0, step=1.0, margin=0.01):
+    """
+    Builds GeoJSON polygons containing a bounding box, for the $geoWithin queries of a MongoDB 2dsphere index.
+    The edges of GeoJSON polygons are great-circle arcs rather than parallels, so the southern and northern
+    edges are split into segments of at most step degrees, pushed outwards by margin degrees (more than the
+    arc of a segment strays from its parallel). The polygons are at most max_width degrees wide, as MongoDB
+    only supports polygons smaller than a hemisphere. West is greater than east when the box crosses the
+    antimeridian. The poles themselves are left out, as the vertices of a polygon must be distinct.
+
+    Returns:
+        list: The GeoJSON polygons, covering slightly more than the box.
+    """
+    south, north = max(south - margin, -POLE_LATITUDE), min(north + margin, POLE_LATITUDE)
+    spans = [(west, east)] if west <= east else [(west, 180.0), (-180.0, east)]
+    polygons = []
+    for low, high in spans:
+        pieces = max(1, math.ceil((high - low) / max_width))
+        for piece in range(pieces):
+            piece_low = low + (high - low) * piece / pieces
+            piece_high = low + (high - low) * (piece + 1) / pieces
+            segments = max(1, math.ceil((piece_high - piece_low) / step))
+            longitudes = [piece_low + (piece_high - piece_low) * i / segments for i in range(segments + 1)]
+            ring = (
+                [[longitude, south] for longitude in longitudes]
+                + [[longitude, north] for longitude in reversed(longitudes)]
+                + [[piece_low, south]]
+            )
+            polygons.append({'type': 'Polygon', 'coordinates': [ring]})
+    return polygons
+
+def cell_bits(precision):
+    """
+    Returns the number of latitude and longitude bits of a geohash of the given precision.
+    """
+    bits = 5 * precision
+    return bits // 2, bits - bits // 2
+
+def cell_hash(lat_index, lon_index, precision):
+    """
+    Builds the geohash of a cell from its row and column in the grid of the given precision,
+    interleaving the longitude and latitude bits (longitude first).
+    """
+    lat_bits, lon_bits = cell_bits(precision)
+    code = 0
+    for bit in range(5 * precision):
+        if bit % 2 == 0:
+            code = code << 1 | (lon_index >> (lon_bits - 1 - bit // 2)) & 1
+        else:
+            code = code << 1 | (lat_index >> (lat_bits - 1 - bit // 2)) & 1
+    return ''.join(BASE32[(code >> shift) & 31] for shift in range(5 * (precision - 1), -1, -5))
+
+def cell_index(value, minimum, size, count):
+    return min(count - 1, max(0, math.floor((value - minimum) / size)))
+
+def encode(latitude, longitude, precision=MAX_PRECISION):
+    """
+    Encodes a location as a geohash, the same way as the raw_table_geohash SQL function.
+
+    Returns:
+        str: The geohash, or None if the coordinates are missing or out of range.
+    """
+    if not valid_coordinates(latitude, longitude):
+        return None
+    lat_bits, lon_bits = cell_bits(precision)
+    return cell_hash(
+        cell_index(latitude, -90.0, 180.0 / (1 << lat_bits), 1 << lat_bits),
+        cell_index(longitude, -180.0, 360.0 / (1 << lon_bits), 1 << lon_bits),
+        precision
+    )
+
+def haversine_km(latitude, longitude, other_latitude, other_longitude):
+    """
+    Returns the great-circle distance between two locations in kilometers.
+    """
+    lat1, lat2 = math.radians(latitude), math.radians(other_latitude)
+    a = (
+        math.sin((lat2 - lat1) / 2) ** 2
+        + math.cos(lat1) * math.cos(lat2) * math.sin(math.radians(other_longitude - longitude) / 2) ** 2
+    )
+    return 2 * EARTH_RADIUS_KM * math.asin(min(1.0, math.sqrt(a)))
+
+def bounding_box(latitude, longitude, radius_km):
+    """
+    Returns the bounding box of the circle of the given radius around a location.
+    West is greater than east when the box crosses the antimeridian.
+
+    Returns:
+        tuple: The south, west, north and east bounds in degrees.
+    """
+    angle = radius_km / EARTH_RADIUS_KM
+    south = latitude - math.degrees(angle)
+    north = latitude + math.degrees(angle)
+    if south <= -90 or north >= 90:
+        # The circle contains a pole, every longitude is within the radius
+        return max(south, -90.0), -180.0, min(north, 90.0), 180.0
+    delta = math.degrees(math.asin(min(1.0, math.sin(angle) / math.cos(math.radians(latitude)))))
+    if delta >= 180:
+        return south, -180.0, north, 180.0
+    west = (longitude - delta + 180) % 360 - 180
+    east = (longitude + delta + 180) % 360 - 180
+    return south, west, north, east
+
+def cover(south, west, north, east, max_cells=32):
+    """
+    Covers a bounding box with geohash cells of the finest precision needing at most max_cells cells,
+    merged into ranges of consecutive geohashes. West is greater than east when the box crosses the antimeridian.
+
+    Returns:
+        list: The (low, high) bounds of the geohash ranges, a geohash g of any precision is in a range
+            if low <= g < high.
+    """
+    longitudes = [(west, east)] if west <= east else [(west, 180.0), (-180.0, east)]
+    for precision in range(MAX_PRECISION, 0, -1):
+        lat_bits, lon_bits = cell_bits(precision)
+        height, width = 180.0 / (1 << lat_bits), 360.0 / (1 << lon_bits)
+        rows = range(
+            cell_index(south, -90.0, height, 1 << lat_bits), cell_index(north, -90.0, height, 1 << lat_bits) + 1
+        )
+        columns = [
+            range(cell_index(low, -180.0, width, 1 << lon_bits), cell_index(high, -180.0, width, 1 << lon_bits) + 1)
+            for low, high in longitudes
+        ]
+        if len(rows) * sum(map(len, columns)) <= max_cells or precision == 1:
+            break
+
+    hashes = sorted({
+        cell_hash(row, column, precision) for row in rows for column_range in columns for column in column_range
+    })
+    ranges = []
+    for geohash in hashes:
+        if ranges and BASE32.index(geohash[-1]) and ranges[-1][2] == previous_hash(geohash):
+            ranges[-1][1:] = [geohash + '~', geohash]
+        else:
+            ranges.append([geohash, geohash + '~', geohash])
+    return [(low, high) for low, high, _ in ranges]
+
+def previous_hash(geohash):
+    """
+    Returns the geohash preceding the given one in the same parent cell.
+    """
+    return geohash[:-1] + BASE32[BASE32.index(geohash[-1]) - 1]
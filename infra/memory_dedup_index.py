@@ -0,0 +1,66 @@
+class MemoryDedupIndex:
+    """
+    In-process dedup index of the job keys (DEDUP_BACKEND = "memory"), for the runs that need neither
+    Redis nor a dedup state shared with other crawlers or kept between runs, e.g. local benchmarks and
+    reprocessing runs. It exposes the claim_keys, swap_keys and set_keys methods of the Redis dedup indexes.
+    """
+    def __init__(self):
+        # The value of each job key: 1 (insert mode) or the content hash of the job (upsert mode)
+        self.values = {}
+
+    def __len__(self):
+        return len(self.values)
+
+    def member(self, key):
+        return key
+
+    def claim_keys(self, keys, value=1):
+        """
+        Claims each of the given job keys.
+
+        Returns:
+            list: A boolean per key, True if the key was claimed, False if it was already seen
+            (including keys repeated earlier in the same batch).
+        """
+        claimed = []
+        for key in keys:
+            is_new = key not in self.values
+            if is_new:
+                self.values[key] = value
+            claimed.append(is_new)
+        return claimed
+
+    def swap_keys(self, keys, values):
+        """
+        Sets each of the given job keys to its value and returns the previous values.
+
+        Returns:
+            list: The previous value of each key, or None for the keys that were not seen.
+        """
+        previous_values = []
+        for key, value in zip(keys, values):
+            previous_values.append(self.values.get(key))
+            self.values[key] = value
+        return previous_values
+
+    def set_keys(self, items):
+        """
+        Sets the given (job key, value) pairs.
+        """
+        self.values.update(items)
+
+    def release_keys(self, keys):
+        """
+        Forgets the given job keys, so that they are claimed again the next time they are seen.
+        """
+        for key in keys:
+            self.values.pop(key, None)
+
+    def scan_members(self, count=1000):
+        """
+        Iterates over the jobs of the index.
+
+        Yields:
+            str: The identity of each job, as returned by member.
+        """
+        yield from list(self.values)
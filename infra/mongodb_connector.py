@@ -1,12 +1,128 @@
 import pymongo
+import json
 import os
-from pymongo.errors import PyMongoError
+from datetime import datetime
+from pymongo import IndexModel, UpdateOne
+from pymongo.errors import BulkWriteError, PyMongoError
+from pymongo.write_concern import WriteConcern
+from infra import geo
+from infra.description_store import dictionary_id
+
+# The code of the write errors of documents whose _id (or unique key) is already stored
+DUPLICATE_KEY_ERROR = 11000
+
+# List and dictionary fields, stored as BSON arrays and embedded documents
+STRUCTURED_FIELDS = ['languages', 'categories', 'tags', 'tags5', 'tags6', 'benefits', 'meta_data', 'category']
+# Timestamp fields, stored as BSON dates
+TIMESTAMP_FIELDS = ['update_date', 'create_date']
+
+# The indexes of the jobs: the 2dsphere index of the locations, the lookups by req_id and country_code,
+# the multikey index of the tags array and the date ranges (most recent first)
+JOB_INDEXES = [
+    [('location', pymongo.GEOSPHERE)],
+    [('req_id', pymongo.ASCENDING)],
+    [('country_code', pymongo.ASCENDING)],
+    [('tags', pymongo.ASCENDING)],
+    [('create_date', pymongo.DESCENDING)],
+]
+
+# The index of the req_ids, made unique by the upsert mode (see MongoDBConnector.create_upsert_index)
+REQ_ID_INDEX_NAME = 'req_id_1'
+
+# Groups the documents sharing a req_id, to keep only the most recently inserted one before the index is made unique
+DUPLICATE_REQ_IDS_PIPELINE = [
+    {'$group': {'_id': '$req_id', 'ids': {'$push': '$_id'}, 'count': {'$sum': 1}}},
+    {'$match': {'count': {'$gt': 1}}},
+]
+
+def job_index_models(index_information):
+    """
+    Returns the IndexModels of JOB_INDEXES, leaving out the req_id index once the upsert mode made it unique.
+
+    Args:
+        index_information (dict): The existing indexes of the collection (Collection.index_information).
+    """
+    unique_req_id = index_information.get(REQ_ID_INDEX_NAME, {}).get('unique', False)
+    return [IndexModel(keys) for keys in JOB_INDEXES if not (unique_req_id and keys[0][0] == 'req_id')]
+
+def stale_document_ids(groups):
+    """
+    Returns the _ids of all but the most recently inserted document (the highest ObjectId) of each group
+    of DUPLICATE_REQ_IDS_PIPELINE.
+    """
+    return [document_id for group in groups for document_id in sorted(group['ids'])[:-1]]
+
+def upsert_filter(document, key='req_id'):
+    """
+    Returns the filter of the upsert of a job: its key, and like the upserts of PostgreSQL (build_upsert_query)
+    a stored document that is more recent than the incoming one is not matched. The upsert then tries to insert
+    the job and fails on the unique req_id index with a duplicate key error, which leaves the stored job as it is.
+    """
+    query = {key: document[key]}
+    if document.get('update_date') is not None:
+        query['$or'] = [{'update_date': {'$lte': document['update_date']}}, {'update_date': None}]
+    return query
+
+def decode_fields(document):
+    """
+    Decodes the fields of a document stored before the native BSON types: list and dictionary fields
+    encoded as JSON strings, and timestamps as ISO-8601 strings. Strings that do not decode are kept.
+
+    Returns:
+        dict: The decoded values, keyed by field name (empty if the document has no encoded field).
+    """
+    decoded = {}
+    for field_name in STRUCTURED_FIELDS:
+        value = document.get(field_name)
+        if isinstance(value, str):
+            try:
+                decoded[field_name] = json.loads(value) if value else None
+            except ValueError:
+                pass
+    for field_name in TIMESTAMP_FIELDS:
+        value = document.get(field_name)
+        if isinstance(value, str):
+            try:
+                decoded[field_name] = datetime.fromisoformat(value) if value else None
+            except ValueError:
+                pass
+    return decoded
+
+def containment_query(conditions):
+    """
+    Builds the query of the documents whose list and dictionary fields contain the given values,
+    the counterpart of the JSONB containment of PostgreSQLConnector.find_jobs_containing.
+
+    Raises:
+        ValueError: A condition is not on a list or dictionary field.
+    """
+    query = {}
+    for field_name, value in conditions.items():
+        if field_name not in STRUCTURED_FIELDS:
+            raise ValueError(f"Not a list or dictionary field: {field_name}")
+        if isinstance(value, dict):
+            # Every key of the embedded document must have the given value
+            query.update({f'{field_name}.{key}': item for key, item in value.items()})
+        elif isinstance(value, list):
+            # Every element must be in the array, embedded documents match the elements containing them
+            query[field_name] = {'$all': [
+                {'$elemMatch': element} if isinstance(element, dict) else element for element in value
+            ]}
+        else:
+            query[field_name] = value
+    return query
 
 class MongoDBConnector:
-    def __init__(self):
+    def __init__(self, write_concern=None):
+        """
+        Args:
+            write_concern (dict): Optional write concern options (e.g. {'w': 1, 'j': False}) for the collection.
+        """
         self.client = self.connect_mongodb()
         self.db = self.client['jobs_db']
         self.collection = self.db['raw_collection']
+        if write_concern is not None:
+            self.collection = self.collection.with_options(write_concern=WriteConcern(**write_concern))
 
     def connect_mongodb(self):
         """
@@ -45,6 +161,376 @@ class MongoDBConnector:
             print(f"Error inserting data into MongoDB: {e}")
             raise
 
+    def insert_many_data(self, documents, ordered=False):
+        """
+        Inserts the given documents into the MongoDB collection in a single bulk operation.
+
+        With ordered=False the server attempts every document even if some of them fail,
+        and the failed documents are reported instead of failing the whole batch.
+
+        Args:
+            documents (list): The documents to be inserted into the MongoDB collection.
+            ordered (bool): Whether to stop at the first failing document.
+
+        Returns:
+            list: The write errors of the documents that could not be inserted (empty if all succeeded).
+
+        Raises:
+            PyMongoError: An error occurred when inserting data into the MongoDB collection.
+        """
+        try:
+            self.collection.insert_many(documents, ordered=ordered)
+            return []
+        except BulkWriteError as e:
+            write_errors = e.details.get('writeErrors', [])
+            for error in write_errors:
+                print(f"Error inserting document {error.get('index')} into MongoDB: {error.get('errmsg')}")
+            return write_errors
+        except PyMongoError as e:
+            print(f"Error inserting data into MongoDB: {e}")
+            raise
+
+    def upsert_many_data(self, documents, key='req_id', ordered=False):
+        """
+        Inserts or updates the given documents, matched on the given key, in a single bulk operation.
+
+        Args:
+            documents (list): The documents to be upserted into the MongoDB collection.
+            key (str): The field identifying the document.
+            ordered (bool): Whether to stop at the first failing document.
+
+        Returns:
+            list: The write errors of the documents that could not be upserted (empty if all succeeded).
+
+        Raises:
+            PyMongoError: An error occurred when upserting data into the MongoDB collection.
+        """
+        try:
+            self.collection.bulk_write(
+                [UpdateOne(upsert_filter(document, key), {'$set': document}, upsert=True) for document in documents],
+                ordered=ordered
+            )
+            return []
+        except BulkWriteError as e:
+            write_errors = e.details.get('writeErrors', [])
+            for error in write_errors:
+                # Duplicate keys are the jobs older than the stored ones, which are left untouched
+                if error.get('code') != DUPLICATE_KEY_ERROR:
+                    print(f"Error upserting document {error.get('index')} into MongoDB: {error.get('errmsg')}")
+            return write_errors
+        except PyMongoError as e:
+            print(f"Error upserting data into MongoDB: {e}")
+            raise
+
+    def delete_jobs(self, jobs):
+        """
+        Deletes the given versions of jobs, e.g. to undo writes that failed on the other database.
+
+        Args:
+            jobs (list): The (req_id, content_hash) of the jobs to delete.
+
+        Raises:
+            PyMongoError: An error occurred when deleting data from the MongoDB collection.
+        """
+        try:
+            self.collection.delete_many(
+                {'$or': [{'req_id': req_id, 'content_hash': content_hash} for req_id, content_hash in jobs]}
+            )
+        except PyMongoError as e:
+            print(f"Error deleting data from MongoDB: {e}")
+            raise
+
+    def insert_descriptions(self, blobs, ordered=False):
+        """
+        Stores compressed descriptions in the raw_descriptions collection, keyed by their hash,
+        skipping those already stored (they are content-addressed).
+
+        Args:
+            blobs (list): The DescriptionBlobs.
+            ordered (bool): Whether to stop at the first failing description.
+
+        Returns:
+            list: The hashes of the descriptions that could not be stored.
+
+        Raises:
+            PyMongoError: An error occurred when inserting the descriptions.
+        """
+        try:
+            self.db['raw_descriptions'].insert_many(
+                [{'_id': blob.hash, 'dictionary_id': blob.dictionary_id, 'body': blob.body} for blob in blobs],
+                ordered=ordered
+            )
+            return []
+        except BulkWriteError as e:
+            # Descriptions already stored are duplicate keys
+            failed = set()
+            for error in e.details.get('writeErrors', []):
+                if error.get('code') != DUPLICATE_KEY_ERROR:
+                    print(f"Error inserting description {error.get('index')} into MongoDB: {error.get('errmsg')}")
+                    failed.add(error['index'])
+            if ordered and e.details.get('writeErrors'):
+                # The descriptions after the first error were not attempted
+                failed.update(range(e.details['writeErrors'][0]['index'] + 1, len(blobs)))
+            return [blobs[index].hash for index in sorted(failed)]
+        except PyMongoError as e:
+            print(f"Error inserting descriptions into MongoDB: {e}")
+            raise
+
+    def insert_description_dictionary(self, dictionary):
+        """
+        Stores a preset dictionary of the compressed descriptions, if it is not stored yet.
+        """
+        try:
+            self.db['description_dictionaries'].update_one(
+                {'_id': dictionary_id(dictionary)}, {'$setOnInsert': {'dictionary': dictionary}}, upsert=True
+            )
+        except PyMongoError as e:
+            print(f"Error inserting dictionary into MongoDB: {e}")
+            raise
+
+    def description_dictionaries(self):
+        """
+        Returns the preset dictionaries of the compressed descriptions.
+
+        Returns:
+            list: The dictionaries (bytes).
+        """
+        try:
+            return [bytes(document['dictionary']) for document in self.db['description_dictionaries'].find()]
+        except PyMongoError as e:
+            print(f"Error retrieving dictionaries from MongoDB: {e}")
+            raise
+
+    def get_descriptions(self, hashes):
+        """
+        Fetches compressed descriptions by hash.
+
+        Args:
+            hashes (iterable): The description hashes.
+
+        Returns:
+            dict: The (dictionary_id, body) of each stored description, keyed by hash.
+        """
+        try:
+            return {
+                document['_id']: (document.get('dictionary_id'), document['body'])
+                for document in self.db['raw_descriptions'].find({'_id': {'$in': list(hashes)}})
+            }
+        except PyMongoError as e:
+            print(f"Error retrieving descriptions from MongoDB: {e}")
+            raise
+
+    def create_index(self, keys, **kwargs):
+        """
+        Creates an index on the MongoDB collection if it does not exist.
+
+        Args:
+            keys (str or list): The field or list of (field, direction) pairs to index.
+            **kwargs: Options passed to pymongo's create_index.
+
+        Raises:
+            PyMongoError: An error occurred when creating the index.
+        """
+        try:
+            self.collection.create_index(keys, **kwargs)
+        except PyMongoError as e:
+            print(f"Error creating index in MongoDB: {e}")
+            raise
+
+    def create_job_indexes(self):
+        """
+        Creates the indexes of the jobs (JOB_INDEXES) if they do not exist, in a single command.
+
+        Raises:
+            PyMongoError: An error occurred when creating the indexes.
+        """
+        try:
+            self.collection.create_indexes(job_index_models(self.collection.index_information()))
+        except PyMongoError as e:
+            print(f"Error creating indexes in MongoDB: {e}")
+            raise
+
+    def create_upsert_index(self, batch_size=1000):
+        """
+        Makes the req_id index unique, as required by the upsert mode.
+
+        Existing collections may already contain several documents of the same job, so all but the
+        most recently inserted document of each req_id are deleted before the index is created.
+
+        Args:
+            batch_size (int): The number of duplicate documents deleted per round trip.
+
+        Raises:
+            PyMongoError: An error occurred when creating the index.
+        """
+        try:
+            index_information = self.collection.index_information()
+            if index_information.get(REQ_ID_INDEX_NAME, {}).get('unique'):
+                return
+            stale_ids = stale_document_ids(self.collection.aggregate(DUPLICATE_REQ_IDS_PIPELINE, allowDiskUse=True))
+            for start in range(0, len(stale_ids), batch_size):
+                self.collection.delete_many({'_id': {'$in': stale_ids[start:start + batch_size]}})
+            if REQ_ID_INDEX_NAME in index_information:
+                self.collection.drop_index(REQ_ID_INDEX_NAME)
+            self.collection.create_index('req_id', name=REQ_ID_INDEX_NAME, unique=True)
+        except PyMongoError as e:
+            print(f"Error creating the unique req_id index in MongoDB: {e}")
+            raise
+
+    def find_jobs_containing(self, conditions, limit=100):
+        """
+        Finds the jobs whose list and dictionary fields contain the given values,
+        conditions on the tags use the multikey index of the tags array.
+
+        Example: {'tags': ['python'], 'categories': [{'name': 'Engineering'}]} finds the jobs
+        tagged python in the Engineering category.
+
+        Args:
+            conditions (dict): The value each list or dictionary field must contain, keyed by field name.
+            limit (int): The maximum number of jobs returned.
+
+        Returns:
+            list: The matching documents.
+
+        Raises:
+            ValueError: A condition is not on a list or dictionary field.
+            PyMongoError: An error occurred when querying the MongoDB collection.
+        """
+        query = containment_query(conditions)
+        try:
+            return list(self.collection.find(query).limit(limit))
+        except PyMongoError as e:
+            print(f"Error querying data from MongoDB: {e}")
+            raise
+
+    def find_near(self, latitude, longitude, radius_km, query=None, limit=100):
+        """
+        Finds the documents within a distance of a location, nearest first, with the 2dsphere index
+        of the location field.
+
+        Args:
+            latitude (float): The latitude of the location.
+            longitude (float): The longitude of the location.
+            radius_km (float): The maximum distance in kilometers.
+            query (dict): An additional query the documents must match.
+            limit (int): The maximum number of documents returned.
+
+        Returns:
+            list: The matching documents, with their distance in kilometers in distance_km.
+
+        Raises:
+            PyMongoError: An error occurred when querying the MongoDB collection.
+        """
+        try:
+            return list(self.collection.aggregate([
+                {'$geoNear': {
+                    'near': {'type': 'Point', 'coordinates': [longitude, latitude]},
+                    'key': 'location',
+                    'distanceField': 'distance_km',
+                    'distanceMultiplier': 0.001,
+                    'maxDistance': radius_km * 1000,
+                    'query': query or {},
+                    'spherical': True,
+                }},
+                {'$limit': limit},
+            ]))
+        except PyMongoError as e:
+            print(f"Error querying data from MongoDB: {e}")
+            raise
+
+    def find_within(self, south, west, north, east, query=None, limit=100):
+        """
+        Finds the documents within a bounding box, with the 2dsphere index of the location field.
+        West is greater than east for a box crossing the antimeridian.
+
+        Args:
+            south (float): The minimum latitude.
+            west (float): The western longitude.
+            north (float): The maximum latitude.
+            east (float): The eastern longitude.
+            query (dict): An additional query the documents must match.
+            limit (int): The maximum number of documents returned.
+
+        Returns:
+            list: The matching documents.
+
+        Raises:
+            PyMongoError: An error occurred when querying the MongoDB collection.
+        """
+        # The polygons cover slightly more than the box, the exact bounds are checked on the fields
+        longitude_range = (
+            {'longitude': {'$gte': west, '$lte': east}} if west <= east
+            else {'$or': [{'longitude': {'$gte': west}}, {'longitude': {'$lte': east}}]}
+        )
+        filters = [
+            {'$or': [{'location': {'$geoWithin': {'$geometry': polygon}}}
+                     for polygon in geo.box_polygons(south, west, north, east)]},
+            {'latitude': {'$gte': south, '$lte': north}},
+            longitude_range,
+        ]
+        if query:
+            filters.append(query)
+        try:
+            return list(self.collection.find({'$and': filters}).limit(limit))
+        except PyMongoError as e:
+            print(f"Error querying data from MongoDB: {e}")
+            raise
+
+    def backfill_locations(self):
+        """
+        Sets the GeoJSON location field (indexed by the 2dsphere index) of the documents stored before
+        it existed, from their latitude and longitude, in a single server-side update.
+
+        Returns:
+            int: The number of updated documents.
+
+        Raises:
+            PyMongoError: An error occurred when updating data in the MongoDB collection.
+        """
+        try:
+            result = self.collection.update_many(
+                {
+                    'location': {'$exists': False},
+                    'latitude': {'$gte': -90, '$lte': 90},
+                    'longitude': {'$gte': -180, '$lte': 180},
+                },
+                [{'$set': {'location': {'type': 'Point', 'coordinates': ['$longitude', '$latitude']}}}]
+            )
+            return result.modified_count
+        except PyMongoError as e:
+            print(f"Error updating data in MongoDB: {e}")
+            raise
+
+    def backfill_native_types(self, batch_size=1000):
+        """
+        Converts the documents stored with their list and dictionary fields as JSON strings and their
+        timestamps as strings to the native BSON types (see decode_fields), in bulk updates of batch_size documents.
+
+        Returns:
+            int: The number of updated documents.
+
+        Raises:
+            PyMongoError: An error occurred when updating data in the MongoDB collection.
+        """
+        encoded = {'$or': [
+            {field_name: {'$type': 'string'}} for field_name in STRUCTURED_FIELDS + TIMESTAMP_FIELDS
+        ]}
+        projection = {field_name: True for field_name in STRUCTURED_FIELDS + TIMESTAMP_FIELDS}
+        updated = 0
+        try:
+            for documents in self.iter_data(encoded, batch_size, projection):
+                updates = []
+                for document in documents:
+                    decoded = decode_fields(document)
+                    if decoded:
+                        updates.append(UpdateOne({'_id': document['_id']}, {'$set': decoded}))
+                if updates:
+                    updated += self.collection.bulk_write(updates, ordered=False).modified_count
+            return updated
+        except PyMongoError as e:
+            print(f"Error updating data in MongoDB: {e}")
+            raise
+
     def update_data(self, query, new_values):
         """
         Updates the data in the MongoDB collection that matches the given query.
@@ -94,6 +580,34 @@ class MongoDBConnector:
             print(f"Error retrieving data from MongoDB: {e}")
             raise
 
+    def iter_data(self, query=None, batch_size=10000, projection=None):
+        """
+        Iterates over the data of the MongoDB collection in batches, without loading the whole collection into memory.
+
+        Args:
+            query (dict): The query to match the data to be retrieved (all the data if None).
+            batch_size (int): The number of documents fetched from the server per round trip.
+            projection (dict): The fields to include or exclude (all the fields if None).
+
+        Yields:
+            list: The documents of each batch.
+
+        Raises:
+            PyMongoError: An error occurred when retrieving data from the MongoDB collection.
+        """
+        try:
+            batch = []
+            for document in self.collection.find(query or {}, projection).batch_size(batch_size):
+                batch.append(document)
+                if len(batch) >= batch_size:
+                    yield batch
+                    batch = []
+            if batch:
+                yield batch
+        except PyMongoError as e:
+            print(f"Error retrieving data from MongoDB: {e}")
+            raise
+
     def close_connection(self):
         """
         Closes the connection to the MongoDB database.
@@ -0,0 +1,89 @@
+import pymongo
+import os
+import threading
+from pymongo.errors import PyMongoError
+from infra.mongodb_connector import MongoDBConnector
+
+# The process-wide client, created by the first pooled connector
+_client = None
+_client_lock = threading.Lock()
+
+def get_shared_client(max_size=10, min_size=0, timeout=30.0, heartbeat_interval=10.0):
+    """
+    Returns the process-wide MongoDB client, creating it on first use.
+    The options of the first call are kept for the lifetime of the client.
+
+    MongoClient is thread-safe and keeps its own connection pool, which is bounded here.
+
+    Args:
+        max_size (int): The maximum number of connections of the pool (maxPoolSize).
+        min_size (int): The number of connections kept open (minPoolSize).
+        timeout (float): The number of seconds to wait for a free connection (waitQueueTimeoutMS).
+        heartbeat_interval (float): The number of seconds between server health checks (heartbeatFrequencyMS).
+
+    Returns:
+        pymongo.MongoClient: The MongoDB client object.
+
+    Raises:
+        PyMongoError: An error occurred when connecting to the MongoDB database.
+    """
+    global _client
+    with _client_lock:
+        if _client is None:
+            try:
+                _client = pymongo.MongoClient(
+                    host=os.getenv('MONGO_HOST'),
+                    port=int(os.getenv('MONGO_PORT')),
+                    username=os.getenv('MONGO_INITDB_ROOT_USERNAME'),
+                    password=os.getenv('MONGO_INITDB_ROOT_PASSWORD'),
+                    maxPoolSize=max_size,
+                    minPoolSize=min_size,
+                    waitQueueTimeoutMS=int(timeout * 1000),
+                    heartbeatFrequencyMS=int(heartbeat_interval * 1000)
+                )
+            except PyMongoError as e:
+                print(f"Error connecting to MongoDB: {e}")
+                raise
+        return _client
+
+def close_shared_client():
+    """
+    Closes the process-wide MongoDB client and its connection pool.
+    """
+    global _client
+    with _client_lock:
+        if _client is not None:
+            _client.close()
+        _client = None
+
+class PooledMongoDBConnector(MongoDBConnector):
+    """
+    MongoDBConnector backed by the process-wide MongoDB client, so that all connectors
+    share one bounded connection pool and one set of server monitors.
+    """
+    def __init__(self, write_concern=None, max_size=10, min_size=0, timeout=30.0, heartbeat_interval=10.0):
+        """
+        Args:
+            write_concern (dict): Optional write concern options (e.g. {'w': 1, 'j': False}) for the collection.
+            max_size (int): The maximum number of connections of the shared pool.
+            min_size (int): The number of connections the shared pool keeps open.
+            timeout (float): The number of seconds to wait for a free connection.
+            heartbeat_interval (float): The number of seconds between server health checks.
+        """
+        self.pool_options = (max_size, min_size, timeout, heartbeat_interval)
+        super().__init__(write_concern=write_concern)
+
+    def connect_mongodb(self):
+        """
+        Returns the shared MongoDB client.
+
+        Returns:
+            pymongo.MongoClient: The MongoDB client object.
+        """
+        return get_shared_client(*self.pool_options)
+
+    def close_connection(self):
+        """
+        Releases the connector. The shared client stays open (see close_shared_client).
+        """
+        self.collection = None
@@ -0,0 +1,130 @@
+import psycopg2
+import psycopg2.pool
+import os
+import threading
+from infra.postgresql_connector import PostgreSQLConnector
+
+# The process-wide connection pool, created by the first pooled connector
+_pool = None
+_pool_slots = None
+_pool_lock = threading.Lock()
+
+def get_shared_pool(min_size=1, max_size=10):
+    """
+    Returns the process-wide PostgreSQL connection pool, creating it on first use.
+    The sizes of the first call are kept for the lifetime of the pool.
+
+    Args:
+        min_size (int): The number of connections opened up front.
+        max_size (int): The maximum number of connections checked out at once.
+
+    Returns:
+        tuple: The psycopg2 ThreadedConnectionPool and the semaphore bounding the checkouts.
+    """
+    global _pool, _pool_slots
+    with _pool_lock:
+        if _pool is None or _pool.closed:
+            _pool = psycopg2.pool.ThreadedConnectionPool(
+                min_size,
+                max_size,
+                dbname=os.getenv("SQL_NAME"),
+                user=os.getenv("SQL_USER"),
+                password=os.getenv("SQL_PASSWORD"),
+                host=os.getenv("SQL_HOST"),
+                port=os.getenv("SQL_PORT"),
+            )
+            _pool_slots = threading.BoundedSemaphore(max_size)
+        return _pool, _pool_slots
+
+def close_shared_pool():
+    """
+    Closes all the connections of the process-wide PostgreSQL connection pool.
+    """
+    global _pool
+    with _pool_lock:
+        if _pool is not None and not _pool.closed:
+            _pool.closeall()
+        _pool = None
+
+class PooledPostgreSQLConnector(PostgreSQLConnector):
+    """
+    PostgreSQLConnector that checks out its connection from the process-wide pool
+    instead of opening a dedicated one, and returns it on close_connection.
+
+    Each connector holds one connection, so connectors can be used from different threads.
+    Once max_size connections are checked out, creating a connector blocks until one is
+    returned (or raises psycopg2.pool.PoolError after checkout_timeout seconds).
+    """
+    def __init__(self, min_size=1, max_size=10, checkout_timeout=30.0):
+        """
+        Args:
+            min_size (int): The number of connections the shared pool opens up front.
+            max_size (int): The maximum number of connections of the shared pool.
+            checkout_timeout (float): The number of seconds to wait for a free connection.
+        """
+        self.pool, self.pool_slots = get_shared_pool(min_size, max_size)
+        self.checkout_timeout = checkout_timeout
+        super().__init__()
+
+    def connect_postgresql(self):
+        """
+        Checks out a healthy connection from the shared pool. Connections that were closed
+        or fail the health check are discarded and replaced by new ones.
+
+        Returns:
+            psycopg2.extensions.connection: The connection object to the PostgreSQL database.
+
+        Raises:
+            psycopg2.pool.PoolError: No connection was returned to the pool within checkout_timeout.
+        """
+        if not self.pool_slots.acquire(timeout=self.checkout_timeout):
+            raise psycopg2.pool.PoolError("Timed out waiting for a pooled PostgreSQL connection")
+        try:
+            for _ in range(2):
+                conn = self.pool.getconn()
+                if self.check_connection(conn):
+                    return conn
+                self.pool.putconn(conn, close=True)
+            return self.pool.getconn()
+        except Exception:
+            self.pool_slots.release()
+            raise
+
+    def check_connection(self, conn):
+        """
+        Checks that a pooled connection is still usable (SELECT 1).
+
+        Returns:
+            bool: True if the connection is healthy.
+        """
+        if conn.closed:
+            return False
+        try:
+            with conn.cursor() as cursor:
+                cursor.execute("SELECT 1")
+            conn.rollback()
+            return True
+        except psycopg2.Error:
+            return False
+
+    def ensure_connection(self):
+        """
+        Replaces a connection that was closed (e.g. by a server restart) with a healthy pooled one.
+        """
+        if self.conn.closed:
+            self.pool.putconn(self.conn, close=True)
+            self.pool_slots.release()
+            self.conn = self.connect_postgresql()
+            self.cursor = self.conn.cursor()
+
+    def close_connection(self):
+        """
+        Commits the pending transaction and returns the connection to the shared pool.
+        """
+        try:
+            if not self.conn.closed:
+                self.conn.commit()
+                self.cursor.close()
+            self.pool.putconn(self.conn, close=bool(self.conn.closed))
+        finally:
+            self.pool_slots.release()
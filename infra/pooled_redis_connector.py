@@ -0,0 +1,76 @@
+import redis
+import os
+import threading
+from infra.redis_connector import RedisConnector
+
+# The process-wide connection pool, created by the first pooled connector
+_pool = None
+_pool_lock = threading.Lock()
+
+def get_shared_pool(max_size=10, timeout=30.0, health_check_interval=30):
+    """
+    Returns the process-wide Redis connection pool, creating it on first use.
+    The options of the first call are kept for the lifetime of the pool.
+
+    Args:
+        max_size (int): The maximum number of connections of the pool.
+        timeout (float): The number of seconds to wait for a free connection before raising ConnectionError.
+        health_check_interval (int): The number of idle seconds after which a connection is checked (PING) before use.
+
+    Returns:
+        redis.BlockingConnectionPool: The connection pool.
+    """
+    global _pool
+    with _pool_lock:
+        if _pool is None:
+            _pool = redis.BlockingConnectionPool(
+                host=os.getenv('REDIS_HOST'),
+                port=os.getenv('REDIS_PORT'),
+                db=os.getenv('REDIS_DB') or 0,
+                max_connections=max_size,
+                timeout=timeout,
+                health_check_interval=health_check_interval
+            )
+        return _pool
+
+def close_shared_pool():
+    """
+    Disconnects all the connections of the process-wide Redis connection pool.
+    """
+    global _pool
+    with _pool_lock:
+        if _pool is not None:
+            _pool.disconnect()
+        _pool = None
+
+class PooledRedisConnector(RedisConnector):
+    """
+    RedisConnector backed by the process-wide blocking connection pool.
+
+    Every command checks out a connection for its duration only, so connectors (and threads)
+    share at most max_size connections and wait for a free one when all are in use.
+    """
+    def __init__(self, max_size=10, timeout=30.0, health_check_interval=30):
+        """
+        Args:
+            max_size (int): The maximum number of connections of the shared pool.
+            timeout (float): The number of seconds to wait for a free connection.
+            health_check_interval (int): The number of idle seconds after which a connection is checked before use.
+        """
+        self.pool = get_shared_pool(max_size, timeout, health_check_interval)
+        super().__init__()
+
+    def connect_redis(self):
+        """
+        Creates a client of the Redis database on the shared connection pool.
+
+        Returns:
+            redis.StrictRedis: The connection object to the Redis database.
+        """
+        return redis.StrictRedis(connection_pool=self.pool)
+
+    def close_connection(self):
+        """
+        Releases the client. The connections stay open in the shared pool (see close_shared_pool).
+        """
+        self.conn = None
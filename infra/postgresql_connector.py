@@ -1,5 +1,276 @@
 import psycopg2
 import os
+from psycopg2.extras import Json, execute_values
+from infra import geo
+from infra.description_store import dictionary_id
+
+# List and dictionary fields, stored as JSONB
+JSON_COLUMNS = ['languages', 'categories', 'tags', 'tags5', 'tags6', 'benefits', 'meta_data', 'category']
+
+# Serializes the schema changes of concurrent crawlers: concurrent CREATE OR REPLACE FUNCTION statements and
+# index builds fail, so each schema query first takes this lock, held until the end of its transaction
+SCHEMA_LOCK_QUERY = """
+DO $$ BEGIN PERFORM pg_advisory_xact_lock(%d); END $$;
+""" % 0x6a6f6273
+
+CREATE_JOBS_TABLE_QUERY = SCHEMA_LOCK_QUERY + """
+CREATE TABLE IF NOT EXISTS raw_table (
+    id SERIAL PRIMARY KEY,
+    slug TEXT,
+    language TEXT,
+    languages JSONB,
+    req_id TEXT,
+    title TEXT,
+    description TEXT,
+    street_address TEXT,
+    city TEXT,
+    state TEXT,
+    country_code TEXT,
+    postal_code TEXT,
+    location_type TEXT,
+    latitude DOUBLE PRECISION,
+    longitude DOUBLE PRECISION,
+    categories JSONB,
+    tags JSONB,
+    tags5 JSONB,
+    tags6 JSONB,
+    brand TEXT,
+    promotion_value TEXT,
+    salary_currency TEXT,
+    salary_value NUMERIC,
+    salary_min_value NUMERIC,
+    salary_max_value NUMERIC,
+    benefits JSONB,
+    employment_type TEXT,
+    hiring_organization TEXT,
+    source TEXT,
+    apply_url TEXT,
+    internal BOOLEAN,
+    searchable BOOLEAN,
+    applyable BOOLEAN,
+    li_easy_applyable BOOLEAN,
+    ats_code TEXT,
+    meta_data JSONB,
+    update_date TIMESTAMPTZ,
+    create_date TIMESTAMPTZ,
+    category JSONB,
+    full_location TEXT,
+    short_location TEXT,
+    content_hash TEXT,
+    description_hash TEXT
+);
+ALTER TABLE raw_table ADD COLUMN IF NOT EXISTS content_hash TEXT;
+ALTER TABLE raw_table ADD COLUMN IF NOT EXISTS description_hash TEXT;
+
+-- Compressed descriptions (DESCRIPTION_STORAGE = "compressed"): each distinct description is stored once,
+-- keyed by its hash and referenced by the description_hash of the jobs, with the preset dictionaries
+-- it may be compressed with. The bodies are already compressed, so they are not compressed again by TOAST
+CREATE TABLE IF NOT EXISTS job_descriptions (
+    hash TEXT PRIMARY KEY,
+    dictionary_id TEXT,
+    body BYTEA NOT NULL
+);
+ALTER TABLE job_descriptions ALTER COLUMN body SET STORAGE EXTERNAL;
+CREATE TABLE IF NOT EXISTS job_description_dictionaries (
+    id TEXT PRIMARY KEY,
+    dictionary BYTEA NOT NULL
+);
+
+-- Migrates the list and dictionary fields of existing tables from JSON-in-TEXT to JSONB,
+-- values that are not valid JSON are kept as JSON strings
+CREATE OR REPLACE FUNCTION raw_table_try_jsonb(value TEXT) RETURNS JSONB AS $$
+BEGIN
+    RETURN NULLIF(value, '')::JSONB;
+EXCEPTION WHEN others THEN
+    RETURN to_jsonb(value);
+END;
+$$ LANGUAGE plpgsql IMMUTABLE;
+
+DO $$
+DECLARE
+    column_record RECORD;
+BEGIN
+    FOR column_record IN
+        SELECT column_name FROM information_schema.columns
+        WHERE table_name = 'raw_table' AND data_type = 'text'
+            AND column_name IN (%(json_columns)s)
+    LOOP
+        EXECUTE format(
+            'ALTER TABLE raw_table ALTER COLUMN %%I TYPE JSONB USING raw_table_try_jsonb(%%I)',
+            column_record.column_name, column_record.column_name
+        );
+    END LOOP;
+END $$;
+
+%(gin_indexes)s
+
+-- Full-text search: the weighted tsvector of the title (A), hiring organization (B) and description (C),
+-- computed by PostgreSQL whenever a row is inserted or updated, with a GIN index for @@ matches
+-- and B-tree indexes for the filters of search_jobs. Adding the column rewrites an existing table once
+ALTER TABLE raw_table ADD COLUMN IF NOT EXISTS search_vector TSVECTOR GENERATED ALWAYS AS (
+    setweight(to_tsvector('english', coalesce(title, '')), 'A') ||
+    setweight(to_tsvector('english', coalesce(hiring_organization, '')), 'B') ||
+    setweight(to_tsvector('english', coalesce(description, '')), 'C')
+) STORED;
+CREATE INDEX IF NOT EXISTS raw_table_search_vector_gin ON raw_table USING GIN (search_vector);
+CREATE INDEX IF NOT EXISTS raw_table_update_date_idx ON raw_table (update_date);
+CREATE INDEX IF NOT EXISTS raw_table_country_code_idx ON raw_table (country_code, update_date);
+CREATE INDEX IF NOT EXISTS raw_table_employment_type_idx ON raw_table (employment_type, update_date);
+
+-- Geohash of a location (the same as infra.geo.encode), NULL for missing or out of range coordinates
+CREATE OR REPLACE FUNCTION raw_table_geohash(lat DOUBLE PRECISION, lon DOUBLE PRECISION, hash_length INTEGER)
+RETURNS TEXT AS $$
+DECLARE
+    lat_bits INTEGER := 5 * hash_length / 2;
+    lon_bits INTEGER := 5 * hash_length - 5 * hash_length / 2;
+    lat_index BIGINT;
+    lon_index BIGINT;
+    code BIGINT := 0;
+    geohash TEXT := '';
+BEGIN
+    IF lat IS NULL OR lon IS NULL OR NOT lat BETWEEN -90 AND 90 OR NOT lon BETWEEN -180 AND 180 THEN
+        RETURN NULL;
+    END IF;
+    lat_index := least((1::BIGINT << lat_bits) - 1, greatest(0,
+        floor((lat + 90) / (180::DOUBLE PRECISION / (1::BIGINT << lat_bits)))));
+    lon_index := least((1::BIGINT << lon_bits) - 1, greatest(0,
+        floor((lon + 180) / (360::DOUBLE PRECISION / (1::BIGINT << lon_bits)))));
+    -- Interleaves the bits of the cell indexes, longitude first
+    FOR i IN 0 .. 5 * hash_length - 1 LOOP
+        IF mod(i, 2) = 0 THEN
+            code := (code << 1) | ((lon_index >> (lon_bits - 1 - i / 2)) & 1);
+        ELSE
+            code := (code << 1) | ((lat_index >> (lat_bits - 1 - i / 2)) & 1);
+        END IF;
+    END LOOP;
+    FOR i IN REVERSE hash_length - 1 .. 0 LOOP
+        geohash := geohash || substr('%(geohash_alphabet)s', ((code >> (5 * i)) & 31)::INTEGER + 1, 1);
+    END LOOP;
+    RETURN geohash;
+END;
+$$ LANGUAGE plpgsql IMMUTABLE;
+
+-- Location searches: the geohash of each job, computed by PostgreSQL whenever a row is inserted or updated,
+-- with a B-tree index so that the jobs of a bounding box are read as a few geohash prefix ranges
+-- (see find_jobs_near and find_jobs_within). The "C" collation sorts the geohashes like their cells
+ALTER TABLE raw_table ADD COLUMN IF NOT EXISTS geohash TEXT COLLATE "C" GENERATED ALWAYS AS (
+    raw_table_geohash(latitude, longitude, %(geohash_length)s)
+) STORED;
+CREATE INDEX IF NOT EXISTS raw_table_geohash_idx ON raw_table (geohash);
+""" % {
+    'json_columns': ', '.join(f"'{column}'" for column in JSON_COLUMNS),
+    'gin_indexes': '\n'.join(
+        f'CREATE INDEX IF NOT EXISTS raw_table_{column}_gin ON raw_table USING GIN ({column} jsonb_path_ops);'
+        for column in JSON_COLUMNS
+    ),
+    'geohash_alphabet': geo.BASE32,
+    'geohash_length': geo.MAX_PRECISION,
+}
+
+# The columns search_jobs returns, besides the rank
+SEARCH_RESULT_COLUMNS = [
+    'req_id', 'title', 'hiring_organization', 'short_location', 'country_code', 'employment_type',
+    'update_date', 'apply_url',
+]
+
+# The columns search_jobs filters on and sorts by
+SEARCH_DATE_COLUMNS = ['update_date', 'create_date']
+
+# The columns find_jobs_near and find_jobs_within return (besides the distance)
+GEO_RESULT_COLUMNS = [
+    'req_id', 'title', 'hiring_organization', 'short_location', 'country_code', 'latitude', 'longitude',
+    'update_date', 'apply_url',
+]
+
+# The great-circle distance in kilometers between the location of a job and the point of the parameters
+# (latitude, latitude, longitude)
+DISTANCE_KM_SQL = (
+    f'2 * {geo.EARTH_RADIUS_KM} * asin(least(1, sqrt('
+    'power(sin(radians(latitude - %s) / 2), 2) + '
+    'cos(radians(%s)) * cos(radians(latitude)) * power(sin(radians(longitude - %s) / 2), 2))))'
+)
+
+def geohash_condition(south, west, north, east):
+    """
+    Builds the condition selecting the jobs of the geohash cells covering a bounding box,
+    answered by a few range scans of the geohash index.
+
+    Returns:
+        tuple: The condition and its parameters.
+    """
+    ranges = geo.cover(south, west, north, east)
+    condition = ' OR '.join('(geohash >= %s AND geohash < %s)' for _ in ranges)
+    return f'({condition})', [bound for geohash_range in ranges for bound in geohash_range]
+
+def export_jobs_query(columns):
+    """
+    Builds the query exporting the given columns of raw_table, followed by the dictionary_id and body
+    of the compressed description of each job (NULL for the jobs storing their description inline),
+    so that the descriptions are sent compressed and restored by the client (see restore_descriptions).
+
+    Args:
+        columns (list): The column names or expressions.
+
+    Returns:
+        str: The query.
+    """
+    return (
+        f"SELECT {', '.join(columns)}, job_descriptions.dictionary_id, job_descriptions.body FROM raw_table "
+        "LEFT JOIN job_descriptions ON job_descriptions.hash = raw_table.description_hash;"
+    )
+
+def adapt_json_values(field_names, values, adapter=Json):
+    """
+    Wraps the values of the JSONB columns with the driver's JSON adapter, so that lists, dictionaries
+    and plain strings are all sent as JSON documents.
+
+    Args:
+        field_names (str): The comma-separated field names.
+        values (list): The values of the row.
+        adapter (callable): The JSON adapter of the driver (psycopg2.extras.Json by default).
+
+    Returns:
+        list: The adapted values.
+    """
+    names = [name.strip() for name in field_names.split(',')]
+    return [
+        adapter(value) if value is not None and name in JSON_COLUMNS else value
+        for name, value in zip(names, values)
+    ]
+
+# Deletes all but the most recently inserted row of each req_id, then creates the unique index on req_id
+CREATE_UPSERT_INDEX_QUERY = SCHEMA_LOCK_QUERY + """
+DO $$
+BEGIN
+    IF NOT EXISTS (SELECT 1 FROM pg_indexes WHERE indexname = 'raw_table_req_id_key') THEN
+        DELETE FROM raw_table a USING raw_table b WHERE a.req_id = b.req_id AND a.id < b.id;
+        CREATE UNIQUE INDEX raw_table_req_id_key ON raw_table (req_id);
+    END IF;
+END $$;
+"""
+
+def build_upsert_query(field_names, values_clause):
+    """
+    Builds an INSERT ... ON CONFLICT (req_id) query that updates the existing row of the job
+    only if its content hash changed and the incoming row is not older than the stored one.
+
+    Args:
+        field_names (str): The comma-separated field names.
+        values_clause (str): The VALUES placeholders, e.g. '%s' for execute_values.
+
+    Returns:
+        str: The upsert query.
+    """
+    updates = ', '.join(
+        f'{name} = EXCLUDED.{name}' for name in (name.strip() for name in field_names.split(',')) if name != 'req_id'
+    )
+    return (
+        f'INSERT INTO raw_table ({field_names}) VALUES {values_clause} '
+        f'ON CONFLICT (req_id) DO UPDATE SET {updates} '
+        'WHERE raw_table.content_hash IS DISTINCT FROM EXCLUDED.content_hash '
+        'AND (raw_table.update_date IS NULL OR EXCLUDED.update_date IS NULL '
+        'OR EXCLUDED.update_date >= raw_table.update_date)'
+    )
 
 class PostgreSQLConnector:
     def __init__(self):
@@ -21,6 +292,14 @@ class PostgreSQLConnector:
             port=os.getenv("SQL_PORT"),
         )
 
+    def ensure_connection(self):
+        """
+        Reconnects to the PostgreSQL database if the connection was closed (e.g. by a server restart).
+        """
+        if self.conn.closed:
+            self.conn = self.connect_postgresql()
+            self.cursor = self.conn.cursor()
+
     def get_cursor(self):
         """
         Returns the cursor object for the PostgreSQL connection.
@@ -63,6 +342,39 @@ class PostgreSQLConnector:
             print(f"Database error: {e}")
             raise
 
+    def stream_query(self, query, params=None, batch_size=10000):
+        """
+        Executes the given query on a named server-side cursor and yields the result in batches,
+        so that the result set is never loaded into memory at once.
+
+        Args:
+            query (str): The SQL query to be executed.
+            params (tuple): The parameters to be passed to the query.
+            batch_size (int): The number of rows fetched from the server per round trip.
+
+        Yields:
+            tuple: The column names and the list of rows of each batch.
+
+        Raises:
+            psycopg2.Error: An error occurred while executing the query.
+        """
+        cursor = self.conn.cursor(name=f'stream_cursor_{id(self)}')
+        cursor.itersize = batch_size
+        try:
+            cursor.execute(query, params)
+            while True:
+                rows = cursor.fetchmany(batch_size)
+                if not rows:
+                    break
+                yield [desc[0] for desc in cursor.description], rows
+        except psycopg2.Error as e:
+            print(f"Database error: {e}")
+            raise
+        finally:
+            cursor.close()
+            # End the transaction the named cursor lives in
+            self.conn.rollback()
+
     def close_connection(self):
         """
         Closes the connection to the PostgreSQL database.
@@ -77,52 +389,7 @@ class PostgreSQLConnector:
         Creates the jobs table in the PostgreSQL database.
         """
 
-        create_table_query = """
-        CREATE TABLE IF NOT EXISTS raw_table (
-            id SERIAL PRIMARY KEY,
-            slug TEXT,
-            language TEXT,
-            languages TEXT,
-            req_id TEXT,
-            title TEXT,
-            description TEXT,
-            street_address TEXT,
-            city TEXT,
-            state TEXT,
-            country_code TEXT,
-            postal_code TEXT,
-            location_type TEXT,
-            latitude DOUBLE PRECISION,
-            longitude DOUBLE PRECISION,
-            categories TEXT,
-            tags TEXT,
-            tags5 TEXT,
-            tags6 TEXT,
-            brand TEXT,
-            promotion_value TEXT,
-            salary_currency TEXT,
-            salary_value NUMERIC,
-            salary_min_value NUMERIC,
-            salary_max_value NUMERIC,
-            benefits TEXT,
-            employment_type TEXT,
-            hiring_organization TEXT,
-            source TEXT,
-            apply_url TEXT,
-            internal BOOLEAN,
-            searchable BOOLEAN,
-            applyable BOOLEAN,
-            li_easy_applyable BOOLEAN,
-            ats_code TEXT,
-            meta_data TEXT,
-            update_date TIMESTAMPTZ,
-            create_date TIMESTAMPTZ,
-            category TEXT,
-            full_location TEXT,
-            short_location TEXT
-        );
-        """
-        self.execute_query(create_table_query)
+        self.execute_query(CREATE_JOBS_TABLE_QUERY)
     
     def insert_jobs_data(self, field_names, field_values, values):
         """
@@ -135,4 +402,306 @@ class PostgreSQLConnector:
         """
 
         insert_query = f'INSERT INTO raw_table ({field_names}) VALUES ({field_values})'
-        self.execute_query(insert_query, values)
+        self.execute_query(insert_query, adapt_json_values(field_names, values))
+
+    def insert_jobs_batch(self, field_names, rows, page_size=1000):
+        """
+        Inserts multiple rows of job data using multi-row VALUES statements and commits once for the whole batch.
+
+        Args:
+            field_names (str): The comma-separated field names.
+            rows (list): The list of value sequences to be inserted, one per job.
+            page_size (int): The maximum number of rows sent in a single statement.
+
+        Raises:
+            psycopg2.Error: An error occurred while inserting the batch, the whole batch is rolled back.
+        """
+
+        insert_query = f'INSERT INTO raw_table ({field_names}) VALUES %s'
+        try:
+            rows = [adapt_json_values(field_names, values) for values in rows]
+            execute_values(self.cursor, insert_query, rows, page_size=page_size)
+            self.conn.commit()
+        except psycopg2.Error as e:
+            self.conn.rollback()
+            print(f"Database error: {e}")
+            raise
+
+    def create_upsert_index(self):
+        """
+        Creates the unique index on req_id required by the upsert mode.
+
+        Existing tables may already contain several rows of the same job, so all but the
+        most recently inserted row of each req_id are deleted before the index is created.
+        """
+
+        self.execute_query(CREATE_UPSERT_INDEX_QUERY)
+
+    def upsert_jobs_batch(self, field_names, rows, page_size=1000):
+        """
+        Inserts or updates multiple rows of job data keyed on req_id and commits once for the whole batch.
+
+        Rows whose content hash did not change, or which are older than the stored row, leave it untouched.
+        The rows must have distinct req_ids.
+
+        Args:
+            field_names (str): The comma-separated field names (must include req_id and content_hash).
+            rows (list): The list of value sequences to be upserted, one per job.
+            page_size (int): The maximum number of rows sent in a single statement.
+
+        Raises:
+            psycopg2.Error: An error occurred while upserting the batch, the whole batch is rolled back.
+        """
+
+        try:
+            rows = [adapt_json_values(field_names, values) for values in rows]
+            execute_values(self.cursor, build_upsert_query(field_names, '%s'), rows, page_size=page_size)
+            self.conn.commit()
+        except psycopg2.Error as e:
+            self.conn.rollback()
+            print(f"Database error: {e}")
+            raise
+
+    def delete_jobs(self, jobs, page_size=1000):
+        """
+        Deletes the given versions of jobs, e.g. to undo writes that failed on the other database.
+
+        Args:
+            jobs (list): The (req_id, content_hash) of the jobs to delete.
+            page_size (int): The maximum number of jobs sent in a single statement.
+
+        Raises:
+            psycopg2.Error: An error occurred while deleting the jobs, they are all rolled back.
+        """
+
+        delete_query = (
+            'DELETE FROM raw_table USING (VALUES %s) AS deleted (req_id, content_hash) '
+            'WHERE raw_table.req_id = deleted.req_id AND raw_table.content_hash = deleted.content_hash'
+        )
+        try:
+            execute_values(self.cursor, delete_query, [tuple(job) for job in jobs], page_size=page_size)
+            self.conn.commit()
+        except psycopg2.Error as e:
+            self.conn.rollback()
+            print(f"Database error: {e}")
+            raise
+
+    def insert_descriptions(self, blobs, page_size=1000):
+        """
+        Stores compressed descriptions, skipping those already stored (they are content-addressed).
+
+        Args:
+            blobs (list): The DescriptionBlobs.
+            page_size (int): The maximum number of descriptions sent in a single statement.
+
+        Raises:
+            psycopg2.Error: An error occurred while inserting the descriptions, they are all rolled back.
+        """
+
+        insert_query = (
+            'INSERT INTO job_descriptions (hash, dictionary_id, body) VALUES %s ON CONFLICT (hash) DO NOTHING'
+        )
+        try:
+            execute_values(self.cursor, insert_query, [tuple(blob) for blob in blobs], page_size=page_size)
+            self.conn.commit()
+        except psycopg2.Error as e:
+            self.conn.rollback()
+            print(f"Database error: {e}")
+            raise
+
+    def insert_description_dictionary(self, dictionary):
+        """
+        Stores a preset dictionary of the compressed descriptions, if it is not stored yet.
+        """
+
+        self.execute_query(
+            'INSERT INTO job_description_dictionaries (id, dictionary) VALUES (%s, %s) ON CONFLICT (id) DO NOTHING',
+            (dictionary_id(dictionary), dictionary)
+        )
+
+    def description_dictionaries(self):
+        """
+        Returns the preset dictionaries of the compressed descriptions.
+
+        Returns:
+            list: The dictionaries (bytes).
+        """
+
+        rows = self.execute_query('SELECT dictionary FROM job_description_dictionaries')
+        return [bytes(row[0]) for row in rows]
+
+    def stored_columns(self):
+        """
+        Returns the columns of raw_table in table order, without the columns PostgreSQL generates
+        from the others (e.g. search_vector), which exports do not need.
+
+        Returns:
+            list: The column names.
+        """
+
+        rows = self.execute_query(
+            "SELECT column_name FROM information_schema.columns "
+            "WHERE table_name = 'raw_table' AND is_generated = 'NEVER' ORDER BY ordinal_position"
+        )
+        return [row[0] for row in rows]
+
+    def has_compressed_descriptions(self):
+        """
+        Checks if descriptions are stored compressed (DESCRIPTION_STORAGE = "compressed"), which the
+        search_vector of their jobs does not cover.
+
+        Returns:
+            bool: Whether the job_descriptions table has rows.
+        """
+        if not self.execute_query("SELECT to_regclass('job_descriptions') IS NOT NULL")[0][0]:
+            return False
+        return self.execute_query('SELECT EXISTS (SELECT 1 FROM job_descriptions)')[0][0]
+
+    def search_jobs(self, text, country_code=None, employment_type=None, since=None, until=None,
+                    date_column='update_date', order_by='rank', limit=20, offset=0, rank_window=10000):
+        """
+        Searches the jobs by keywords with the full-text index of search_vector, ranked by relevance
+        (title matches first, then hiring organization, then description) or by date.
+
+        The keywords use the web search syntax: words are ANDed, "quoted phrases" match in order,
+        'or' separates alternatives and a leading '-' excludes a word.
+        Ranking reads the tsvector of every match, so with rank_window only the most recent matches
+        are ranked, which keeps very common keywords fast.
+
+        Args:
+            text (str): The keywords.
+            country_code (str): Only the jobs of this country code.
+            employment_type (str): Only the jobs of this employment type (e.g. 'FULL_TIME').
+            since (datetime): Only the jobs dated on or after this date.
+            until (datetime): Only the jobs dated before this date.
+            date_column (str): The date of the since/until filters and of the date order, one of SEARCH_DATE_COLUMNS.
+            order_by (str): 'rank' or 'date' (most recent first).
+            limit (int): The maximum number of jobs returned.
+            offset (int): The number of jobs skipped, for paging.
+            rank_window (int): The number of most recent matches ranked, 0 to rank all of them.
+
+        Returns:
+            list: The SEARCH_RESULT_COLUMNS of the matching jobs followed by their rank.
+
+        Raises:
+            ValueError: Unknown date_column or order_by.
+        """
+
+        if date_column not in SEARCH_DATE_COLUMNS:
+            raise ValueError(f"Not a date column: {date_column}")
+        if order_by not in ('rank', 'date'):
+            raise ValueError(f"Unknown order: {order_by}")
+
+        conditions = ['search_vector @@ query']
+        params = {'text': text, 'limit': limit, 'offset': offset, 'rank_window': rank_window or None}
+        filters = (
+            ('country_code = %(country_code)s', 'country_code', country_code),
+            ('employment_type = %(employment_type)s', 'employment_type', employment_type),
+            (f'{date_column} >= %(since)s', 'since', since),
+            (f'{date_column} < %(until)s', 'until', until),
+        )
+        for condition, name, value in filters:
+            if value is not None:
+                conditions.append(condition)
+                params[name] = value
+
+        columns = ', '.join(SEARCH_RESULT_COLUMNS)
+        recent_first = f'{date_column} DESC NULLS LAST'
+        if order_by == 'rank':
+            query = (
+                f'SELECT {columns}, ts_rank_cd(search_vector, query) AS rank FROM ('
+                f'SELECT {columns}, search_vector, query '
+                f"FROM raw_table, websearch_to_tsquery('english', %(text)s) AS query "
+                f"WHERE {' AND '.join(conditions)} ORDER BY {recent_first} LIMIT %(rank_window)s"
+                f') AS matches ORDER BY rank DESC, {recent_first} LIMIT %(limit)s OFFSET %(offset)s'
+            )
+        else:
+            query = (
+                f'SELECT {columns}, ts_rank_cd(search_vector, query) AS rank '
+                f"FROM raw_table, websearch_to_tsquery('english', %(text)s) AS query "
+                f"WHERE {' AND '.join(conditions)} ORDER BY {recent_first} LIMIT %(limit)s OFFSET %(offset)s"
+            )
+        return self.execute_query(query, params)
+
+    def find_jobs_containing(self, conditions, limit=100):
+        """
+        Finds the jobs whose JSONB fields contain the given values (@> containment),
+        answered by the GIN indexes of these fields.
+
+        Example: {'tags': ['python'], 'categories': [{'name': 'Engineering'}]} finds the jobs
+        tagged python in the Engineering category.
+
+        Args:
+            conditions (dict): The JSON value each JSONB field must contain, keyed by field name.
+            limit (int): The maximum number of jobs returned.
+
+        Returns:
+            list: The matching rows.
+
+        Raises:
+            ValueError: A condition is not on a JSONB field.
+        """
+
+        for field_name in conditions:
+            if field_name not in JSON_COLUMNS:
+                raise ValueError(f"Not a JSONB field: {field_name}")
+        where = ' AND '.join(f'{field_name} @> %s' for field_name in conditions) or 'TRUE'
+        query = f'SELECT * FROM raw_table WHERE {where} LIMIT %s'
+        return self.execute_query(query, [Json(value) for value in conditions.values()] + [limit])
+
+    def find_jobs_near(self, latitude, longitude, radius_km, limit=100):
+        """
+        Finds the jobs within a distance of a location, nearest first. Only the jobs of the geohash
+        cells covering the circle are read (with the geohash index), then filtered by their exact distance.
+
+        Args:
+            latitude (float): The latitude of the location.
+            longitude (float): The longitude of the location.
+            radius_km (float): The maximum distance in kilometers.
+            limit (int): The maximum number of jobs returned.
+
+        Returns:
+            list: The GEO_RESULT_COLUMNS of the jobs followed by their distance in kilometers.
+
+        Raises:
+            ValueError: The location is out of range.
+        """
+
+        if not geo.valid_coordinates(latitude, longitude):
+            raise ValueError(f"Invalid location: {latitude}, {longitude}")
+        condition, params = geohash_condition(*geo.bounding_box(latitude, longitude, radius_km))
+        query = (
+            f"SELECT * FROM (SELECT {', '.join(GEO_RESULT_COLUMNS)}, {DISTANCE_KM_SQL} AS distance_km "
+            f"FROM raw_table WHERE {condition}) AS candidates "
+            "WHERE distance_km <= %s ORDER BY distance_km LIMIT %s"
+        )
+        return self.execute_query(query, [latitude, latitude, longitude] + params + [radius_km, limit])
+
+    def find_jobs_within(self, south, west, north, east, limit=100):
+        """
+        Finds the jobs within a bounding box, reading only the jobs of the geohash cells covering it
+        (with the geohash index). West is greater than east for a box crossing the antimeridian.
+
+        Args:
+            south (float): The minimum latitude.
+            west (float): The western longitude.
+            north (float): The maximum latitude.
+            east (float): The eastern longitude.
+            limit (int): The maximum number of jobs returned.
+
+        Returns:
+            list: The GEO_RESULT_COLUMNS of the jobs.
+
+        Raises:
+            ValueError: The bounding box is out of range.
+        """
+
+        if not (geo.valid_coordinates(south, west) and geo.valid_coordinates(north, east) and south <= north):
+            raise ValueError(f"Invalid bounding box: {south}, {west}, {north}, {east}")
+        condition, params = geohash_condition(south, west, north, east)
+        longitude_condition = 'longitude BETWEEN %s AND %s' if west <= east else '(longitude >= %s OR longitude <= %s)'
+        query = (
+            f"SELECT {', '.join(GEO_RESULT_COLUMNS)} FROM raw_table "
+            f"WHERE {condition} AND latitude BETWEEN %s AND %s AND {longitude_condition} LIMIT %s"
+        )
+        return self.execute_query(query, params + [south, north, west, east, limit])
@@ -58,6 +58,95 @@ class RedisConnector:
             print(f"Error checking key existence in Redis: {e}")
             raise
 
+    def claim_key(self, key, value=1):
+        """
+        Atomically sets the given key only if it does not exist yet (SET NX).
+
+        Returns:
+            bool: True if the key was claimed, False if it already existed.
+        """
+        try:
+            return bool(self.conn.set(key, value, nx=True))
+        except redis.RedisError as e:
+            print(f"Error claiming key in Redis: {e}")
+            raise
+
+    def swap_key(self, key, value):
+        """
+        Atomically sets the given key and returns its previous value (SET GET).
+
+        Returns:
+            str: The previous value of the key, or None if it did not exist.
+        """
+        try:
+            previous = self.conn.set(key, value, get=True)
+            return previous.decode('utf-8') if isinstance(previous, bytes) else previous
+        except redis.RedisError as e:
+            print(f"Error swapping key in Redis: {e}")
+            raise
+
+    def swap_keys(self, keys, values):
+        """
+        Atomically sets each of the given keys to its value and returns the previous values (SET GET)
+        in a single pipelined round trip.
+
+        Returns:
+            list: The previous value of each key, or None for the keys that did not exist.
+        """
+        try:
+            pipe = self.conn.pipeline(transaction=False)
+            for key, value in zip(keys, values):
+                pipe.set(key, value, get=True)
+            return [
+                previous.decode('utf-8') if isinstance(previous, bytes) else previous
+                for previous in pipe.execute()
+            ]
+        except redis.RedisError as e:
+            print(f"Error swapping keys in Redis: {e}")
+            raise
+
+    def claim_keys(self, keys, value=1):
+        """
+        Atomically claims each of the given keys (SET NX) in a single pipelined round trip.
+
+        Returns:
+            list: A boolean per key, True if the key was claimed, False if it already existed
+            (including keys repeated earlier in the same batch).
+        """
+        try:
+            pipe = self.conn.pipeline(transaction=False)
+            for key in keys:
+                pipe.set(key, value, nx=True)
+            return [bool(result) for result in pipe.execute()]
+        except redis.RedisError as e:
+            print(f"Error claiming keys in Redis: {e}")
+            raise
+
+    def set_keys(self, items):
+        """
+        Sets the given (key, value) pairs in a single round trip (MSET).
+        """
+        try:
+            if items:
+                self.conn.mset(dict(items))
+        except redis.RedisError as e:
+            print(f"Error setting keys in Redis: {e}")
+            raise
+
+    def scan_keys(self, pattern, count=1000):
+        """
+        Iterates over the keys matching the given pattern using SCAN, without blocking the server.
+
+        Yields:
+            str: The matching keys.
+        """
+        try:
+            for key in self.conn.scan_iter(match=pattern, count=count):
+                yield key.decode('utf-8') if isinstance(key, bytes) else key
+        except redis.RedisError as e:
+            print(f"Error scanning keys in Redis: {e}")
+            raise
+
     def delete_key(self, key):
         """
         Deletes the given key from the Redis database.
@@ -68,6 +157,17 @@ class RedisConnector:
             print(f"Error deleting key from Redis: {e}")
             raise
 
+    def delete_keys(self, keys):
+        """
+        Deletes the given keys from the Redis database in a single round trip.
+        """
+        try:
+            if keys:
+                self.conn.delete(*keys)
+        except redis.RedisError as e:
+            print(f"Error deleting keys from Redis: {e}")
+            raise
+
     def close_connection(self):
         """
         Closes the connection to the Redis database.
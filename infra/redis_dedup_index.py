@@ -0,0 +1,340 @@
+import hashlib
+import redis
+import time
+
+# Claims or swaps one job in its bucket hashes, atomically.
+# KEYS[1] is the bucket of the current generation, KEYS[2] (with a retention) the bucket of the previous one.
+# ARGV: the field of the job, its value, 'claim' or 'swap', and the expiry timestamp of KEYS[1] (0 for none).
+# A job found only in the previous generation is copied to the current one, so that it is retained
+# for as long as it keeps being seen.
+CLAIM_SCRIPT = """
+local previous = redis.call('HGET', KEYS[1], ARGV[1])
+local in_current = previous
+if not previous and #KEYS > 1 then
+    previous = redis.call('HGET', KEYS[2], ARGV[1])
+end
+if ARGV[3] == 'swap' or not in_current then
+    local value = ARGV[2]
+    if ARGV[3] == 'claim' and previous then
+        value = previous
+    end
+    redis.call('HSET', KEYS[1], ARGV[1], value)
+    if ARGV[4] ~= '0' then
+        redis.call('EXPIREAT', KEYS[1], ARGV[4])
+    end
+end
+if ARGV[3] == 'claim' then
+    if previous then
+        return 0
+    end
+    return 1
+end
+return previous
+"""
+
+def pack_value(value):
+    """
+    Packs a dedup value, content hashes (32 hex digits) are stored as their 16 raw bytes.
+    """
+    value = str(value)
+    if len(value) == 32:
+        try:
+            return bytes.fromhex(value)
+        except ValueError:
+            pass
+    return value.encode('utf-8')
+
+def unpack_value(value):
+    """
+    Unpacks a dedup value stored by pack_value.
+    """
+    if value is None:
+        return None
+    return value.hex() if len(value) == 16 else value.decode('utf-8')
+
+class StringKeyIndex:
+    """
+    Dedup index storing one Redis string key per job (job:{req_id}), the scheme used before
+    BucketedHashIndex. The jobs are never expired.
+    """
+    def __init__(self, rd_conn, pattern='job:*'):
+        """
+        Args:
+            rd_conn (RedisConnector): The Redis connector.
+            pattern (str): The pattern of the job keys.
+        """
+        self.rd_conn = rd_conn
+        self.pattern = pattern
+
+    def member(self, key):
+        return key
+
+    def claim_keys(self, keys, value=1):
+        return self.rd_conn.claim_keys(keys, value)
+
+    def swap_keys(self, keys, values):
+        return self.rd_conn.swap_keys(keys, values)
+
+    def set_keys(self, items):
+        return self.rd_conn.set_keys(items)
+
+    def release_keys(self, keys):
+        return self.rd_conn.delete_keys(keys)
+
+    def scan_members(self, count=1000):
+        return self.rd_conn.scan_keys(self.pattern, count)
+
+class BucketLayout:
+    """
+    Layout of the bucketed dedup index, shared by its sync and asyncio implementations.
+
+    Each job key is hashed (BLAKE2b, 96 bits): the first 32 bits select one of num_buckets hashes and
+    the remaining 64 bits are the field of the job in that hash, holding '1' or the short claim token of
+    its batch (insert mode) or the 16-byte content hash (upsert mode). Small hashes are stored by Redis as listpacks (up to
+    hash-max-listpack-entries fields), at a few bytes of overhead per job instead of the ~70 bytes of a
+    top-level key, so num_buckets should be at least the expected number of jobs / 100.
+
+    With a retention (seconds), the buckets are split into generations of that length, each expiring
+    once the next one ends: a job is looked up in the current and previous generations (in the same
+    round trip) and forgotten between 1 and 2 retention periods after it was last seen.
+    Both generations of a bucket share a hash tag, so the index also works on Redis Cluster.
+    """
+    def __init__(self, conn, num_buckets=65536, retention=0, prefix='dedup'):
+        """
+        Args:
+            conn (redis.StrictRedis or redis.asyncio.StrictRedis): The Redis client.
+            num_buckets (int): The number of bucket hashes (per generation).
+            retention (int): The number of seconds a job is at least remembered after it was last seen,
+                0 to remember the jobs forever.
+            prefix (str): The prefix of the bucket keys.
+        """
+        self.conn = conn
+        self.num_buckets = num_buckets
+        self.retention = retention
+        self.prefix = prefix
+        self.script = conn.register_script(CLAIM_SCRIPT)
+
+    def locate(self, key):
+        """
+        Returns the bucket number and the hash field of a job key.
+        """
+        digest = hashlib.blake2b(key.encode('utf-8'), digest_size=12).digest()
+        return int.from_bytes(digest[:4], 'big') % self.num_buckets, digest[4:]
+
+    def bucket_keys(self, bucket, now):
+        """
+        Returns the bucket hashes of the current (and previous) generation and the expiry timestamp
+        of the current one (0 without retention).
+        """
+        if not self.retention:
+            return [f'{self.prefix}:{{{bucket}}}'], 0
+        generation = int(now // self.retention)
+        return (
+            [f'{self.prefix}:{{{bucket}}}:{generation}', f'{self.prefix}:{{{bucket}}}:{generation - 1}'],
+            (generation + 2) * self.retention,
+        )
+
+    def member(self, key):
+        """
+        Returns the identity of a job key in the index, as yielded by scan_members (e.g. for a Bloom filter).
+        """
+        bucket, field = self.locate(key)
+        return bucket.to_bytes(4, 'big') + field
+
+class BucketedHashIndex(BucketLayout):
+    """
+    Compact dedup index of the job keys, stored in bucketed Redis hashes instead of one string key
+    per job (see BucketLayout). It exposes the claim_keys, swap_keys and set_keys methods of RedisConnector.
+    """
+    def __init__(self, rd_conn, num_buckets=65536, retention=0, prefix='dedup'):
+        """
+        Args:
+            rd_conn (RedisConnector): The Redis connector.
+        """
+        super().__init__(rd_conn.get_connection(), num_buckets, retention, prefix)
+
+    def run_script(self, keys, values, mode):
+        now = time.time()
+        pipe = self.conn.pipeline(transaction=False)
+        for key, value in zip(keys, values):
+            bucket, field = self.locate(key)
+            bucket_keys, expire_at = self.bucket_keys(bucket, now)
+            self.script(keys=bucket_keys, args=[field, pack_value(value), mode, expire_at], client=pipe)
+        return pipe.execute()
+
+    def claim_keys(self, keys, value=1):
+        """
+        Atomically claims each of the given job keys in a single pipelined round trip.
+
+        Returns:
+            list: A boolean per key, True if the key was claimed, False if it was already seen
+            (including keys repeated earlier in the same batch).
+        """
+        try:
+            return [bool(result) for result in self.run_script(keys, [value] * len(keys), 'claim')]
+        except redis.RedisError as e:
+            print(f"Error claiming keys in Redis: {e}")
+            raise
+
+    def swap_keys(self, keys, values):
+        """
+        Atomically sets each of the given job keys to its value and returns the previous values
+        in a single pipelined round trip.
+
+        Returns:
+            list: The previous value of each key, or None for the keys that were not seen.
+        """
+        try:
+            return [unpack_value(previous) for previous in self.run_script(keys, values, 'swap')]
+        except redis.RedisError as e:
+            print(f"Error swapping keys in Redis: {e}")
+            raise
+
+    def set_keys(self, items):
+        """
+        Sets the given (job key, value) pairs in a single pipelined round trip, without reading them.
+        """
+        try:
+            if not items:
+                return
+            now = time.time()
+            pipe = self.conn.pipeline(transaction=False)
+            for key, value in items:
+                bucket, field = self.locate(key)
+                bucket_keys, expire_at = self.bucket_keys(bucket, now)
+                pipe.hset(bucket_keys[0], field, pack_value(value))
+                if expire_at:
+                    pipe.expireat(bucket_keys[0], expire_at)
+            pipe.execute()
+        except redis.RedisError as e:
+            print(f"Error setting keys in Redis: {e}")
+            raise
+
+    def release_keys(self, keys):
+        """
+        Forgets the given job keys (in every live generation) in a single pipelined round trip,
+        so that they are claimed again the next time they are seen.
+        """
+        try:
+            if not keys:
+                return
+            now = time.time()
+            pipe = self.conn.pipeline(transaction=False)
+            for key in keys:
+                bucket, field = self.locate(key)
+                for bucket_key in self.bucket_keys(bucket, now)[0]:
+                    pipe.hdel(bucket_key, field)
+            pipe.execute()
+        except redis.RedisError as e:
+            print(f"Error releasing keys in Redis: {e}")
+            raise
+
+    def scan_members(self, count=1000):
+        """
+        Iterates over the jobs of the index (of every live generation) without blocking the server.
+
+        Yields:
+            bytes: The identity of each job, as returned by member.
+        """
+        try:
+            for bucket_key in self.conn.scan_iter(match=f'{self.prefix}:{{*', count=count):
+                bucket_key = bucket_key.decode('utf-8') if isinstance(bucket_key, bytes) else bucket_key
+                bucket = int(bucket_key[bucket_key.index('{') + 1:bucket_key.index('}')])
+                prefix = bucket.to_bytes(4, 'big')
+                for field, _ in self.conn.hscan_iter(bucket_key, count=count):
+                    yield prefix + field
+        except redis.RedisError as e:
+            print(f"Error scanning the dedup index in Redis: {e}")
+            raise
+
+    def migrate_keys(self, pattern='job:*', batch_size=1000):
+        """
+        Moves the jobs stored as one string key per job (the former dedup scheme) into the index,
+        deleting the string keys. Safe to interrupt and run again.
+
+        Args:
+            pattern (str): The pattern of the string keys.
+            batch_size (int): The number of keys moved per round trip.
+
+        Returns:
+            int: The number of migrated keys.
+        """
+        migrated = 0
+        batch = []
+        try:
+            for key in self.conn.scan_iter(match=pattern, count=batch_size):
+                batch.append(key)
+                if len(batch) >= batch_size:
+                    migrated += self.migrate_batch(batch)
+                    batch = []
+            if batch:
+                migrated += self.migrate_batch(batch)
+        except redis.RedisError as e:
+            print(f"Error migrating keys in Redis: {e}")
+            raise
+        return migrated
+
+    def migrate_batch(self, keys):
+        values = self.conn.mget(keys)
+        items = [
+            (key.decode('utf-8'), value.decode('utf-8'))
+            for key, value in zip(keys, values) if value is not None
+        ]
+        self.set_keys(items)
+        self.conn.delete(*keys)
+        return len(items)
+
+class AsyncBucketedHashIndex(BucketLayout):
+    """
+    asyncio counterpart of BucketedHashIndex, sharing its data. It exposes the claim_key
+    and swap_key methods of AsyncRedisConnector.
+    """
+    def __init__(self, rd_conn, num_buckets=65536, retention=0, prefix='dedup'):
+        """
+        Args:
+            rd_conn (AsyncRedisConnector): The asyncio Redis connector.
+        """
+        super().__init__(rd_conn.conn, num_buckets, retention, prefix)
+
+    async def run_job_script(self, key, value, mode):
+        bucket, field = self.locate(key)
+        bucket_keys, expire_at = self.bucket_keys(bucket, time.time())
+        return await self.script(keys=bucket_keys, args=[field, pack_value(value), mode, expire_at])
+
+    async def claim_key(self, key, value=1):
+        """
+        Atomically claims the given job key.
+
+        Returns:
+            bool: True if the key was claimed, False if it was already seen.
+        """
+        try:
+            return bool(await self.run_job_script(key, value, 'claim'))
+        except redis.RedisError as e:
+            print(f"Error claiming key in Redis: {e}")
+            raise
+
+    async def swap_key(self, key, value):
+        """
+        Atomically sets the given job key and returns its previous value.
+
+        Returns:
+            str: The previous value of the key, or None if it was not seen.
+        """
+        try:
+            return unpack_value(await self.run_job_script(key, value, 'swap'))
+        except redis.RedisError as e:
+            print(f"Error swapping key in Redis: {e}")
+            raise
+
+    async def release_key(self, key):
+        """
+        Forgets the given job key (in every live generation), so that it is claimed again the next time it is seen.
+        """
+        try:
+            bucket, field = self.locate(key)
+            for bucket_key in self.bucket_keys(bucket, time.time())[0]:
+                await self.conn.hdel(bucket_key, field)
+        except redis.RedisError as e:
+            print(f"Error releasing key in Redis: {e}")
+            raise
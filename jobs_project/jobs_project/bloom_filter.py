@@ -0,0 +1,100 @@
+import hashlib
+import math
+import os
+import struct
+
+class BloomFilter:
+    """
+    In-process Bloom filter used as a front-cache for the Redis duplicate detection.
+
+    A negative answer is exact (the key has definitely not been added), a positive answer
+    may be a false positive with a probability close to the configured error rate
+    as long as no more than `capacity` keys are added.
+    """
+    HEADER = struct.Struct('>4sQQQd')
+    MAGIC = b'BLM1'
+
+    def __init__(self, capacity, error_rate=0.001):
+        """
+        Args:
+            capacity (int): The expected number of keys.
+            error_rate (float): The target false-positive rate at full capacity.
+        """
+        if not 0 < error_rate < 1:
+            raise ValueError(f"error_rate must be between 0 and 1, got {error_rate}")
+        self.capacity = max(1, int(capacity))
+        self.error_rate = error_rate
+        self.num_bits = max(8, math.ceil(-self.capacity * math.log(error_rate) / math.log(2) ** 2))
+        self.num_hashes = max(1, round(self.num_bits / self.capacity * math.log(2)))
+        self.bits = bytearray((self.num_bits + 7) // 8)
+        self.count = 0
+
+    def _positions(self, key):
+        """
+        Computes the bit positions of the given key using double hashing.
+        """
+        if isinstance(key, str):
+            key = key.encode('utf-8')
+        digest = hashlib.blake2b(key, digest_size=16).digest()
+        h1 = int.from_bytes(digest[:8], 'little')
+        h2 = int.from_bytes(digest[8:], 'little') | 1
+        return [(h1 + i * h2) % self.num_bits for i in range(self.num_hashes)]
+
+    def add(self, key):
+        """
+        Adds the given key to the filter.
+        """
+        for position in self._positions(key):
+            self.bits[position >> 3] |= 1 << (position & 7)
+        self.count += 1
+
+    def __contains__(self, key):
+        """
+        Checks if the given key might have been added to the filter.
+        """
+        return all(self.bits[position >> 3] & (1 << (position & 7)) for position in self._positions(key))
+
+    def __len__(self):
+        return self.count
+
+    def save(self, path):
+        """
+        Persists the filter state to the given file, replacing it atomically.
+
+        Args:
+            path (str): The path of the file to write.
+        """
+        tmp_path = f"{path}.tmp"
+        with open(tmp_path, 'wb') as f:
+            f.write(self.HEADER.pack(self.MAGIC, self.capacity, self.num_bits, self.count, self.error_rate))
+            f.write(self.bits)
+        os.replace(tmp_path, path)
+
+    @classmethod
+    def load(cls, path):
+        """
+        Loads a filter previously persisted with save.
+
+        Args:
+            path (str): The path of the file to read.
+
+        Returns:
+            BloomFilter: The restored filter.
+
+        Raises:
+            ValueError: The file is not a valid Bloom filter file.
+        """
+        with open(path, 'rb') as f:
+            header = f.read(cls.HEADER.size)
+            if len(header) != cls.HEADER.size:
+                raise ValueError(f"Invalid Bloom filter file: {path}")
+            magic, capacity, num_bits, count, error_rate = cls.HEADER.unpack(header)
+            if magic != cls.MAGIC:
+                raise ValueError(f"Invalid Bloom filter file: {path}")
+            bloom = cls(capacity, error_rate)
+            bits = f.read()
+        if bloom.num_bits != num_bits or len(bits) != len(bloom.bits):
+            raise ValueError(f"Corrupt Bloom filter file: {path}")
+        bloom.bits = bytearray(bits)
+        bloom.count = count
+        return bloom
@@ -0,0 +1,137 @@
+import gzip
+import json
+import os
+import zlib
+from datetime import date, datetime
+
+def to_json_value(value):
+    """
+    Serializes the values JSON has no type for: timestamps as ISO-8601 strings, others as strings.
+    """
+    if isinstance(value, (datetime, date)):
+        return value.isoformat()
+    return str(value)
+
+class JsonlFileSink:
+    """
+    Append-only JSON Lines file of jobs, gzip-compressed if its path ends with .gz.
+
+    Each batch is serialized into a single buffer and appended (as a complete gzip member, which gzip
+    readers such as gzip.open and zcat read as a single stream) and synced at once, so the batches already
+    written stay readable if the process crashes. The size of the file after the last complete batch is
+    then synced to a side file. When the file is reopened, what follows that size is checked: the complete
+    batches (written before a crash kept the side file from being updated) are kept, and a batch cut short
+    is truncated.
+    """
+    def __init__(self, path, compresslevel=1):
+        """
+        Args:
+            path (str): The path of the file, its directory is created if needed.
+            compresslevel (int): The gzip compression level, from 1 (fastest) to 9 (smallest).
+        """
+        self.path = path
+        self.size_path = path + '.size'
+        self.compresslevel = compresslevel if path.endswith('.gz') else None
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        # Unbuffered, so that a failed write leaves nothing behind to be written later
+        self.file = open(path, 'ab', buffering=0)
+        self.size = self.repair()
+        self.encoder = json.JSONEncoder(default=to_json_value, ensure_ascii=False, separators=(',', ':'))
+
+    def repair(self):
+        """
+        Truncates what a crash left of a batch after the last complete one.
+
+        Returns:
+            int: The size of the file.
+        """
+        size = os.path.getsize(self.path)
+        try:
+            with open(self.size_path) as f:
+                committed = int(f.read())
+        except (OSError, ValueError):
+            # Without a side file (e.g. a crash during the first batch) the whole file is checked
+            committed = 0
+        if committed >= size:
+            return size
+
+        with open(self.path, 'rb') as f:
+            f.seek(committed)
+            tail = f.read()
+        complete = committed + self.complete_length(tail)
+        if complete < size:
+            print(f"Truncating {size - complete} bytes of an incomplete batch at the end of {self.path}")
+            os.truncate(self.path, complete)
+        self.size = complete
+        self.save_size()
+        return complete
+
+    def complete_length(self, data):
+        """
+        Returns the length of the complete batches at the start of the given data: its complete gzip
+        members, or its complete lines if the file is not compressed.
+        """
+        if self.compresslevel is None:
+            return data.rfind(b'\n') + 1
+        view = memoryview(data)
+        length = position = 0
+        decompressor = zlib.decompressobj(wbits=31)
+        while position < len(data):
+            # Fed in chunks, so that what follows the end of a member is not copied again for each member
+            chunk = view[position:position + 65536]
+            try:
+                decompressor.decompress(chunk)
+            except zlib.error:
+                break
+            position += len(chunk)
+            if decompressor.eof:
+                position -= len(decompressor.unused_data)
+                length = position
+                decompressor = zlib.decompressobj(wbits=31)
+        return length
+
+    def write(self, documents):
+        """
+        Appends the given documents to the file, one JSON object per line.
+
+        Raises:
+            OSError: The batch could not be written (e.g. the disk is full), the file is left as it was.
+        """
+        data = ''.join(self.encoder.encode(document) + '\n' for document in documents).encode('utf-8')
+        if self.compresslevel is not None:
+            data = gzip.compress(data, self.compresslevel)
+        try:
+            view = memoryview(data)
+            while view:
+                view = view[self.file.write(view):]
+            os.fsync(self.file.fileno())
+        except OSError:
+            # Cut off a partial write, so that the next batch does not follow an incomplete one
+            os.truncate(self.path, self.size)
+            raise
+        self.size += len(data)
+        self.save_size()
+
+    def save_size(self):
+        """
+        Replaces the side file with the size of the file, synced so that a stale size does not survive
+        a power failure.
+        """
+        with open(self.size_path + '.tmp', 'w') as f:
+            f.write(str(self.size))
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(self.size_path + '.tmp', self.size_path)
+        directory = os.open(os.path.dirname(os.path.abspath(self.size_path)), os.O_RDONLY)
+        try:
+            os.fsync(directory)
+        finally:
+            os.close(directory)
+
+    def close(self):
+        """
+        Closes the file.
+        """
+        self.file.close()
@@ -1,4 +1,8 @@
 import scrapy
+from collections import namedtuple
+from dataclasses import field, make_dataclass
+from operator import attrgetter
+from .timestamps import parse_timestamp
 
 class JobsProjectItem(scrapy.Item):
     slug = scrapy.Field()
@@ -40,4 +44,124 @@ class JobsProjectItem(scrapy.Item):
     create_date = scrapy.Field()
     category = scrapy.Field()
     full_location = scrapy.Field()
-    short_location = scrapy.Field()
\ No newline at end of file
+    short_location = scrapy.Field()
+    content_hash = scrapy.Field()
+
+def to_float(value):
+    """
+    Converts numeric strings of the feed to float, other values are kept as they are.
+    """
+    if value and isinstance(value, str):
+        return float(value)
+    return value
+
+def to_timestamp(value):
+    """
+    Parses timestamp strings of the feed, empty values become None.
+    """
+    if not value:
+        return None
+    if isinstance(value, str):
+        return parse_timestamp(value)
+    return value
+
+# Declarative description of a job field:
+#   name: the field name, in the feed, the item and the databases
+#   default: the value used when the feed has no such field, or a factory (list, dict) for mutable defaults
+#   coerce: converts the feed value to the stored type (None to keep it as it is)
+FieldSpec = namedtuple('FieldSpec', ['name', 'default', 'coerce'])
+
+JOB_FIELDS = (
+    FieldSpec('slug', '', None),
+    FieldSpec('language', '', None),
+    FieldSpec('languages', list, None),
+    FieldSpec('req_id', '', None),
+    FieldSpec('title', '', None),
+    FieldSpec('description', '', None),
+    FieldSpec('street_address', '', None),
+    FieldSpec('city', '', None),
+    FieldSpec('state', '', None),
+    FieldSpec('country_code', '', None),
+    FieldSpec('postal_code', '', None),
+    FieldSpec('location_type', '', None),
+    FieldSpec('latitude', 0, to_float),
+    FieldSpec('longitude', 0, to_float),
+    FieldSpec('categories', list, None),
+    FieldSpec('tags', list, None),
+    FieldSpec('tags5', list, None),
+    FieldSpec('tags6', list, None),
+    FieldSpec('brand', '', None),
+    FieldSpec('promotion_value', 0, None),
+    FieldSpec('salary_currency', '', None),
+    FieldSpec('salary_value', 0, to_float),
+    FieldSpec('salary_min_value', 0, to_float),
+    FieldSpec('salary_max_value', 0, to_float),
+    FieldSpec('benefits', list, None),
+    FieldSpec('employment_type', '', None),
+    FieldSpec('hiring_organization', '', None),
+    FieldSpec('source', '', None),
+    FieldSpec('apply_url', '', None),
+    FieldSpec('internal', False, None),
+    FieldSpec('searchable', False, None),
+    FieldSpec('applyable', False, None),
+    FieldSpec('li_easy_applyable', False, None),
+    FieldSpec('ats_code', '', None),
+    FieldSpec('meta_data', dict, None),
+    FieldSpec('update_date', None, to_timestamp),
+    FieldSpec('create_date', None, to_timestamp),
+    FieldSpec('category', list, None),
+    FieldSpec('full_location', '', None),
+    FieldSpec('short_location', '', None),
+)
+
+JOB_FIELD_NAMES = tuple(spec.name for spec in JOB_FIELDS)
+
+# Compact, __slots__-backed job item (a dataclass, so Scrapy and ItemAdapter handle it like any item).
+# content_hash is filled in by the pipeline.
+JobItem = make_dataclass(
+    'JobItem',
+    [(name, object, field(default=None)) for name in JOB_FIELD_NAMES + ('content_hash',)],
+    slots=True
+)
+JobItem.__module__ = __name__
+
+# Returns the job fields of a JobItem as a tuple, in JOB_FIELDS order
+job_item_values = attrgetter(*JOB_FIELD_NAMES)
+
+_MISSING = object()
+_EXTRACTION_PLAN = tuple(
+    (spec.name, spec.default if callable(spec.default) else (lambda default=spec.default: default), spec.coerce)
+    for spec in JOB_FIELDS
+)
+
+def coerce_job_values(get):
+    """
+    Extracts and coerces the job fields in a single pass over JOB_FIELDS.
+
+    Args:
+        get (callable): Returns the raw value of a field, or the given fallback if it is missing (e.g. dict.get).
+
+    Returns:
+        list: The coerced values, in JOB_FIELDS order.
+    """
+    values = []
+    for name, default, coerce in _EXTRACTION_PLAN:
+        value = get(name, _MISSING)
+        if value is _MISSING:
+            value = default()
+        elif coerce is not None:
+            value = coerce(value)
+        values.append(value)
+    return values
+
+def build_job_item(job_data):
+    """
+    Builds a JobItem from the 'data' object of a job of the feed.
+
+    Args:
+        job_data (dict): The job data.
+
+    Returns:
+        JobItem: The item containing the extracted job data.
+    """
+    return JobItem(*coerce_job_values(job_data.get))
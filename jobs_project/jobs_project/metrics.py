@@ -0,0 +1,270 @@
+import functools
+import inspect
+import re
+import threading
+import time
+from bisect import bisect_left
+from contextlib import contextmanager
+from twisted.web.resource import Resource
+from twisted.web.server import Site
+
+# Upper bounds (seconds) of the latency histogram buckets, from 50 microseconds to 10 seconds
+DEFAULT_BUCKETS = (
+    0.00005, 0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005, 0.01,
+    0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0,
+)
+
+class Histogram:
+    """
+    Latency histogram with fixed buckets, in the cumulative form of Prometheus histograms.
+    """
+    __slots__ = ('buckets', 'counts', 'count', 'sum', 'max')
+
+    def __init__(self, buckets=DEFAULT_BUCKETS):
+        self.buckets = buckets
+        # One count per bucket plus the +Inf bucket, not cumulative until rendered
+        self.counts = [0] * (len(buckets) + 1)
+        self.count = 0
+        self.sum = 0.0
+        self.max = 0.0
+
+    def observe(self, value):
+        """
+        Records an observed duration in seconds.
+        """
+        self.counts[bisect_left(self.buckets, value)] += 1
+        self.count += 1
+        self.sum += value
+        if value > self.max:
+            self.max = value
+
+    def copy(self):
+        """
+        Returns:
+            Histogram: A copy of the histogram, unaffected by later observations.
+        """
+        histogram = Histogram(self.buckets)
+        histogram.counts = self.counts[:]
+        histogram.count, histogram.sum, histogram.max = self.count, self.sum, self.max
+        return histogram
+
+    def quantile(self, q):
+        """
+        Estimates the given quantile (0 to 1) by linear interpolation within its bucket,
+        the way Prometheus' histogram_quantile does, capped at the largest observed value.
+
+        Returns:
+            float: The estimated quantile in seconds, 0 if nothing was observed.
+        """
+        if not self.count:
+            return 0.0
+        rank = q * self.count
+        cumulative = 0
+        for index, count in enumerate(self.counts):
+            if cumulative + count >= rank and count:
+                if index == len(self.buckets):
+                    return self.max
+                lower = self.buckets[index - 1] if index else 0.0
+                return min(self.max, lower + (self.buckets[index] - lower) * (rank - cumulative) / count)
+            cumulative += count
+        return self.max
+
+class PipelineMetrics:
+    """
+    Latency histograms of the pipeline stages and of the connector calls.
+
+    The histograms are written to the Scrapy stats (pipeline/<stage>/... and
+    connector/<connector>/<method>/...) by update_stats, and can be served together
+    with the numeric Scrapy stats in the Prometheus text format (see MetricsResource).
+
+    The sink writer threads record observations too, so the histograms are updated and
+    copied under a lock, and read from a snapshot.
+    """
+    def __init__(self):
+        self.stages = {}
+        self.calls = {}
+        self.lock = threading.Lock()
+
+    def observe(self, stage, seconds):
+        """
+        Records the duration of a pipeline stage.
+        """
+        with self.lock:
+            histogram = self.stages.get(stage)
+            if histogram is None:
+                histogram = self.stages[stage] = Histogram()
+            histogram.observe(seconds)
+
+    @contextmanager
+    def timer(self, stage):
+        """
+        Times the enclosed block as one observation of the given pipeline stage,
+        including when it raises (e.g. DropItem).
+        """
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(stage, time.perf_counter() - start)
+
+    def instrument(self, connector, name, method_names):
+        """
+        Replaces the given methods of a connector instance with wrappers timing each call.
+        Coroutine methods (asyncio connectors) are timed until they complete.
+
+        Args:
+            connector (object): The connector instance.
+            name (str): The name of the connector in the metrics (e.g. 'postgres').
+            method_names (list): The names of the methods to time.
+        """
+        for method_name in method_names:
+            method = getattr(connector, method_name, None)
+            if method is None:
+                continue
+            with self.lock:
+                histogram = self.calls[(name, method_name)] = Histogram()
+            setattr(connector, method_name, self._timed(method, histogram))
+
+    def _timed(self, method, histogram):
+        lock = self.lock
+        if inspect.iscoroutinefunction(method):
+            @functools.wraps(method)
+            async def async_wrapper(*args, **kwargs):
+                start = time.perf_counter()
+                try:
+                    return await method(*args, **kwargs)
+                finally:
+                    seconds = time.perf_counter() - start
+                    with lock:
+                        histogram.observe(seconds)
+            return async_wrapper
+
+        @functools.wraps(method)
+        def wrapper(*args, **kwargs):
+            start = time.perf_counter()
+            try:
+                return method(*args, **kwargs)
+            finally:
+                seconds = time.perf_counter() - start
+                with lock:
+                    histogram.observe(seconds)
+        return wrapper
+
+    def snapshot(self):
+        """
+        Copies the histograms under the lock.
+
+        Returns:
+            tuple: The histograms of the stages and of the connector calls, by stage and by
+                (connector, method) name.
+        """
+        with self.lock:
+            return (
+                {stage: histogram.copy() for stage, histogram in self.stages.items()},
+                {key: histogram.copy() for key, histogram in self.calls.items()},
+            )
+
+    def histograms(self):
+        """
+        Yields the stats prefix and a snapshot of the histogram of every stage and connector call.
+        """
+        stages, calls = self.snapshot()
+        for stage, histogram in stages.items():
+            yield f'pipeline/{stage}', histogram
+        for (name, method_name), histogram in calls.items():
+            if histogram.count:
+                yield f'connector/{name}/{method_name}', histogram
+
+    def update_stats(self, stats):
+        """
+        Writes the count, total seconds and estimated p50/p99 (in milliseconds) of every
+        histogram to the Scrapy stats.
+        """
+        for prefix, histogram in self.histograms():
+            stats.set_value(f'{prefix}/count', histogram.count)
+            stats.set_value(f'{prefix}/seconds', round(histogram.sum, 6))
+            stats.set_value(f'{prefix}/p50_ms', round(histogram.quantile(0.5) * 1000, 3))
+            stats.set_value(f'{prefix}/p99_ms', round(histogram.quantile(0.99) * 1000, 3))
+
+    def summary(self):
+        """
+        Formats a table of the count, total seconds, mean and estimated p50/p99 of every histogram.
+
+        Returns:
+            str: The table.
+        """
+        lines = [f"{'stage':48} {'count':>10} {'seconds':>10} {'mean ms':>9} {'p50 ms':>9} {'p99 ms':>9}"]
+        for prefix, histogram in self.histograms():
+            mean = histogram.sum / histogram.count if histogram.count else 0.0
+            lines.append(
+                f'{prefix:48} {histogram.count:>10} {histogram.sum:>10.3f} {mean * 1000:>9.3f} '
+                f'{histogram.quantile(0.5) * 1000:>9.3f} {histogram.quantile(0.99) * 1000:>9.3f}'
+            )
+        return '\n'.join(lines)
+
+    def render_prometheus(self, stats=None):
+        """
+        Renders the histograms, and the numeric Scrapy stats as gauges, in the Prometheus text format.
+
+        Args:
+            stats (scrapy.statscollectors.StatsCollector): The crawler stats, optional.
+
+        Returns:
+            str: The metrics page.
+        """
+        lines = []
+        stages, calls = self.snapshot()
+        families = (
+            ('jobs_pipeline_stage_seconds', 'Duration of the pipeline stages.',
+             [({'stage': stage}, histogram) for stage, histogram in stages.items()]),
+            ('jobs_connector_call_seconds', 'Duration of the database connector calls.',
+             [({'connector': name, 'method': method_name}, histogram)
+              for (name, method_name), histogram in calls.items()]),
+        )
+        for family, help_text, series in families:
+            lines.append(f'# HELP {family} {help_text}')
+            lines.append(f'# TYPE {family} histogram')
+            for labels, histogram in series:
+                label_text = ','.join(f'{key}="{value}"' for key, value in labels.items())
+                cumulative = 0
+                for bound, count in zip(histogram.buckets + (float('inf'),), histogram.counts):
+                    cumulative += count
+                    le = '+Inf' if bound == float('inf') else repr(bound)
+                    lines.append(f'{family}_bucket{{{label_text},le="{le}"}} {cumulative}')
+                lines.append(f'{family}_sum{{{label_text}}} {histogram.sum}')
+                lines.append(f'{family}_count{{{label_text}}} {histogram.count}')
+
+        if stats is not None:
+            # The stats are updated by the sink writer threads too: dict.copy holds the GIL
+            # throughout, so the copy is consistent where iterating the dict could fail
+            for key, value in sorted(stats.get_stats().copy().items()):
+                if isinstance(value, (int, float)) and not key.startswith(('pipeline/', 'connector/')):
+                    name = 'scrapy_' + re.sub(r'[^a-zA-Z0-9_]', '_', key)
+                    lines.append(f'# TYPE {name} gauge')
+                    lines.append(f'{name} {float(value)}')
+        return '\n'.join(lines) + '\n'
+
+class MetricsResource(Resource):
+    """
+    Twisted web resource serving the pipeline metrics in the Prometheus text format.
+    """
+    isLeaf = True
+
+    def __init__(self, metrics, stats):
+        super().__init__()
+        self.metrics = metrics
+        self.stats = stats
+
+    def render_GET(self, request):
+        request.setHeader(b'Content-Type', b'text/plain; version=0.0.4; charset=utf-8')
+        return self.metrics.render_prometheus(self.stats).encode('utf-8')
+
+def listen_metrics(metrics, stats, port, interface=''):
+    """
+    Serves the metrics over HTTP on the running reactor (any path, e.g. /metrics).
+
+    Returns:
+        twisted.internet.interfaces.IListeningPort: The listening port, stopped with stopListening().
+    """
+    from twisted.internet import reactor
+    return reactor.listenTCP(port, Site(MetricsResource(metrics, stats)), interface=interface)
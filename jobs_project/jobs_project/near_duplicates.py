@@ -0,0 +1,408 @@
+import hashlib
+import os
+import pickle
+import re
+import zlib
+import numpy as np
+import redis
+
+TAG_PATTERN = re.compile(r'<[^>]+>')
+WORD_PATTERN = re.compile(r'\w+')
+
+def shingle_hashes(text, size=3):
+    """
+    Hashes the word n-grams (shingles) of a text, ignoring HTML tags, case and punctuation.
+    The 32-bit hash of a shingle combines the CRC32 of its words, so each word is only hashed once.
+
+    Args:
+        text (str): The text.
+        size (int): The number of words per shingle.
+
+    Returns:
+        numpy.ndarray: The distinct shingle hashes, a single shingle if the text has fewer than size words.
+    """
+    words = WORD_PATTERN.findall(TAG_PATTERN.sub(' ', text).lower())
+    if len(words) <= size:
+        if not words:
+            return np.empty(0, dtype=np.uint64)
+        return np.array([zlib.crc32(' '.join(words).encode('utf-8'))], dtype=np.uint64)
+
+    word_hashes = np.fromiter(map(zlib.crc32, map(str.encode, words)), dtype=np.uint64, count=len(words))
+    count = len(words) - size + 1
+    hashes = word_hashes[:count].copy()
+    for offset in range(1, size):
+        # Rotate-and-xor keeps the order of the words significant
+        hashes = ((hashes << np.uint64(5)) | (hashes >> np.uint64(27))) & np.uint64(0xFFFFFFFF)
+        hashes ^= word_hashes[offset:offset + count]
+    return np.unique(hashes)
+
+class MinHasher:
+    """
+    Computes MinHash signatures of texts: the fraction of equal values of two signatures
+    estimates the Jaccard similarity of the shingles of the texts.
+
+    The permutations are derived from a fixed seed, so signatures computed by different
+    processes and runs are comparable.
+    """
+    def __init__(self, num_perm=64, shingle_size=3, seed=1):
+        """
+        Args:
+            num_perm (int): The number of hash permutations, i.e. the length of the signatures.
+            shingle_size (int): The number of words per shingle.
+            seed (int): The seed of the permutations.
+        """
+        rng = np.random.RandomState(seed)
+        self.num_perm = num_perm
+        self.shingle_size = shingle_size
+        # Multiply-shift hash functions ((a * h + b) mod 2^64) >> 32, with odd multipliers
+        self.a = rng.randint(0, 1 << 63, size=num_perm, dtype=np.uint64) * np.uint64(2) + np.uint64(1)
+        self.b = rng.randint(0, 1 << 63, size=num_perm, dtype=np.uint64)
+
+    def signature(self, text):
+        """
+        Computes the MinHash signature of a text.
+
+        Returns:
+            numpy.ndarray: The signature, num_perm 32-bit values, or None if the text has no words.
+        """
+        hashes = shingle_hashes(text, self.shingle_size)
+        if not len(hashes):
+            return None
+        # The uint64 arithmetic wraps around, i.e. is modulo 2^64
+        permuted = (np.outer(hashes, self.a) + self.b) >> np.uint64(32)
+        return permuted.min(axis=0).astype(np.uint32)
+
+def similarity(signature, other):
+    """
+    Estimates the Jaccard similarity of the texts of two signatures.
+    """
+    return float(np.count_nonzero(signature == other)) / len(signature)
+
+def band_fields(signature, bands):
+    """
+    Splits a signature into bands and hashes each band, the LSH bucket of the signature in each band.
+
+    Returns:
+        list: The 8-byte hash of each band.
+    """
+    rows = len(signature) // bands
+    return [
+        hashlib.blake2b(signature[band * rows:(band + 1) * rows].tobytes(), digest_size=8).digest()
+        for band in range(bands)
+    ]
+
+class LocalLSHIndex:
+    """
+    In-process LSH index of MinHash signatures, persisted to a file between runs.
+
+    Each band maps its bucket hashes to the keys of the signatures that fell into that bucket,
+    keeping the bucket_size most recent keys, so a lookup only compares the signature with the
+    few candidates sharing one of its buckets. A signature is deleted once it has been evicted
+    from all its buckets, so the index holds at most bucket_size signatures per bucket.
+    """
+    MAGIC = b'LSH2'
+
+    def __init__(self, bands, bucket_size=32, num_perm=64, shingle_size=3):
+        """
+        Args:
+            bands (int): The number of bands of the signatures.
+            bucket_size (int): The maximum number of keys kept per bucket.
+            num_perm (int): The length of the signatures, signatures of another length are not comparable.
+            shingle_size (int): The number of words per shingle of the signatures.
+        """
+        self.bands = bands
+        self.bucket_size = bucket_size
+        self.num_perm = num_perm
+        self.shingle_size = shingle_size
+        self.buckets = [{} for _ in range(bands)]
+        self.signatures = {}
+        # The number of buckets holding each key
+        self.refs = {}
+        self.links = {}
+
+    def params(self):
+        """
+        Returns:
+            tuple: The parameters the signatures of the index were computed with.
+        """
+        return self.bands, self.num_perm, self.shingle_size
+
+    def find(self, key, fields, signature, threshold, index_duplicates=False):
+        """
+        Returns the most similar signature sharing a bucket with the given one, and adds the
+        signature to the index unless it is a near-duplicate (or index_duplicates).
+
+        Args:
+            key (str): The key of the signature (the req_id of the job).
+            fields (list): The bucket hash of the signature in each band.
+            signature (numpy.ndarray): The signature.
+            threshold (float): The minimum estimated similarity of near-duplicates.
+            index_duplicates (bool): Whether near-duplicates are added to the index too.
+
+        Returns:
+            tuple: The key of the most similar signature, other than the key itself, and the
+                estimated similarity, or None if no candidate reaches the threshold.
+        """
+        best = None
+        compared = {key}
+        for band, field in zip(self.buckets, fields):
+            for member in band.get(field, ()):
+                if member not in compared:
+                    compared.add(member)
+                    score = similarity(signature, self.signatures[member])
+                    if score >= threshold and (best is None or score > best[1]):
+                        best = (member, score)
+
+        if best is None or index_duplicates:
+            for band, field in zip(self.buckets, fields):
+                members = band.setdefault(field, [])
+                if key not in members:
+                    members.append(key)
+                    self.refs[key] = self.refs.get(key, 0) + 1
+                    if len(members) > self.bucket_size:
+                        self.evict(members.pop(0))
+            self.signatures[key] = signature
+        return best
+
+    def evict(self, key):
+        """
+        Deletes the signature of a key evicted from a bucket if no other bucket holds it.
+        """
+        self.refs[key] -= 1
+        if not self.refs[key]:
+            del self.refs[key]
+            self.signatures.pop(key, None)
+
+    def link(self, key, original):
+        """
+        Records that a key is a near-duplicate of the original key.
+        """
+        self.links[key] = original
+
+    def save(self, path):
+        """
+        Persists the index to the given file, replacing it atomically.
+        """
+        tmp_path = f"{path}.tmp"
+        with open(tmp_path, 'wb') as f:
+            f.write(self.MAGIC)
+            pickle.dump(
+                (self.params(), self.bucket_size, self.buckets, self.signatures, self.refs, self.links),
+                f,
+                protocol=pickle.HIGHEST_PROTOCOL
+            )
+        os.replace(tmp_path, path)
+
+    @classmethod
+    def load(cls, path):
+        """
+        Loads an index previously persisted with save.
+
+        Raises:
+            ValueError: The file is not a valid LSH index file.
+        """
+        with open(path, 'rb') as f:
+            if f.read(len(cls.MAGIC)) != cls.MAGIC:
+                raise ValueError(f"Invalid LSH index file: {path}")
+            (bands, num_perm, shingle_size), bucket_size, buckets, signatures, refs, links = pickle.load(f)
+        index = cls(bands, bucket_size, num_perm, shingle_size)
+        index.buckets, index.signatures, index.refs, index.links = buckets, signatures, refs, links
+        return index
+
+    def close(self):
+        pass
+
+# Finds the most similar signature sharing a bucket with the given one and adds the signature to the index
+# unless it is a near-duplicate, atomically (see LocalLSHIndex.find).
+# KEYS[1]: the signatures hash, KEYS[2]: the hash of the number of buckets holding each key,
+# KEYS[3..]: the hash of each band.
+# ARGV[1]: the key, ARGV[2]: the signature, ARGV[3]: the threshold, ARGV[4]: '1' to index near-duplicates,
+# ARGV[5]: the bucket size, ARGV[6..]: the bucket of each band.
+# The keys of a bucket are stored newline-separated, the oldest ones beyond the bucket size are evicted,
+# and the signature of a key is deleted once no bucket holds it.
+# Returns the key and similarity (as a string) of the best match, or an empty list.
+FIND_SCRIPT = """
+local signature = ARGV[2]
+local values = #signature / 4
+local threshold = tonumber(ARGV[3])
+local best, best_score = nil, -1
+local compared = {[ARGV[1]] = true}
+local buckets = {}
+local present = {}
+for i = 3, #KEYS do
+    local members = {}
+    local stored = redis.call('HGET', KEYS[i], ARGV[i + 3])
+    if stored then
+        for member in string.gmatch(stored, '[^\\n]+') do
+            if member ~= ARGV[1] then
+                table.insert(members, member)
+            else
+                present[i] = true
+            end
+            if not compared[member] then
+                compared[member] = true
+                local other = redis.call('HGET', KEYS[1], member)
+                if other then
+                    local equal = 0
+                    for v = 1, values * 4, 4 do
+                        if string.sub(signature, v, v + 3) == string.sub(other, v, v + 3) then
+                            equal = equal + 1
+                        end
+                    end
+                    local score = equal / values
+                    if score >= threshold and score > best_score then
+                        best, best_score = member, score
+                    end
+                end
+            end
+        end
+    end
+    buckets[i] = members
+end
+if not best or ARGV[4] == '1' then
+    local bucket_size = tonumber(ARGV[5])
+    for i = 3, #KEYS do
+        local members = buckets[i]
+        table.insert(members, ARGV[1])
+        if not present[i] then
+            redis.call('HINCRBY', KEYS[2], ARGV[1], 1)
+        end
+        while #members > bucket_size do
+            local evicted = table.remove(members, 1)
+            if redis.call('HINCRBY', KEYS[2], evicted, -1) <= 0 then
+                redis.call('HDEL', KEYS[2], evicted)
+                redis.call('HDEL', KEYS[1], evicted)
+            end
+        end
+        redis.call('HSET', KEYS[i], ARGV[i + 3], table.concat(members, '\\n'))
+    end
+    redis.call('HSET', KEYS[1], ARGV[1], signature)
+end
+if best then
+    return {best, tostring(best_score)}
+end
+return {}
+"""
+
+class RedisLSHIndex:
+    """
+    LSH index of MinHash signatures stored in Redis, shared by the crawlers of every process.
+
+    The buckets of each band are the fields of one hash per band, and a lookup (with the comparison
+    of the candidates) and insertion is a single script call. The keys share a hash tag, so the
+    index also works on Redis Cluster. As in LocalLSHIndex, a signature is deleted once it has been
+    evicted from all its buckets.
+    """
+    def __init__(self, rd_conn, bands, bucket_size=32, prefix='lsh', num_perm=64, shingle_size=3):
+        """
+        Args:
+            rd_conn (RedisConnector): The Redis connector.
+            bands (int): The number of bands of the signatures.
+            bucket_size (int): The maximum number of keys kept per bucket.
+            prefix (str): The prefix of the index keys.
+            num_perm (int): The length of the signatures.
+            shingle_size (int): The number of words per shingle of the signatures.
+
+        Raises:
+            ValueError: The index under the prefix was built with other parameters.
+        """
+        self.rd_conn = rd_conn
+        self.conn = rd_conn.get_connection()
+        self.bucket_size = bucket_size
+        self.signatures_key = f'{{{prefix}}}:signatures'
+        self.refs_key = f'{{{prefix}}}:refs'
+        self.links_key = f'{{{prefix}}}:links'
+        self.band_keys = [f'{{{prefix}}}:band:{band}' for band in range(bands)]
+        self.check_params(f'{{{prefix}}}:params', f'{bands}:{num_perm}:{shingle_size}')
+        self.script = self.conn.register_script(FIND_SCRIPT)
+
+    def check_params(self, params_key, params):
+        """
+        Records the parameters of the index, or checks that they are those it was built with, since
+        signatures computed with other parameters are not comparable.
+        """
+        self.conn.set(params_key, params, nx=True)
+        stored = self.conn.get(params_key)
+        if stored is not None and stored.decode('utf-8') != params:
+            raise ValueError(
+                f"The LSH index in Redis was built with bands:num_perm:shingle_size {stored.decode('utf-8')}, "
+                f"not {params}, delete its keys to rebuild it"
+            )
+
+    def find(self, key, fields, signature, threshold, index_duplicates=False):
+        """
+        Returns the most similar signature sharing a bucket with the given one, and adds the
+        signature to the index unless it is a near-duplicate (or index_duplicates).
+
+        Returns:
+            tuple: The key of the most similar signature, other than the key itself, and the
+                estimated similarity, or None if no candidate reaches the threshold.
+        """
+        try:
+            result = self.script(
+                keys=[self.signatures_key, self.refs_key] + self.band_keys,
+                args=[key, signature.tobytes(), threshold, int(index_duplicates), self.bucket_size] + fields
+            )
+        except redis.RedisError as e:
+            print(f"Error querying the LSH index in Redis: {e}")
+            raise
+        if not result:
+            return None
+        return result[0].decode('utf-8'), float(result[1])
+
+    def link(self, key, original):
+        """
+        Records that a key is a near-duplicate of the original key.
+        """
+        try:
+            self.conn.hset(self.links_key, key, original)
+        except redis.RedisError as e:
+            print(f"Error linking near-duplicate in Redis: {e}")
+            raise
+
+    def close(self):
+        self.rd_conn.close_connection()
+
+class NearDuplicateDetector:
+    """
+    Finds the near-duplicates of texts with MinHash signatures and an LSH index.
+
+    With b bands of r rows, two texts of Jaccard similarity s share a bucket with probability
+    1 - (1 - s^r)^b, so only the few candidates sharing a bucket are compared, and a candidate
+    is a near-duplicate if the similarity estimated from the signatures reaches the threshold.
+    """
+    def __init__(self, hasher, index, bands, threshold=0.8):
+        """
+        Args:
+            hasher (MinHasher): Computes the signatures.
+            index (LocalLSHIndex or RedisLSHIndex): The LSH index.
+            bands (int): The number of bands, must divide the signature length.
+            threshold (float): The minimum estimated similarity of near-duplicates.
+        """
+        if hasher.num_perm % bands:
+            raise ValueError(f"The number of bands ({bands}) must divide the signature length ({hasher.num_perm})")
+        self.hasher = hasher
+        self.index = index
+        self.bands = bands
+        self.threshold = threshold
+
+    def find(self, key, text, index_duplicates=False):
+        """
+        Returns the most similar text indexed under another key, and adds the text to the index
+        unless it is a near-duplicate (or index_duplicates), so that reposts are compared with the original.
+
+        Args:
+            key (str): The key of the text (the req_id of the job).
+            text (str): The text.
+            index_duplicates (bool): Whether near-duplicates are added to the index too.
+
+        Returns:
+            tuple: The key of the most similar text and the estimated similarity, or None if no
+                indexed text reaches the threshold or the text has no words (it is not indexed).
+        """
+        signature = self.hasher.signature(text)
+        if signature is None:
+            return None
+        return self.index.find(
+            key, band_fields(signature, self.bands), signature, self.threshold, index_duplicates
+        )
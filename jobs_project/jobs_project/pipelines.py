@@ -8,40 +8,670 @@ sys.path.insert(0, project_root)
 from infra.postgresql_connector import PostgreSQLConnector
 from infra.redis_connector import RedisConnector
 from infra.mongodb_connector import MongoDBConnector
+from infra.pooled_postgresql_connector import PooledPostgreSQLConnector
+from infra.pooled_redis_connector import PooledRedisConnector
+from infra.pooled_mongodb_connector import PooledMongoDBConnector
+from infra.async_postgresql_connector import AsyncPostgreSQLConnector
+from infra.async_redis_connector import AsyncRedisConnector
+from infra.async_mongodb_connector import AsyncMongoDBConnector
+from infra.redis_dedup_index import AsyncBucketedHashIndex, BucketedHashIndex, StringKeyIndex
+from infra.memory_dedup_index import MemoryDedupIndex
+from infra import geo
+from infra.description_store import DescriptionBlob, DescriptionCodec, description_hash
+from infra.mongodb_connector import DUPLICATE_KEY_ERROR
+import asyncio
+import hashlib
+import itertools
+import psycopg2
 import redis
+import time
+import uuid
+from collections import namedtuple
+from operator import attrgetter
 from itemadapter import ItemAdapter
-from datetime import datetime
+from pymongo.errors import ConnectionFailure
 from scrapy.exceptions import DropItem
+from scrapy.utils.defer import deferred_from_coro
+from twisted.internet import defer, task
 import json
-from .items import JobsProjectItem
+from .bloom_filter import BloomFilter
+from .file_sink import JsonlFileSink
+from .near_duplicates import LocalLSHIndex, MinHasher, NearDuplicateDetector, RedisLSHIndex
+from .metrics import PipelineMetrics, listen_metrics
+from .sink_writer import AsyncRetryQueue, SinkWriter, SpillSegments
+from .items import JOB_FIELD_NAMES, JobItem, coerce_job_values, job_item_values
+
+# A validated and converted job, as written to the databases
+# (description is the (hash, text) of a description stored compressed, None otherwise)
+JobRecord = namedtuple('JobRecord', ['key', 'content_hash', 'row', 'document', 'description'])
+
+# The versions of jobs (req_id, content_hash) to delete from a database, as their write failed on the other one
+JobRollback = namedtuple('JobRollback', ['jobs'])
+
+# What happens to a job whose write fails on one of the databases (WRITE_FAILURE_MODE)
+WRITE_FAILURE_MODES = ('retry', 'best_effort', 'all_or_nothing')
+
+# The connector calls timed by the pipeline metrics
+INSTRUMENTED_CALLS = {
+    'postgres': ['create_jobs_table', 'create_upsert_index', 'insert_jobs_data', 'insert_jobs_batch',
+                 'upsert_jobs_batch', 'upsert_jobs_data', 'insert_descriptions', 'insert_description',
+                 'delete_jobs', 'delete_job'],
+    'redis': ['claim_key', 'claim_keys', 'swap_key', 'swap_keys', 'set_keys', 'delete_keys', 'release_key'],
+    'dedup': ['claim_key', 'claim_keys', 'swap_key', 'swap_keys', 'set_keys', 'release_keys', 'release_key'],
+    'mongo': ['create_index', 'create_job_indexes', 'create_upsert_index', 'insert_data', 'insert_many_data',
+              'upsert_data', 'upsert_many_data', 'insert_descriptions', 'insert_description', 'delete_jobs',
+              'delete_job'],
+}
+
+# Errors meaning that a sink is unavailable: its batches are spilled to disk and retried
+POSTGRES_SINK_ERRORS = (psycopg2.OperationalError, psycopg2.InterfaceError)
+MONGO_SINK_ERRORS = (ConnectionFailure,)
+
+# The PostgreSQL columns of a row, every row has the job fields followed by the content hash
+# and the description hash (of the descriptions stored compressed)
+ROW_FIELD_NAMES = ', '.join(JOB_FIELD_NAMES + ('content_hash', 'description_hash'))
+REQ_ID_INDEX = JOB_FIELD_NAMES.index('req_id')
+CONTENT_HASH_INDEX = len(JOB_FIELD_NAMES)
+DESCRIPTION_HASH_INDEX = CONTENT_HASH_INDEX + 1
+DESCRIPTION_INDEX = JOB_FIELD_NAMES.index('description')
+LATITUDE_INDEX = JOB_FIELD_NAMES.index('latitude')
+LONGITUDE_INDEX = JOB_FIELD_NAMES.index('longitude')
+
+def batch_jobs(batch):
+    """
+    Returns the (req_id, content_hash) of the jobs of a batch of PostgreSQL rows or MongoDB or file documents.
+    """
+    jobs = []
+    for record in batch:
+        if isinstance(record, dict):
+            jobs.append((record['req_id'], record['content_hash']))
+        elif not isinstance(record, (DescriptionBlob, JobRollback)):
+            values = record[1]
+            jobs.append((values[REQ_ID_INDEX], values[CONTENT_HASH_INDEX]))
+    return jobs
+
+def chain_writes(first, then):
+    """
+    Returns a write of the asyncio pipeline running the first write, then the second one.
+    """
+    async def write():
+        await first()
+        return await then()
+    return write
+
+def file_record(record):
+    """
+    Builds the record of the file sinks: the MongoDB document of the job (a copy, as MongoDB adds its _id
+    to the document), with its description inline even if the databases store it compressed.
+    """
+    document = dict(record.document)
+    if record.description is not None:
+        document['description'] = record.description[1]
+        del document['description_hash']
+    return document
+
+# The sinks of JobsProjectPipeline, enabled by name in JOB_SINKS:
+#   record: builds the record the sink takes from a JobRecord
+#   flush: the name of the pipeline method writing a batch of records, called by the write queue of the sink
+#   errors: the exception types meaning that the sink is unavailable (its batches are spilled and retried)
+#   batch_size, flush_interval: the settings of the batches of the sink
+#   database: whether the sink also takes the compressed descriptions and the rollbacks of all_or_nothing
+SinkSpec = namedtuple('SinkSpec', ['record', 'flush', 'errors', 'batch_size', 'flush_interval', 'database'])
+
+SINKS = {
+    'postgres': SinkSpec(
+        attrgetter('row'), 'flush_postgres', POSTGRES_SINK_ERRORS, 'POSTGRES_BATCH_SIZE', 'POSTGRES_FLUSH_INTERVAL', True
+    ),
+    'mongo': SinkSpec(
+        attrgetter('document'), 'flush_mongo', MONGO_SINK_ERRORS, 'MONGO_BATCH_SIZE', 'MONGO_FLUSH_INTERVAL', True
+    ),
+    'jsonl': SinkSpec(file_record, 'flush_jsonl', (OSError,), 'JSONL_BATCH_SIZE', 'JSONL_FLUSH_INTERVAL', False),
+}
+
+# The dedup backends of JobsProjectPipeline (DEDUP_BACKEND)
+DEDUP_BACKENDS = ('redis', 'memory')
+
+def build_document(values, content_hash, description_hash=None):
+    """
+    Builds the MongoDB document of a job, keeping the native BSON types of its values: list fields
+    as arrays, dictionary fields as embedded documents and timestamps as dates, so that MongoDB
+    can index and filter them (e.g. the multikey index of the tags).
+
+    Args:
+        values (list): The job values, in JOB_FIELDS order.
+        content_hash (str): The content hash of the job.
+        description_hash (str): The hash of the description stored compressed, None otherwise.
+
+    Returns:
+        dict: The document.
+    """
+    document = dict(zip(JOB_FIELD_NAMES, values))
+    document['content_hash'] = content_hash
+    if description_hash is not None:
+        document['description_hash'] = description_hash
+    # The GeoJSON point indexed by the 2dsphere index (None for jobs without a valid location)
+    document['location'] = geo.geojson_point(values[LATITUDE_INDEX], values[LONGITUDE_INDEX])
+    return document
+
+class WriteBuffer:
+    """
+    Accumulates records in memory and hands them to a flush callback in batches,
+    either when the batch size is reached or when the flush interval has elapsed.
+    """
+    def __init__(self, flush_callback, batch_size, flush_interval):
+        self.flush_callback = flush_callback
+        self.batch_size = max(1, batch_size)
+        self.flush_interval = flush_interval
+        self.records = []
+        self.last_flush = time.monotonic()
+
+    def __len__(self):
+        return len(self.records)
+
+    def add(self, record):
+        """
+        Adds a record to the buffer and flushes the buffer if it is due.
+        """
+        self.records.append(record)
+        if self.is_due():
+            self.flush()
+
+    def is_due(self):
+        """
+        Checks if the buffer is full or if the flush interval has elapsed since the last flush.
+        """
+        if len(self.records) >= self.batch_size:
+            return True
+        return bool(self.records) and time.monotonic() - self.last_flush >= self.flush_interval
+
+    def flush_if_due(self):
+        """
+        Flushes the buffer if it is due, used by the periodic flush timer.
+        """
+        if self.is_due():
+            self.flush()
+
+    def flush(self):
+        """
+        Hands all the buffered records to the flush callback.
+        """
+        records, self.records = self.records, []
+        self.last_flush = time.monotonic()
+        if records:
+            self.flush_callback(records)
 
 class JobsProjectPipeline:
     def open_spider(self, spider):
         """
-        Initializes the PostgreSQL, Redis, and MongoDB connectors.
+        Initializes the dedup backend (DEDUP_BACKEND) and the sinks (JOB_SINKS) of the jobs,
+        connecting only to the stores they use.
         
         Args:
             spider (scrapy.Spider): The spider object.
         """
-        # Initialize the PostgreSQL, Redis, and MongoDB connectors
-        self.pg_conn = PostgreSQLConnector()
-        self.rd_conn = RedisConnector()
-        self.mongo_conn = MongoDBConnector()
-        
-        # Create the jobs table in the PostgreSQL database (if it does not exist))
-        self.pg_conn.create_jobs_table()
+        self.sink_names, self.dedup_backend = self.get_stores(spider.settings)
+        # Initialize the PostgreSQL, Redis, and MongoDB connectors (None for the stores not in use)
+        self.pg_conn, self.rd_conn, self.mongo_conn = self.create_connectors(spider.settings)
+        self.dedup_index = self.create_dedup_index(spider.settings)
+        self.open_metrics(spider)
+        if spider.settings.getbool('STORE_SETUP', True):
+            self.setup_stores(spider.settings)
+
+        self.file_sink = None
+        if 'jsonl' in self.sink_names:
+            self.file_sink = self.create_file_sink(spider)
+
+        # Optionally store the descriptions compressed in the databases, the exports need the preset
+        # dictionary to restore them (the file sink keeps them inline)
+        self.description_codec = self.create_description_codec(spider.settings)
+        if not any(SINKS[name].database for name in self.sink_names):
+            self.description_codec = None
+        if self.description_codec is not None and self.description_codec.dictionary:
+            for conn in (self.pg_conn, self.mongo_conn):
+                if conn is not None:
+                    conn.insert_description_dictionary(self.description_codec.dictionary)
+
+        # In upsert mode jobs are keyed on req_id: changed jobs update the stored ones
+        # and jobs whose content hash did not change are skipped
+        self.upsert = spider.settings.get('INGEST_MODE', 'insert') == 'upsert'
+
+        # Deduplicate the items against the dedup index in batches, one pipelined Redis round trip per batch
+        # (a batch size of 1 claims each item as it arrives and drops duplicates with DropItem)
+        dedup_batch_size = spider.settings.getint('DEDUP_BATCH_SIZE', 1)
+        self.dedup_buffer = None
+        if dedup_batch_size > 1:
+            self.dedup_buffer = WriteBuffer(
+                self.flush_dedup,
+                dedup_batch_size,
+                spider.settings.getfloat('DEDUP_FLUSH_INTERVAL', 5.0)
+            )
+        # The batches whose claims fail are spilled and replayed once the dedup index is back (also by the
+        # next run). Each batch is claimed with a token of its own, so that the replay can tell the claims
+        # of its partly executed attempt from all other claims: a prefix drawn for the crawl and the
+        # number of the batch, a few bytes per job in the index
+        self.dedup_spill = self.create_spill(spider, 'dedup')
+        self.claim_prefix = uuid.uuid4().hex[:8]
+        self.claim_batches = itertools.count()
+        self.dedup_replay_records = max(dedup_batch_size, 500)
+
+        # Optionally keep an in-process Bloom filter in front of Redis, so that Redis is only
+        # consulted for the keys the filter reports as possibly seen
+        self.bloom = None
+        self.bloom_path = spider.settings.get('BLOOM_FILTER_PATH')
+        self.claim_buffer = None
+        if spider.settings.getbool('BLOOM_FILTER_ENABLED'):
+            self.bloom = self.open_bloom_filter(spider.settings)
+            # The keys the filter has never seen are claimed in pipelined batches, still atomically (SET NX),
+            # as another crawler (or a persisted filter older than Redis) may have claimed them
+            self.claim_buffer = WriteBuffer(
+                self.flush_dedup,
+                max(dedup_batch_size, 500),
+                spider.settings.getfloat('DEDUP_FLUSH_INTERVAL', 5.0)
+            )
+
+        # A job whose write fails on one database is retried (from the spill segments when the database
+        # is unavailable), dropped from that database only (best_effort) or undone on both (all_or_nothing)
+        self.failure_mode = self.get_failure_mode(spider.settings)
+        # The jobs undone in all_or_nothing mode, skipped by the writes that have not happened yet
+        self.rejected_jobs = set()
+
+        # The batches are written to the sinks concurrently, by bounded write queues in worker threads,
+        # which apply backpressure and spill to disk when a database stalls or fails.
+        # Each sink buffers its records and writes them in batches, flushing by size or by time
+        self.writers = []
+        self.sink_buffers = []
+        for name in self.sink_names:
+            spec = SINKS[name]
+            writer = self.create_writer(spider, name, getattr(self, spec.flush), spec.errors)
+            self.writers.append(writer)
+            self.sink_buffers.append((spec, WriteBuffer(
+                writer.submit,
+                spider.settings.getint(spec.batch_size, 500),
+                spider.settings.getfloat(spec.flush_interval, 5.0)
+            )))
+        self.drain_timeout = spider.settings.getfloat('WRITE_DRAIN_TIMEOUT', 60.0)
+
+        # The dedup buffer feeds the write buffers, so it must be flushed first
+        self.buffers = [buffer for buffer in (self.dedup_buffer, self.claim_buffer) if buffer is not None]
+        self.buffers += [buffer for _, buffer in self.sink_buffers]
+        self.flush_timer = task.LoopingCall(self.flush_due_buffers)
+        if self.buffers:
+            self.flush_timer.start(min(buffer.flush_interval for buffer in self.buffers), now=False)
 
     def close_spider(self, spider):
         """
-        Closes the PostgreSQL, Redis, and MongoDB connections.
+        Flushes the buffered rows, waits for the write queues to drain (up to WRITE_DRAIN_TIMEOUT,
+        what is left stays spilled for the next run) and closes the connections and the file sink.
 
         Args:
             spider (scrapy.Spider): The spider object.
+
+        Returns:
+            Deferred: Fired once the connections are closed.
         """
+        self.replay_dedup()
+        for buffer in self.buffers:
+            buffer.flush()
 
-        self.pg_conn.close_connection()
-        self.rd_conn.close_connection()
-        self.mongo_conn.close_connection()
+        # The flush timer keeps retrying failed writers while they drain
+        drained = defer.DeferredList([writer.drain(self.drain_timeout) for writer in self.writers])
+        drained.addCallback(lambda _: self.drain_rollbacks())
+        drained.addCallback(lambda _: self.close_connections(spider))
+        return drained
+
+    def drain_rollbacks(self):
+        """
+        Drains the writers again if the last writes of the other ones submitted rollbacks to them
+        after they were drained (all_or_nothing).
+
+        Returns:
+            Deferred: Fired once the rollbacks are written.
+        """
+        return defer.DeferredList([writer.drain(self.drain_timeout) for writer in self.writers if len(writer)])
+
+    def close_connections(self, spider):
+        """
+        Saves the Bloom filter and closes the PostgreSQL, Redis, and MongoDB connections and the file sink.
+
+        Args:
+            spider (scrapy.Spider): The spider object.
+        """
+        if self.flush_timer.running:
+            self.flush_timer.stop()
+
+        if self.bloom is not None and self.bloom_path:
+            self.bloom.save(self.bloom_path)
+
+        for conn in (self.pg_conn, self.rd_conn, self.mongo_conn):
+            if conn is not None:
+                conn.close_connection()
+        self.dedup_spill.close()
+        if self.file_sink is not None:
+            self.file_sink.close()
+        self.close_metrics(spider)
+
+    def open_metrics(self, spider):
+        """
+        Sets up the latency histograms of the pipeline stages and connector calls, and starts
+        the Prometheus metrics endpoint if METRICS_ENABLED.
+
+        Must be called once the connectors are created, as their calls are instrumented.
+
+        Args:
+            spider (scrapy.Spider): The spider object.
+        """
+        self.stats = spider.crawler.stats
+        self.metrics = PipelineMetrics()
+        connectors = (
+            ('postgres', self.pg_conn), ('redis', self.rd_conn), ('dedup', self.dedup_index), ('mongo', self.mongo_conn)
+        )
+        for name, connector in connectors:
+            # Only the bucketed index has calls of its own, the others go through the Redis connector
+            if connector is None:
+                continue
+            if name != 'dedup' or isinstance(connector, (BucketedHashIndex, AsyncBucketedHashIndex)):
+                self.metrics.instrument(connector, name, INSTRUMENTED_CALLS[name])
+
+        self.metrics_port = None
+        if spider.settings.getbool('METRICS_ENABLED'):
+            self.metrics_port = listen_metrics(
+                self.metrics,
+                self.stats,
+                spider.settings.getint('METRICS_PORT', 6080),
+                spider.settings.get('METRICS_INTERFACE', '')
+            )
+
+    def close_metrics(self, spider):
+        """
+        Writes the latency histograms to the Scrapy stats, logs their summary and stops the metrics endpoint.
+
+        Args:
+            spider (scrapy.Spider): The spider object.
+        """
+        self.metrics.update_stats(self.stats)
+        spider.logger.info("Pipeline latency summary:\n%s", self.metrics.summary())
+        if self.metrics_port is not None:
+            self.metrics_port.stopListening()
+
+    def create_connectors(self, settings):
+        """
+        Creates the PostgreSQL, Redis, and MongoDB connectors of the stores in use. With CONNECTION_POOLING
+        the connectors check out their connections from process-wide pools, shared with the other pipelines
+        and crawlers of the process and bounded by the *_POOL_SIZE settings.
+
+        Args:
+            settings (scrapy.settings.Settings): The crawler settings.
+
+        Returns:
+            tuple: The PostgreSQL, Redis, and MongoDB connectors, None for the stores not in use.
+        """
+        write_concern = settings.getdict('MONGO_WRITE_CONCERN') or None
+        use_postgres = 'postgres' in self.sink_names
+        use_redis = self.dedup_backend == 'redis'
+        use_mongo = 'mongo' in self.sink_names
+        if not settings.getbool('CONNECTION_POOLING'):
+            return (
+                PostgreSQLConnector() if use_postgres else None,
+                RedisConnector() if use_redis else None,
+                MongoDBConnector(write_concern=write_concern) if use_mongo else None,
+            )
+
+        timeout = settings.getfloat('POOL_CHECKOUT_TIMEOUT', 30.0)
+        return (
+            PooledPostgreSQLConnector(
+                max_size=settings.getint('POSTGRES_POOL_SIZE', 10), checkout_timeout=timeout
+            ) if use_postgres else None,
+            PooledRedisConnector(
+                max_size=settings.getint('REDIS_POOL_SIZE', 10), timeout=timeout
+            ) if use_redis else None,
+            PooledMongoDBConnector(
+                write_concern=write_concern, max_size=settings.getint('MONGO_POOL_SIZE', 10), timeout=timeout
+            ) if use_mongo else None,
+        )
+
+    def setup_stores(self, settings):
+        """
+        Creates the tables and indexes of the databases in use (and in upsert mode the unique req_id indexes),
+        and with DEDUP_MIGRATE_KEYS moves the string keys left over from the "keys" dedup store into the hashes.
+        With STORE_SETUP = False the crawler skips this, e.g. the processes of crawl_sharded.py, which sets up
+        the stores once before starting them (see setup_crawl_stores).
+
+        Args:
+            settings (scrapy.settings.Settings): The crawler settings.
+        """
+        upsert = settings.get('INGEST_MODE', 'insert') == 'upsert'
+        if self.pg_conn is not None:
+            # Create the jobs table in the PostgreSQL database (if it does not exist))
+            self.pg_conn.create_jobs_table()
+            if upsert:
+                self.pg_conn.create_upsert_index()
+        if self.mongo_conn is not None:
+            # Index the jobs in MongoDB: locations for the radius and bounding box queries, req_id, country_code,
+            # the tags array (multikey) and create_date
+            self.mongo_conn.create_job_indexes()
+            if upsert:
+                self.mongo_conn.create_upsert_index()
+        if isinstance(self.dedup_index, BucketedHashIndex) and settings.getbool('DEDUP_MIGRATE_KEYS', True):
+            self.migrate_dedup_keys(self.dedup_index)
+
+    def get_stores(self, settings):
+        """
+        Returns the sinks (JOB_SINKS) and the dedup backend (DEDUP_BACKEND) of the crawl.
+
+        Raises:
+            ValueError: A sink or the dedup backend is unknown.
+        """
+        sink_names = settings.getlist('JOB_SINKS', ['postgres', 'mongo'])
+        for name in sink_names:
+            if name not in SINKS:
+                raise ValueError(f"JOB_SINKS must be among {', '.join(SINKS)}, got {name}")
+        dedup_backend = settings.get('DEDUP_BACKEND', 'redis')
+        if dedup_backend not in DEDUP_BACKENDS:
+            raise ValueError(f"DEDUP_BACKEND must be one of {', '.join(DEDUP_BACKENDS)}, got {dedup_backend}")
+        return list(dict.fromkeys(sink_names)), dedup_backend
+
+    def create_dedup_index(self, settings):
+        """
+        Creates the dedup index of the job keys. In Redis: compact bucketed hashes (DEDUP_STORE = "hash")
+        with an optional DEDUP_RETENTION, or one string key per job (DEDUP_STORE = "keys").
+        With DEDUP_BACKEND = "memory", an in-process index of this run only.
+
+        Args:
+            settings (scrapy.settings.Settings): The crawler settings.
+
+        Returns:
+            BucketedHashIndex, StringKeyIndex or MemoryDedupIndex: The dedup index.
+        """
+        if self.dedup_backend == 'memory':
+            return MemoryDedupIndex()
+        if settings.get('DEDUP_STORE', 'hash') == 'keys':
+            return StringKeyIndex(self.rd_conn)
+
+        return BucketedHashIndex(
+            self.rd_conn,
+            num_buckets=settings.getint('DEDUP_BUCKETS', 65536),
+            retention=settings.getint('DEDUP_RETENTION', 0)
+        )
+
+    def migrate_dedup_keys(self, dedup_index):
+        """
+        Moves the job string keys left over from the "keys" dedup store into the bucketed hashes.
+        This is a no-op scan of the keyspace once they are migrated.
+
+        Args:
+            dedup_index (BucketedHashIndex): The dedup index.
+        """
+        migrated = dedup_index.migrate_keys()
+        if migrated:
+            print(f"Migrated {migrated} job keys into the Redis dedup hashes")
+
+    def create_file_sink(self, spider):
+        """
+        Opens the JSON Lines file sink at JSONL_SINK_PATH, where {spider} and {shard} are replaced
+        by the spider name and shard index, so that each crawler process appends to its own file.
+
+        Args:
+            spider (scrapy.Spider): The spider object.
+
+        Returns:
+            JsonlFileSink: The file sink.
+        """
+        path = spider.settings.get('JSONL_SINK_PATH', 'output/{spider}-{shard}.jsonl.gz').format(
+            spider=spider.name, shard=getattr(spider, 'shard_index', 0)
+        )
+        return JsonlFileSink(path, spider.settings.getint('JSONL_SINK_COMPRESSION_LEVEL', 1))
+
+    def create_spill(self, spider, name):
+        """
+        Opens the WRITE_SPILL_DIR segment files of a sink (or of the dedup batches) of this spider and shard.
+        Segments left over by a previous run are picked up again.
+
+        Args:
+            spider (scrapy.Spider): The spider object.
+            name (str): The name of the sink.
+
+        Returns:
+            SpillSegments: The segment files.
+        """
+        return SpillSegments(
+            spider.settings.get('WRITE_SPILL_DIR', 'spill'),
+            f"{spider.name}-{getattr(spider, 'shard_index', 0)}-{name}",
+            spider.settings.getint('WRITE_SPILL_SEGMENT_BYTES', 16 * 1024 * 1024)
+        )
+
+    def create_writer(self, spider, name, write_callback, sink_errors):
+        """
+        Creates the write queue of a sink, spilling to the WRITE_SPILL_DIR segment files of this
+        spider and shard. Segments left over by a previous run are replayed once the sink is available.
+
+        Args:
+            spider (scrapy.Spider): The spider object.
+            name (str): The name of the sink.
+            write_callback (callable): Writes a batch of records to the sink.
+            sink_errors (tuple): The exception types meaning that the sink is unavailable.
+
+        Returns:
+            SinkWriter: The write queue.
+        """
+        settings = spider.settings
+        return SinkWriter(
+            name,
+            write_callback,
+            self.create_spill(spider, name),
+            sink_errors,
+            self.stats,
+            max_pending=settings.getint('WRITE_QUEUE_MAX_BATCHES', 4),
+            spill_after=settings.getfloat('WRITE_SPILL_AFTER', 10.0),
+            retry_interval=settings.getfloat('WRITE_RETRY_INTERVAL', 5.0),
+            retry_failures=self.failure_mode != 'best_effort',
+            written_callback=lambda result: self.handle_write_result(name, result),
+            failed_callback=lambda batch: self.handle_failed_jobs(name, batch_jobs(batch), dropped=True)
+        )
+
+    def get_failure_mode(self, settings):
+        """
+        Returns the WRITE_FAILURE_MODE of the crawl.
+
+        Raises:
+            ValueError: The failure mode is unknown.
+        """
+        failure_mode = settings.get('WRITE_FAILURE_MODE', 'retry')
+        if failure_mode not in WRITE_FAILURE_MODES:
+            raise ValueError(
+                f"WRITE_FAILURE_MODE must be one of {', '.join(WRITE_FAILURE_MODES)}, got {failure_mode}"
+            )
+        return failure_mode
+
+    def handle_write_result(self, sink, result):
+        """
+        Handles the jobs a database sink did not write, called in the reactor thread with the result of a write.
+
+        Args:
+            sink (str): The name of the sink.
+            result (tuple): The (req_id, content_hash) of the jobs that could not be written, and of the jobs
+                skipped because their description could not be stored, which are released like dropped ones.
+        """
+        failed, skipped = result
+        self.handle_failed_jobs(sink, failed)
+        self.handle_failed_jobs(sink, skipped, dropped=True)
+
+    def handle_failed_jobs(self, sink, jobs, dropped=False):
+        """
+        Handles the jobs a sink could not write (after retrying them one by one), or that it dropped with
+        a whole batch (failing with an unexpected error, or unavailable in best_effort mode), called in the
+        reactor thread.
+
+        In all_or_nothing mode they are deleted from the other databases, or skipped there if not written yet,
+        and released from the dedup index, so that they are written again to both the next time they are seen.
+        In the other modes the jobs of a dropped batch (or skipped for a missing description) are released too,
+        rather than kept claimed but lost.
+
+        Args:
+            sink (str): The name of the sink.
+            jobs (list): The (req_id, content_hash) of the jobs.
+            dropped (bool): Whether the jobs were dropped with their batch.
+        """
+        if self.rejected_jobs:
+            # The jobs already undone are not handled twice
+            jobs = [job for job in jobs if job not in self.rejected_jobs]
+        if not jobs:
+            return
+        self.stats.inc_value(f'jobs/{sink}_failed', len(jobs))
+        if self.failure_mode != 'all_or_nothing':
+            if dropped:
+                self.release_jobs(jobs)
+            return
+
+        self.rejected_jobs.update(jobs)
+        for writer in self.writers:
+            # The file sink is append-only, it skips the jobs still queued but keeps the ones written
+            if writer.name != sink and SINKS[writer.name].database:
+                writer.submit([JobRollback(jobs)])
+        self.stats.inc_value('jobs/rolled_back', len(jobs))
+        self.release_jobs(jobs)
+
+    def release_jobs(self, jobs):
+        """
+        Releases the given (req_id, content_hash) jobs from the dedup index, so that they are claimed
+        again the next time they are seen.
+        """
+        try:
+            self.dedup_index.release_keys([f"job:{req_id}" for req_id, _ in jobs])
+            self.stats.inc_value('jobs/released', len(jobs))
+        except redis.RedisError:
+            # Reported by the dedup index, the jobs stay claimed
+            pass
+
+    def open_bloom_filter(self, settings):
+        """
+        Creates the Bloom filter front-cache, restoring it from BLOOM_FILTER_PATH if the file
+        exists or otherwise warming it with the jobs already stored in the Redis dedup index.
+        The filter holds the identities of the jobs in the index (see dedup_index.member), so a
+        persisted file must be deleted when DEDUP_STORE changes.
+
+        The filter only decides how a job is claimed (in a batch if the filter never saw it), every job
+        is still claimed atomically in Redis, so a persisted file older than Redis costs no duplicates.
+
+        Args:
+            settings (scrapy.settings.Settings): The crawler settings.
+
+        Returns:
+            BloomFilter: The Bloom filter.
+        """
+        if self.bloom_path and os.path.exists(self.bloom_path):
+            try:
+                return BloomFilter.load(self.bloom_path)
+            except (OSError, ValueError) as e:
+                print(f"Error loading Bloom filter, warming it from Redis instead: {e}")
+
+        bloom = BloomFilter(
+            settings.getint('BLOOM_FILTER_CAPACITY', 10000000),
+            settings.getfloat('BLOOM_FILTER_ERROR_RATE', 0.001)
+        )
+        if settings.getbool('BLOOM_FILTER_WARM_FROM_REDIS', True):
+            for member in self.dedup_index.scan_members():
+                bloom.add(member)
+        return bloom
 
     def check_field_existence(self, adapter, item, field_names):
         """
@@ -50,20 +680,58 @@ class JobsProjectPipeline:
         for field_name in field_names:
             if not adapter.get(field_name):
                 raise DropItem("Missing title in %s" % item)
-            
-    def str_to_type(self, adapter, field_name, field_type):
+
+    def prepare_record(self, item):
         """
-        Converts the field value to the specified type from str.
+        Validates and converts the job item and builds the record written to the databases,
+        in a single pass driven by the JOB_FIELDS spec.
+
+        JobItems are already coerced by the spider and are read directly from their slots,
+        other items (JobsProjectItem, dicts) are coerced here.
+
+        Args:
+            item (JobItem or dict): The job item extracted by the spider.
+
+        Returns:
+            JobRecord: The record of the job.
+
+        Raises:
+            DropItem: The item is missing a required field.
         """
-        if adapter.get(field_name) and isinstance(adapter[field_name], str):
-            adapter[field_name] = field_type(adapter[field_name])
+        if isinstance(item, JobItem):
+            values = list(job_item_values(item))
+            if not item.title or not item.req_id:
+                raise DropItem("Missing title in %s" % item)
+        else:
+            adapter = ItemAdapter(item)
+            # Check if the required fields are present in the item
+            self.check_field_existence(adapter, item, ['title', 'req_id'])
+            values = coerce_job_values(adapter.get)
 
-    # Function to parse and convert the timestamp
-    def convert_to_postgres_format(date_str):
-        # Parse the input date string
-        parsed_date = datetime.strptime(date_str, "%Y-%m-%dT%H:%M:%S%z")
-        # Return the string representation in ISO 8601 (PostgreSQL compatible)
-        return parsed_date.isoformat()
+        # PostgreSQL stores the list and dictionary fields as JSONB and MongoDB as arrays and embedded
+        # documents, so the row and the document keep the structured values.
+        # Hash the content of the job for change detection
+        content_hash = hashlib.blake2b(
+            json.dumps(values, default=str).encode('utf-8'), digest_size=16
+        ).hexdigest()
+        if isinstance(item, JobItem):
+            item.content_hash = content_hash
+        else:
+            adapter['content_hash'] = content_hash
+
+        # Compressed descriptions are stored apart, once per distinct description, and referenced by hash
+        description = None
+        if self.description_codec is not None and values[DESCRIPTION_INDEX]:
+            description = (description_hash(values[DESCRIPTION_INDEX]), values[DESCRIPTION_INDEX])
+            values[DESCRIPTION_INDEX] = None
+
+        document = build_document(values, content_hash, description[0] if description is not None else None)
+        values.append(content_hash)
+        values.append(description[0] if description is not None else None)
+
+        return JobRecord(
+            f"job:{values[REQ_ID_INDEX]}", content_hash, (ROW_FIELD_NAMES, values), document, description
+        )
 
     def process_item(self, item, spider):
         """
@@ -76,53 +744,759 @@ class JobsProjectPipeline:
         Returns:
             JobsProjectItem: The processed job item.
         """
-        adapter = ItemAdapter(item)
+        with self.metrics.timer('process_item'):
+            with self.metrics.timer('prepare'):
+                record = self.prepare_record(item)
 
-        # Check if the required fields are present in the item
-        self.check_field_existence(adapter, item, ['title', 'req_id'])
+            member = self.dedup_index.member(record.key) if self.bloom is not None else None
+            if member is not None and member not in self.bloom:
+                # The Bloom filter has never seen the job, so it is most likely new: it is claimed in a batch
+                # (and skipped there if it loses the claim) instead of holding the item for a round trip
+                self.bloom.add(member)
+                self.claim_buffer.add(record)
+            elif self.dedup_buffer is not None:
+                self.dedup_buffer.add(record)
+            else:
+                # Atomically claim the job (req_id) in the Redis database for duplicate detection
+                if not self.claim_records([record])[0]:
+                    if self.upsert:
+                        raise DropItem(f"Unchanged item found: {item}")
+                    raise DropItem(f"Duplicate item found: {item}")
+                self.write_record(record)
 
-        # Check if the job (req_id) already exists in the Redis database for duplicate detection
-        item_key = f"job:{adapter['req_id']}"
-        if self.rd_conn.exists_key(item_key):
-            raise DropItem(f"Duplicate item found: {item}")
-        else:
-            self.rd_conn.set_key(item_key, 1)
-
-        # Convert the timestamp to the PostgreSQL compatible format
-        if adapter.get('created_at'):
-            adapter['created_at'] = self.convert_to_postgres_format(adapter['created_at'])
-
-        if adapter.get('updated_at'):
-            adapter['updated_at'] = self.convert_to_postgres_format(adapter['updated_at'])
-
-        # Convert the field values to the specified types
-        self.str_to_type(adapter, 'latitude', float)
-        self.str_to_type(adapter, 'longitude', float)
-        self.str_to_type(adapter, 'salary_value', float)
-        self.str_to_type(adapter, 'salary_min_value', float)
-        self.str_to_type(adapter, 'salary_max_value', float)
-
-        # Convert the list and dictionary fields to JSON strings
-        for field in adapter.keys():
-            if isinstance(adapter[field], (dict, list)):
-                adapter[field] = json.dumps(adapter[field])
-
-        # Insert the job data into the PostgreSQL
-        field_names = ', '.join(adapter.keys())
-        field_values = ', '.join(['%s'] * len(adapter.keys()))
-        values = [adapter.get(key) for key in adapter.keys()]
+        # Hold the item while a write queue is full, so that the engine slows down instead of
+        # buffering more records than the databases can take
+        waits = [writer.wait_for_space() for writer in self.writers if writer.saturated()]
+        if waits:
+            return defer.DeferredList(waits).addCallback(lambda _: item)
+        return item
+
+    def claim_records(self, records, token=1):
+        """
+        Claims the keys of the given records in the Redis dedup index in a single round trip.
+
+        In insert mode a record is new if its key was not seen. In upsert mode the index holds
+        the content hash of the job, which is swapped atomically, so a record is new or changed
+        unless the previous hash is identical.
+
+        Args:
+            records (list): The records to claim.
+            token (str): The value the keys are claimed with in insert mode, unique to the batch if it may
+                be spilled and replayed (see claim_token).
+
+        Returns:
+            list: A boolean per record, True if the record must be written.
+        """
+        # The pending claims of the keys the Bloom filter reported as new are made first, in arrival order
+        if self.claim_buffer is not None:
+            self.claim_buffer.flush()
+
+        keys = [record.key for record in records]
+        with self.metrics.timer('dedup'):
+            if self.upsert:
+                previous_hashes = self.dedup_index.swap_keys(keys, [record.content_hash for record in records])
+                claimed = [previous != record.content_hash for previous, record in zip(previous_hashes, records)]
+            else:
+                claimed = self.dedup_index.claim_keys(keys, token)
+
+        if self.bloom is not None:
+            for key in keys:
+                self.bloom.add(self.dedup_index.member(key))
+        return claimed
+
+    def reclaim_records(self, entries):
+        """
+        Claims again the keys of spilled records, whose first claim failed part way.
+
+        In insert mode a key is claimed if it is unset or holds the token of the failed attempt (which
+        claimed it), so no record is lost to its own claim. In upsert mode the hashes are
+        swapped and every record is written again, the upserts of an unchanged job being idempotent.
+
+        Args:
+            entries (list): The spilled (claim token, record) pairs.
+
+        Returns:
+            list: A boolean per record, True if the record must be written.
+        """
+        keys = [record.key for _, record in entries]
+        with self.metrics.timer('dedup'):
+            if self.upsert:
+                self.dedup_index.swap_keys(keys, [record.content_hash for _, record in entries])
+                claimed = [True] * len(entries)
+            else:
+                previous_tokens = self.dedup_index.swap_keys(keys, [token for token, _ in entries])
+                claimed = []
+                seen = set()
+                for key, previous, (token, _) in zip(keys, previous_tokens, entries):
+                    # Keys repeated earlier in the batch are duplicates
+                    claimed.append(key not in seen and (previous is None or previous == token))
+                    seen.add(key)
+
+        if self.bloom is not None:
+            for key in keys:
+                self.bloom.add(self.dedup_index.member(key))
+        return claimed
+
+    def write_record(self, record):
+        """
+        Buffers a deduplicated record for the batched writes of each sink.
+
+        Args:
+            record (JobRecord): The record of the job.
+        """
+        # The description is written to the databases ahead of the job, in the same write queues
+        blob = self.compress_description(*record.description) if record.description is not None else None
+        # The records are built before any of them is buffered, as a full buffer is handed to its writer thread
+        sink_records = [(spec, buffer, spec.record(record)) for spec, buffer in self.sink_buffers]
+        for spec, buffer, sink_record in sink_records:
+            if blob is not None and spec.database:
+                buffer.add(blob)
+            buffer.add(sink_record)
+
+    def create_description_codec(self, settings):
+        """
+        Creates the codec of the descriptions stored compressed (DESCRIPTION_STORAGE = "compressed"),
+        with the preset dictionary of DESCRIPTION_DICTIONARY_PATH if set.
+
+        Args:
+            settings (scrapy.settings.Settings): The crawler settings.
+
+        Returns:
+            DescriptionCodec: The codec, or None if the descriptions are stored inline.
+        """
+        # The hashes of the descriptions written by this crawl, which are not sent again
+        self.written_descriptions = set()
+        # The hashes of the descriptions each database failed to store, whose jobs are not written until
+        # a later job sends them again (updated by the write queue of the database only)
+        self.missing_descriptions = {'postgres': set(), 'mongo': set()}
+        self.description_cache_size = settings.getint('DESCRIPTION_CACHE_SIZE', 100000)
+        if settings.get('DESCRIPTION_STORAGE', 'inline') != 'compressed':
+            return None
+
+        dictionary = b''
+        if settings.get('DESCRIPTION_DICTIONARY_PATH'):
+            with open(settings.get('DESCRIPTION_DICTIONARY_PATH'), 'rb') as f:
+                dictionary = f.read()
+        return DescriptionCodec(dictionary, settings.getint('DESCRIPTION_COMPRESSION_LEVEL', 9))
+
+    def compress_description(self, key, description):
+        """
+        Compresses a description, unless it was already written by this crawl.
+
+        Args:
+            key (str): The hash of the description.
+            description (str): The description.
+
+        Returns:
+            DescriptionBlob: The compressed description, or None if it was already written.
+        """
+        if key in self.written_descriptions:
+            return None
+        if len(self.written_descriptions) >= self.description_cache_size:
+            self.written_descriptions.clear()
+        self.written_descriptions.add(key)
+
+        blob = self.description_codec.compress(description, key)
+        self.stats.inc_value('jobs/descriptions_compressed')
+        self.stats.inc_value('jobs/description_bytes', len(description.encode('utf-8')))
+        self.stats.inc_value('jobs/description_compressed_bytes', len(blob.body))
+        return blob
+
+    def track_descriptions(self, sink, blobs, failed_hashes):
+        """
+        Tracks the compressed descriptions a database failed to store, called by its write queue before it
+        writes the jobs of a batch. Their hashes are forgotten by compress_description, so that the next job
+        with the same description sends it again, and until then the jobs referencing them are failed
+        instead of being written with a dangling description_hash.
+
+        Args:
+            sink (str): The name of the database sink.
+            blobs (list): The DescriptionBlobs of the batch.
+            failed_hashes (list): The hashes of the descriptions that could not be stored.
+
+        Returns:
+            set: The hashes of the descriptions missing from the database.
+        """
+        missing = self.missing_descriptions[sink]
+        if failed_hashes:
+            failed_hashes = set(failed_hashes)
+            self.written_descriptions.difference_update(failed_hashes)
+        missing.difference_update(blob.hash for blob in blobs if blob.hash not in failed_hashes)
+        missing.update(failed_hashes)
+        return missing
+
+    def flush_dedup(self, records):
+        """
+        Claims the keys of the buffered records in a single pipelined Redis round trip
+        and passes on the records that were not seen before (or changed, in upsert mode).
+
+        Items have already left the pipeline at this point, so skipped records are counted
+        in the 'jobs/duplicates' (or 'jobs/unchanged') stat instead of being dropped with DropItem.
+        If the claims fail, the batch is spilled and replayed later by replay_dedup.
+
+        Args:
+            records (list): The buffered records.
+        """
+        token = self.claim_token()
         try:
-            # Data processing and insertion
-            self.pg_conn.insert_jobs_data(field_names, field_values, values)
+            claimed = self.claim_records(records, token)
         except Exception as e:
-            print(f"Error processing item: {e}")
-            raise DropItem(f"Failed to process item: {item}")
+            print(f"Error deduplicating batch of {len(records)} items, spilling it: {e}")
+            self.dedup_spill.append([(token, record) for record in records])
+            self.stats.inc_value('jobs/dedup_spilled', len(records))
+            return
+        self.write_claimed(records, claimed)
 
-        # Insert the job data into the MongoDB
+    def claim_token(self):
+        """
+        Returns the claim token of a new dedup batch, the prefix of the crawl followed by the number of
+        the batch (in hex).
+        """
+        return f'{self.claim_prefix}{next(self.claim_batches):x}'
+
+    def write_claimed(self, records, claimed):
+        """
+        Writes the claimed records of a dedup batch and counts the others.
+        """
+        for record, is_new in zip(records, claimed):
+            if is_new:
+                self.write_record(record)
+            else:
+                self.stats.inc_value('jobs/unchanged' if self.upsert else 'jobs/duplicates')
+
+    def replay_dedup(self):
+        """
+        Replays the spilled dedup batches, oldest first, until the dedup index fails again.
+        """
+        while self.dedup_spill:
+            spilled = self.dedup_spill.read(self.dedup_replay_records)
+            if spilled is None:
+                return
+            entries, path, offset = spilled
+            try:
+                claimed = self.reclaim_records(entries)
+            except Exception as e:
+                print(f"Error replaying {len(entries)} spilled dedup records, retrying later: {e}")
+                return
+            self.write_claimed([record for _, record in entries], claimed)
+            self.dedup_spill.commit(path, offset)
+            self.stats.inc_value('jobs/dedup_replayed', len(entries))
+
+    def flush_due_buffers(self):
+        """
+        Flushes the buffers whose flush interval has elapsed, called periodically so that
+        buffered records are written even when no new items arrive.
+        """
+        self.replay_dedup()
+        for buffer in self.buffers:
+            buffer.flush_if_due()
+        for writer in self.writers:
+            writer.check()
+
+    def flush_postgres(self, rows):
+        """
+        Inserts the buffered rows into PostgreSQL, one batch per distinct set of field names.
+
+        If a batch fails, its rows are retried one by one so that a single bad row
+        does not discard the rest of the batch. Called by the PostgreSQL write queue in a worker thread.
+
+        Args:
+            rows (list): The buffered (field_names, values) tuples.
+
+        Returns:
+            tuple: The (req_id, content_hash) of the jobs that could not be written, and of the jobs not written
+                because their description could not be stored (see handle_write_result).
+
+        Raises:
+            POSTGRES_SINK_ERRORS: PostgreSQL is unavailable, the write queue spills the rows and retries them.
+        """
+        failed = []
+        skipped = []
+        flushed = 0
+        with self.metrics.timer('postgres'):
+            self.pg_conn.ensure_connection()
+            # The compressed descriptions are written before the jobs referencing them
+            blobs = [row for row in rows if isinstance(row, DescriptionBlob)]
+            failed_descriptions = []
+            if blobs:
+                try:
+                    self.pg_conn.insert_descriptions(blobs)
+                except POSTGRES_SINK_ERRORS:
+                    raise
+                except Exception as e:
+                    print(f"Error inserting {len(blobs)} descriptions, failing their jobs: {e}")
+                    failed_descriptions = [blob.hash for blob in blobs]
+            missing_descriptions = self.track_descriptions('postgres', blobs, failed_descriptions)
+
+            batches = {}
+            rollbacks = []
+            for row in rows:
+                if isinstance(row, JobRollback):
+                    rollbacks.extend(row.jobs)
+                elif not isinstance(row, DescriptionBlob):
+                    field_names, values = row
+                    flushed += 1
+                    # The jobs undone after failing on MongoDB are not written
+                    if self.rejected_jobs and (values[REQ_ID_INDEX], values[CONTENT_HASH_INDEX]) in self.rejected_jobs:
+                        continue
+                    if missing_descriptions and values[DESCRIPTION_HASH_INDEX] in missing_descriptions:
+                        skipped.append((values[REQ_ID_INDEX], values[CONTENT_HASH_INDEX]))
+                        continue
+                    batches.setdefault(field_names, []).append(values)
+
+            for field_names, batch in batches.items():
+                if self.upsert:
+                    # A statement cannot upsert the same req_id twice, the last version of each job wins
+                    req_id_index = [name.strip() for name in field_names.split(',')].index('req_id')
+                    batch = list({values[req_id_index]: values for values in batch}.values())
+                try:
+                    if self.upsert:
+                        self.pg_conn.upsert_jobs_batch(field_names, batch)
+                    else:
+                        self.pg_conn.insert_jobs_batch(field_names, batch)
+                except POSTGRES_SINK_ERRORS:
+                    raise
+                except Exception as e:
+                    print(f"Error inserting batch of {len(batch)} rows, retrying row by row: {e}")
+                    field_values = ', '.join(['%s'] * len(batch[0]))
+                    for values in batch:
+                        try:
+                            if self.upsert:
+                                self.pg_conn.upsert_jobs_batch(field_names, [values])
+                            else:
+                                self.pg_conn.insert_jobs_data(field_names, field_values, values)
+                        except POSTGRES_SINK_ERRORS:
+                            raise
+                        except Exception as e:
+                            print(f"Error processing item: {e}")
+                            failed.append((values[REQ_ID_INDEX], values[CONTENT_HASH_INDEX]))
+
+            if rollbacks:
+                try:
+                    self.pg_conn.delete_jobs(rollbacks)
+                except POSTGRES_SINK_ERRORS:
+                    raise
+                except Exception as e:
+                    print(f"Error deleting {len(rollbacks)} jobs that failed on MongoDB: {e}")
+        self.stats.inc_value('jobs/postgres_flushed', flushed)
+        return failed, skipped
+
+    def flush_mongo(self, documents):
+        """
+        Inserts (or upserts, in upsert mode) the buffered documents into MongoDB with a single unordered bulk write.
+
+        Documents that fail are reported by the connector without failing the rest of the batch.
+        Called by the MongoDB write queue in a worker thread.
+
+        Args:
+            documents (list): The buffered documents.
+
+        Returns:
+            tuple: The (req_id, content_hash) of the jobs that could not be written, and of the jobs not written
+                because their description could not be stored (see handle_write_result).
+
+        Raises:
+            MONGO_SINK_ERRORS: MongoDB is unavailable, the write queue spills the documents and retries them.
+        """
+        failed = []
+        skipped = []
+        with self.metrics.timer('mongo'):
+            # The compressed descriptions are written before the jobs referencing them
+            blobs = [document for document in documents if isinstance(document, DescriptionBlob)]
+            rollbacks = [job for document in documents if isinstance(document, JobRollback) for job in document.jobs]
+            documents = [document for document in documents if isinstance(document, dict)]
+            flushed = len(documents)
+            if self.rejected_jobs:
+                # The jobs undone after failing on PostgreSQL are not written
+                documents = [
+                    document for document in documents
+                    if (document['req_id'], document['content_hash']) not in self.rejected_jobs
+                ]
+            failed_descriptions = []
+            if blobs:
+                try:
+                    failed_descriptions = self.mongo_conn.insert_descriptions(blobs, ordered=False)
+                except MONGO_SINK_ERRORS:
+                    raise
+                except Exception as e:
+                    print(f"Error inserting {len(blobs)} descriptions into MongoDB, failing their jobs: {e}")
+                    failed_descriptions = [blob.hash for blob in blobs]
+            missing_descriptions = self.track_descriptions('mongo', blobs, failed_descriptions)
+            if missing_descriptions:
+                skipped = [
+                    (document['req_id'], document['content_hash']) for document in documents
+                    if document.get('description_hash') in missing_descriptions
+                ]
+                documents = [
+                    document for document in documents if document.get('description_hash') not in missing_descriptions
+                ]
+            try:
+                write_errors = []
+                if self.upsert and documents:
+                    write_errors = self.mongo_conn.upsert_many_data(documents, key='req_id', ordered=False)
+                elif documents:
+                    write_errors = self.mongo_conn.insert_many_data(documents, ordered=False)
+                # Documents already stored (e.g. by a replayed batch) are not failures
+                failed += [
+                    (documents[error['index']]['req_id'], documents[error['index']]['content_hash'])
+                    for error in write_errors if error.get('code') != DUPLICATE_KEY_ERROR and 'index' in error
+                ]
+            except MONGO_SINK_ERRORS:
+                raise
+            except Exception as e:
+                print(f"Error inserting batch of {len(documents)} documents into MongoDB: {e}")
+                failed += [(document['req_id'], document['content_hash']) for document in documents]
+
+            if rollbacks:
+                try:
+                    self.mongo_conn.delete_jobs(rollbacks)
+                except MONGO_SINK_ERRORS:
+                    raise
+                except Exception as e:
+                    print(f"Error deleting {len(rollbacks)} jobs that failed on PostgreSQL: {e}")
+        self.stats.inc_value('jobs/mongo_flushed', flushed)
+        return failed, skipped
+
+    def flush_jsonl(self, documents):
+        """
+        Appends the buffered documents to the JSON Lines file sink, called by its write queue in a worker thread.
+
+        Args:
+            documents (list): The buffered documents.
+        """
+        with self.metrics.timer('jsonl'):
+            # The rollbacks of all_or_nothing are not sent to the file sink, the jobs undone are skipped
+            if self.rejected_jobs:
+                documents = [
+                    document for document in documents
+                    if (document['req_id'], document['content_hash']) not in self.rejected_jobs
+                ]
+            self.file_sink.write(documents)
+        self.stats.inc_value('jobs/jsonl_flushed', len(documents))
+
+def setup_crawl_stores(settings):
+    """
+    Sets up the stores of a crawl once (see JobsProjectPipeline.setup_stores), before starting crawler
+    processes that skip it (STORE_SETUP = False), so that they do not all change the schema at once.
+
+    Args:
+        settings (scrapy.settings.Settings): The settings of the crawlers.
+    """
+    pipeline = JobsProjectPipeline()
+    pipeline.sink_names, pipeline.dedup_backend = pipeline.get_stores(settings)
+    pipeline.pg_conn, pipeline.rd_conn, pipeline.mongo_conn = pipeline.create_connectors(settings)
+    try:
+        pipeline.dedup_index = pipeline.create_dedup_index(settings)
+        pipeline.setup_stores(settings)
+    finally:
+        for conn in (pipeline.pg_conn, pipeline.rd_conn, pipeline.mongo_conn):
+            if conn is not None:
+                conn.close_connection()
+
+class NearDuplicatePipeline:
+    """
+    Optional stage detecting jobs that are near-duplicates of a job already seen under another req_id,
+    e.g. the same job reposted by another source or ATS, from the MinHash signatures of NEAR_DUP_FIELDS
+    looked up in an LSH index. Near-duplicates are dropped, or with NEAR_DUP_ACTION = "link" kept and
+    linked to the original req_id in the index.
+
+    The index is kept in-process and persisted to NEAR_DUP_INDEX_PATH, or with NEAR_DUP_STORE = "redis"
+    stored in Redis and shared by all the crawlers. Enable it before the storage pipeline, e.g.
+    ITEM_PIPELINES = {'jobs_project.pipelines.NearDuplicatePipeline': 200, 'jobs_project.pipelines.JobsProjectPipeline': 300}.
+    """
+    def open_spider(self, spider):
+        """
+        Creates the near-duplicate detector and loads or connects its LSH index.
+
+        Args:
+            spider (scrapy.Spider): The spider object.
+        """
+        settings = spider.settings
+        self.stats = spider.crawler.stats
+        self.field_names = settings.getlist('NEAR_DUP_FIELDS', ['title', 'description', 'hiring_organization'])
+        self.link = settings.get('NEAR_DUP_ACTION', 'drop') == 'link'
+        self.index_path = settings.get('NEAR_DUP_INDEX_PATH')
+
+        bands = settings.getint('NEAR_DUP_BANDS', 16)
+        bucket_size = settings.getint('NEAR_DUP_BUCKET_SIZE', 32)
+        num_perm = settings.getint('NEAR_DUP_NUM_PERM', 64)
+        shingle_size = settings.getint('NEAR_DUP_SHINGLE_SIZE', 3)
+        if settings.get('NEAR_DUP_STORE', 'local') == 'redis':
+            rd_conn = PooledRedisConnector() if settings.getbool('CONNECTION_POOLING') else RedisConnector()
+            index = RedisLSHIndex(rd_conn, bands, bucket_size, num_perm=num_perm, shingle_size=shingle_size)
+        else:
+            index = None
+            if self.index_path and os.path.exists(self.index_path):
+                try:
+                    index = LocalLSHIndex.load(self.index_path)
+                except (OSError, ValueError) as e:
+                    print(f"Error loading LSH index, starting an empty one: {e}")
+            # Signatures computed with other parameters are not comparable
+            if index is not None and index.params() != (bands, num_perm, shingle_size):
+                print(f"LSH index built with bands, num_perm and shingle_size {index.params()}, starting an empty one")
+                index = None
+            if index is None:
+                index = LocalLSHIndex(bands, bucket_size, num_perm, shingle_size)
+
+        self.detector = NearDuplicateDetector(
+            MinHasher(num_perm, shingle_size),
+            index,
+            bands,
+            settings.getfloat('NEAR_DUP_THRESHOLD', 0.8)
+        )
+
+    def close_spider(self, spider):
+        """
+        Persists the local LSH index to NEAR_DUP_INDEX_PATH, or closes the Redis connection.
+
+        Args:
+            spider (scrapy.Spider): The spider object.
+        """
+        index = self.detector.index
+        if isinstance(index, LocalLSHIndex) and self.index_path:
+            index.save(self.index_path)
+        index.close()
+
+    def process_item(self, item, spider):
+        """
+        Drops (or links) the job if it is a near-duplicate of a job seen under another req_id.
+
+        Args:
+            item (JobItem or dict): The job item extracted by the spider.
+            spider (scrapy.Spider): The spider object.
+
+        Returns:
+            JobItem or dict: The job item.
+
+        Raises:
+            DropItem: The job is a near-duplicate and NEAR_DUP_ACTION is "drop".
+        """
+        adapter = ItemAdapter(item)
+        req_id = adapter.get('req_id')
+        if not req_id:
+            return item
+
+        text = ' '.join(str(adapter.get(field_name) or '') for field_name in self.field_names)
+        # Dropped near-duplicates are not indexed, so that later reposts are compared with the original
+        match = self.detector.find(str(req_id), text, index_duplicates=self.link)
+        if match is None:
+            return item
+
+        original, score = match
+        if self.link:
+            self.detector.index.link(str(req_id), original)
+            self.stats.inc_value('jobs/near_duplicates_linked')
+            return item
+        self.stats.inc_value('jobs/near_duplicates')
+        raise DropItem(f"Near-duplicate of {original} (similarity {score:.2f}) found: {item}")
+
+class AsyncJobsProjectPipeline(JobsProjectPipeline):
+    """
+    Variant of JobsProjectPipeline for the asyncio reactor, using asyncio drivers for PostgreSQL,
+    Redis and MongoDB so that storage calls do not block the reactor.
+
+    Each item is claimed in Redis and written to both databases concurrently as soon as it arrives,
+    with up to ASYNC_PIPELINE_CONCURRENCY items in flight at once. Enable it with
+    ITEM_PIPELINES = {'jobs_project.pipelines.AsyncJobsProjectPipeline': 300}.
+    """
+    def open_spider(self, spider):
+        """
+        Initializes the asyncio PostgreSQL, Redis, and MongoDB connectors.
+
+        Args:
+            spider (scrapy.Spider): The spider object.
+        """
+        return deferred_from_coro(self._open_spider(spider))
+
+    async def _open_spider(self, spider):
+        concurrency = spider.settings.getint('ASYNC_PIPELINE_CONCURRENCY', 64)
+        self.semaphore = asyncio.Semaphore(concurrency)
+
+        self.pg_conn = AsyncPostgreSQLConnector(max_size=concurrency)
+        await self.pg_conn.connect_postgresql()
+        self.rd_conn = AsyncRedisConnector()
+        self.dedup_index = self.create_dedup_index(spider.settings)
+        self.mongo_conn = AsyncMongoDBConnector(write_concern=spider.settings.getdict('MONGO_WRITE_CONCERN') or None)
+        self.open_metrics(spider)
+        if spider.settings.getbool('STORE_SETUP', True):
+            await self.setup_stores(spider.settings)
+
+        self.description_codec = self.create_description_codec(spider.settings)
+        if self.description_codec is not None and self.description_codec.dictionary:
+            await self.pg_conn.insert_description_dictionary(self.description_codec.dictionary)
+            await self.mongo_conn.insert_description_dictionary(self.description_codec.dictionary)
+
+        self.upsert = spider.settings.get('INGEST_MODE', 'insert') == 'upsert'
+
+        # In retry mode the writes that failed are retried in the background, without holding back their item
+        self.failure_mode = self.get_failure_mode(spider.settings)
+        self.drain_timeout = spider.settings.getfloat('WRITE_DRAIN_TIMEOUT', 60.0)
+        self.retry_queues = {
+            name: AsyncRetryQueue(
+                name,
+                self.stats,
+                retry_interval=spider.settings.getfloat('WRITE_RETRY_INTERVAL', 5.0),
+                max_attempts=spider.settings.getint('WRITE_RETRY_ATTEMPTS', 5),
+                max_pending=concurrency
+            )
+            for name in ('postgres', 'mongo')
+        }
+
+    def close_spider(self, spider):
+        """
+        Waits for the pending retries (up to WRITE_DRAIN_TIMEOUT) and closes the PostgreSQL, Redis,
+        and MongoDB connections.
+
+        Args:
+            spider (scrapy.Spider): The spider object.
+        """
+        return deferred_from_coro(self._close_spider(spider))
+
+    async def _close_spider(self, spider):
+        await asyncio.gather(*(queue.drain(self.drain_timeout) for queue in self.retry_queues.values()))
+        await self.pg_conn.close_connection()
+        await self.rd_conn.close_connection()
+        self.mongo_conn.close_connection()
+        self.close_metrics(spider)
+
+    def create_dedup_index(self, settings):
+        """
+        Creates the asyncio counterpart of the dedup index of JobsProjectPipeline: the bucketed
+        hashes (DEDUP_STORE = "hash"), or the string keys of the asyncio Redis connector.
+
+        Args:
+            settings (scrapy.settings.Settings): The crawler settings.
+
+        Returns:
+            AsyncBucketedHashIndex or AsyncRedisConnector: The dedup index.
+        """
+        if settings.get('DEDUP_STORE', 'hash') == 'keys':
+            return self.rd_conn
+
+        return AsyncBucketedHashIndex(
+            self.rd_conn, settings.getint('DEDUP_BUCKETS', 65536), settings.getint('DEDUP_RETENTION', 0)
+        )
+
+    async def setup_stores(self, settings):
+        """
+        Asyncio counterpart of JobsProjectPipeline.setup_stores.
+
+        Args:
+            settings (scrapy.settings.Settings): The crawler settings.
+        """
+        await self.pg_conn.create_jobs_table()
+        await self.mongo_conn.create_job_indexes()
+        if settings.get('INGEST_MODE', 'insert') == 'upsert':
+            await self.pg_conn.create_upsert_index()
+            await self.mongo_conn.create_upsert_index()
+        if isinstance(self.dedup_index, AsyncBucketedHashIndex) and settings.getbool('DEDUP_MIGRATE_KEYS', True):
+            # Migrated once with a blocking client, before any item is claimed
+            rd_conn = RedisConnector()
+            try:
+                self.migrate_dedup_keys(
+                    BucketedHashIndex(rd_conn, self.dedup_index.num_buckets, self.dedup_index.retention)
+                )
+            finally:
+                rd_conn.close_connection()
+
+    async def process_item(self, item, spider):
+        """
+        Processes the job item extracted by the spider.
+
+        Args:
+            item (dict): The job item extracted by the spider.
+            spider (scrapy.Spider): The spider object.
+
+        Returns:
+            JobsProjectItem: The processed job item.
+        """
+        with self.metrics.timer('process_item'):
+            with self.metrics.timer('prepare'):
+                record = self.prepare_record(item)
+            field_names, values = record.row
+
+            async with self.semaphore:
+                if self.upsert:
+                    # Atomically swap the content hash of the job, unchanged jobs are skipped
+                    if await self.dedup_index.swap_key(record.key, record.content_hash) == record.content_hash:
+                        raise DropItem(f"Unchanged item found: {item}")
+                    writes = {
+                        'postgres': lambda: self.pg_conn.upsert_jobs_data(field_names, values),
+                        'mongo': lambda: self.mongo_conn.upsert_data(record.document, key='req_id'),
+                    }
+                else:
+                    # Atomically claim the job (req_id) in the Redis database for duplicate detection
+                    if not await self.dedup_index.claim_key(record.key):
+                        raise DropItem(f"Duplicate item found: {item}")
+                    field_values = ', '.join(['%s'] * len(values))
+                    writes = {
+                        'postgres': lambda: self.pg_conn.insert_jobs_data(field_names, field_values, values),
+                        'mongo': lambda: self.mongo_conn.insert_data(record.document),
+                    }
+
+                # The compressed description is written ahead of the job, in the same write (and retries),
+                # so that no job references a description its database failed to store
+                blob = self.compress_description(*record.description) if record.description is not None else None
+                if blob is not None:
+                    writes = {
+                        'postgres': chain_writes(lambda: self.pg_conn.insert_description(blob), writes['postgres']),
+                        'mongo': chain_writes(lambda: self.mongo_conn.insert_description(blob), writes['mongo']),
+                    }
+
+                # Write the job data into PostgreSQL and MongoDB concurrently, the item waits for the slower one
+                results = await asyncio.gather(*(write() for write in writes.values()), return_exceptions=True)
+                if blob is not None and any(isinstance(result, Exception) for result in results):
+                    # Written again with the next job sharing the description
+                    self.written_descriptions.discard(blob.hash)
+
+            failed = []
+            for sink, result in zip(writes, results):
+                if isinstance(result, Exception):
+                    print(f"Error writing item to {sink}: {result}")
+                    failed.append(sink)
+            if failed:
+                await self.handle_failed_writes(item, record, writes, failed)
+
+        return item
+
+    async def handle_failed_writes(self, item, record, writes, failed):
+        """
+        Applies the WRITE_FAILURE_MODE to a job whose write failed on some of the databases: the failed
+        writes are retried in the background (retry), the job is kept in the other databases (best_effort),
+        or its writes are undone (all_or_nothing). A job that ends up in no database is dropped and
+        released from the dedup index, so that it is written again the next time it is seen.
+
+        Args:
+            item (dict): The job item.
+            record (JobRecord): The record of the job.
+            writes (dict): The write of the job to each sink, as callables returning its coroutine.
+            failed (list): The names of the sinks whose write failed.
+
+        Raises:
+            DropItem: The job was not written.
+        """
+        for sink in failed:
+            self.stats.inc_value(f'jobs/{sink}_failed')
+        if self.failure_mode == 'retry':
+            for sink in failed:
+                await self.retry_queues[sink].submit(writes[sink])
+            return
+        if self.failure_mode == 'best_effort' and len(failed) < len(writes):
+            return
+
+        if self.failure_mode == 'all_or_nothing':
+            undo = {'postgres': self.pg_conn.delete_job, 'mongo': self.mongo_conn.delete_job}
+            job = (record.row[1][REQ_ID_INDEX], record.content_hash)
+            results = await asyncio.gather(
+                *(undo[sink](*job) for sink in writes if sink not in failed), return_exceptions=True
+            )
+            for result in results:
+                if isinstance(result, Exception):
+                    print(f"Error undoing the write of item: {result}")
+            self.stats.inc_value('jobs/rolled_back')
         try:
-            self.mongo_conn.insert_data(adapter.asdict())
-        except Exception as e:
-            print(f"Error processing item: {e}")
-            raise DropItem(f"Failed to process item: {item}")
-        
-        return item
\ No newline at end of file
+            await self.dedup_index.release_key(record.key)
+        except redis.RedisError:
+            # Reported by the dedup index, the job stays claimed
+            pass
+        raise DropItem(f"Failed to process item: {item}")
@@ -87,6 +87,141 @@ ROBOTSTXT_OBEY = True
 #HTTPCACHE_IGNORE_HTTP_CODES = []
 #HTTPCACHE_STORAGE = "scrapy.extensions.httpcache.FilesystemCacheStorage"
 
+# Parse the input JSON files incrementally, yielding each job as it is decoded
+# instead of loading the whole document into memory (can be overridden with -a streaming=0)
+JSON_STREAMING = True
+
+# "insert" appends new jobs and skips the req_ids already seen. "upsert" keys the jobs on req_id
+# (unique index in PostgreSQL, upserts in MongoDB): the Redis key of each job holds its content hash,
+# so changed jobs update the stored ones and unchanged jobs are skipped without touching the databases
+INGEST_MODE = "insert"
+
+# The stores of JobsProjectPipeline, each enabled independently. JOB_SINKS lists the sinks the jobs are
+# written to: "postgres", "mongo" and "jsonl" (an append-only JSON Lines file at JSONL_SINK_PATH, gzip-compressed
+# at JSONL_SINK_COMPRESSION_LEVEL when the path ends with .gz, {spider} and {shard} are replaced by the spider
+# name and shard index). DEDUP_BACKEND is "redis" (the index below, shared between runs and crawlers)
+# or "memory" (an in-process index of this run only). AsyncJobsProjectPipeline always uses PostgreSQL,
+# MongoDB and Redis
+JOB_SINKS = ["postgres", "mongo"]
+DEDUP_BACKEND = "redis"
+JSONL_SINK_PATH = "output/{spider}-{shard}.jsonl.gz"
+JSONL_SINK_COMPRESSION_LEVEL = 1
+JSONL_BATCH_SIZE = 1000
+JSONL_FLUSH_INTERVAL = 5.0
+
+# Deduplicate the items against Redis one by one (DEDUP_BATCH_SIZE = 1), dropping duplicates with DropItem.
+# Above 1 (opt-in, e.g. 500), the whole batch is claimed atomically (SET NX) in one pipelined round trip,
+# but the items have already been passed on by then: duplicates are not dropped, only counted in the
+# jobs/duplicates (or jobs/unchanged) stat
+DEDUP_BATCH_SIZE = 1
+DEDUP_FLUSH_INTERVAL = 5.0
+
+# Keep an in-process Bloom filter in front of Redis so that the req_ids the filter has never seen
+# are claimed in pipelined batches (still with SET NX) instead of one round trip per item, while the
+# ones it reports as possibly seen are claimed as set by DEDUP_BATCH_SIZE. The filter is sized for
+# BLOOM_FILTER_CAPACITY keys at BLOOM_FILTER_ERROR_RATE false positives, restored from BLOOM_FILTER_PATH
+# when that file exists (and saved there at the end of the crawl), and otherwise warmed from Redis
+BLOOM_FILTER_ENABLED = False
+BLOOM_FILTER_CAPACITY = 10000000
+BLOOM_FILTER_ERROR_RATE = 0.001
+BLOOM_FILTER_PATH = ""
+BLOOM_FILTER_WARM_FROM_REDIS = True
+
+# The Redis dedup index. "hash" packs the jobs into DEDUP_BUCKETS small hashes (a few bytes per job,
+# keep DEDUP_BUCKETS above the expected number of jobs / 100) and forgets the jobs not seen for
+# DEDUP_RETENTION seconds (0 keeps them forever). "keys" stores one job:{req_id} string key per job.
+# With DEDUP_MIGRATE_KEYS, job:* keys left over from the "keys" store are moved into the hashes at startup
+DEDUP_STORE = "hash"
+DEDUP_BUCKETS = 65536
+DEDUP_RETENTION = 0
+DEDUP_MIGRATE_KEYS = True
+
+# Create the tables and indexes of the stores (and migrate the dedup keys) when the spider opens.
+# crawl_sharded.py does it once before starting the crawler processes and disables it in them
+STORE_SETUP = True
+
+# Settings of NearDuplicatePipeline (disabled unless added to ITEM_PIPELINES), which drops the jobs whose
+# NEAR_DUP_FIELDS are near-duplicates (estimated Jaccard similarity of the word shingles of at least
+# NEAR_DUP_THRESHOLD) of a job seen under another req_id, or keeps and links them with NEAR_DUP_ACTION = "link".
+# The MinHash signatures (NEAR_DUP_NUM_PERM values) are split into NEAR_DUP_BANDS LSH bands, keeping
+# NEAR_DUP_BUCKET_SIZE jobs per bucket. The index is in-process, persisted to NEAR_DUP_INDEX_PATH, or in
+# Redis with NEAR_DUP_STORE = "redis" (required to detect near-duplicates across crawl_sharded.py processes)
+NEAR_DUP_FIELDS = ["title", "description", "hiring_organization"]
+NEAR_DUP_ACTION = "drop"
+NEAR_DUP_THRESHOLD = 0.8
+NEAR_DUP_NUM_PERM = 64
+NEAR_DUP_BANDS = 16
+NEAR_DUP_SHINGLE_SIZE = 3
+NEAR_DUP_BUCKET_SIZE = 32
+NEAR_DUP_STORE = "local"
+NEAR_DUP_INDEX_PATH = "near_duplicates.lsh"
+
+# "compressed" stores each distinct job description once, compressed with zlib (using the preset dictionary
+# of DESCRIPTION_DICTIONARY_PATH if set, see descriptions.py train) at DESCRIPTION_COMPRESSION_LEVEL, in the
+# job_descriptions table and raw_descriptions collection keyed by its hash; the jobs only keep the
+# description_hash (so their descriptions are not part of the full-text search_vector). The hashes of the
+# last DESCRIPTION_CACHE_SIZE descriptions written are remembered so that they are not sent again.
+# "inline" stores the descriptions in the jobs
+DESCRIPTION_STORAGE = "inline"
+DESCRIPTION_DICTIONARY_PATH = ""
+DESCRIPTION_COMPRESSION_LEVEL = 9
+DESCRIPTION_CACHE_SIZE = 100000
+
+# Buffer the PostgreSQL rows in the pipeline and insert them in batches,
+# flushing once POSTGRES_BATCH_SIZE rows are buffered or every POSTGRES_FLUSH_INTERVAL seconds
+POSTGRES_BATCH_SIZE = 500
+POSTGRES_FLUSH_INTERVAL = 5.0
+
+# Buffer the MongoDB documents and insert them with unordered bulk inserts,
+# using the given write concern options (see pymongo.write_concern.WriteConcern)
+MONGO_BATCH_SIZE = 500
+MONGO_FLUSH_INTERVAL = 5.0
+MONGO_WRITE_CONCERN = {"w": 1}
+
+# PostgreSQL and MongoDB batches are written by worker threads through bounded queues. When
+# WRITE_QUEUE_MAX_BATCHES batches are waiting for a database, items are held back (backpressure);
+# when a write takes longer than WRITE_SPILL_AFTER seconds, or the database is unavailable, batches
+# are spilled to append-only segment files in WRITE_SPILL_DIR and replayed in bulk once it recovers
+# (failed databases are retried every WRITE_RETRY_INTERVAL seconds). Closing the spider waits up to
+# WRITE_DRAIN_TIMEOUT seconds for the queues to drain, leftover segments are replayed by the next run
+WRITE_QUEUE_MAX_BATCHES = 4
+WRITE_SPILL_AFTER = 10.0
+WRITE_SPILL_DIR = "spill"
+WRITE_SPILL_SEGMENT_BYTES = 16777216
+WRITE_RETRY_INTERVAL = 5.0
+WRITE_DRAIN_TIMEOUT = 60.0
+
+# What happens to a job whose write fails on one of the databases, which are written concurrently:
+#   "retry": unavailable databases are retried (spill segments, or WRITE_RETRY_ATTEMPTS background
+#            retries in AsyncJobsProjectPipeline), jobs a database rejects are kept in the other one
+#   "best_effort": failed writes are reported and dropped, the job is kept in the other database
+#   "all_or_nothing": jobs a database rejects are deleted from the other one and released from
+#                     the dedup index, so that they are written again to both when next seen
+WRITE_FAILURE_MODE = "retry"
+WRITE_RETRY_ATTEMPTS = 5
+
+# Check out the pipeline's connections from process-wide pools (see infra/pooled_*_connector.py),
+# so that the crawlers of a process share a bounded set of connections. A connector waits up to
+# POOL_CHECKOUT_TIMEOUT seconds for a free connection when a pool is exhausted.
+# Off by default: with a single crawler per process (as started by scrapy crawl or crawl_sharded.py)
+# the pipeline holds one connection per database either way, pooling pays off when several crawlers
+# or threads share a process
+CONNECTION_POOLING = False
+POSTGRES_POOL_SIZE = 10
+REDIS_POOL_SIZE = 10
+MONGO_POOL_SIZE = 10
+POOL_CHECKOUT_TIMEOUT = 30.0
+
+# Serve the pipeline latency histograms and the numeric crawl stats in the Prometheus text
+# format on METRICS_PORT (mapped by docker-compose.yaml) while the spider runs
+METRICS_ENABLED = False
+METRICS_PORT = 6080
+METRICS_INTERFACE = "0.0.0.0"
+
+# Maximum number of items in flight at once in AsyncJobsProjectPipeline (the asyncio variant
+# of the pipeline); CONCURRENT_ITEMS (default: 100) also bounds the items processed per response
+ASYNC_PIPELINE_CONCURRENCY = 64
+
 # Set settings whose default value is deprecated to a future-proof value
 TWISTED_REACTOR = "twisted.internet.asyncioreactor.AsyncioSelectorReactor"
 FEED_EXPORT_ENCODING = "utf-8"
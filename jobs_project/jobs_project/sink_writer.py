@@ -0,0 +1,393 @@
+import asyncio
+import glob
+import os
+import pickle
+import struct
+import time
+from collections import deque
+from twisted.internet import defer, threads
+
+class SpillSegments:
+    """
+    Append-only segment files holding the batches a sink could not take in time.
+
+    Each batch is appended as a length-prefixed pickle frame to the active segment, which is
+    sealed and replaced by a new one once it exceeds segment_bytes. Segments are replayed oldest
+    first; the replay position of the oldest segment is kept in a side file, so that a crash
+    during the replay does not replay the same batches twice. Segments left over by a previous
+    run are picked up again when the same prefix is reopened.
+    """
+    FRAME = struct.Struct('>I')
+
+    def __init__(self, directory, prefix, segment_bytes=16 * 1024 * 1024):
+        """
+        Args:
+            directory (str): The directory of the segment files.
+            prefix (str): The prefix of the segment file names, unique per sink and process.
+            segment_bytes (int): The size above which the active segment is sealed.
+        """
+        self.directory = directory
+        self.prefix = prefix
+        self.segment_bytes = segment_bytes
+        os.makedirs(directory, exist_ok=True)
+        self.sealed = deque(sorted(glob.glob(os.path.join(directory, f'{prefix}-*.seg'))))
+        self.next_number = self.segment_number(self.sealed[-1]) + 1 if self.sealed else 0
+        self.active = None
+        self.active_path = None
+
+    def segment_number(self, path):
+        return int(os.path.basename(path)[len(self.prefix) + 1:-len('.seg')])
+
+    def __bool__(self):
+        return bool(self.sealed) or self.active is not None
+
+    def append(self, batch):
+        """
+        Appends a batch to the active segment, opening a new segment if needed.
+        """
+        if self.active is None:
+            self.active_path = os.path.join(self.directory, f'{self.prefix}-{self.next_number:08d}.seg')
+            self.next_number += 1
+            self.active = open(self.active_path, 'ab')
+        data = pickle.dumps(batch, protocol=pickle.HIGHEST_PROTOCOL)
+        self.active.write(self.FRAME.pack(len(data)) + data)
+        self.active.flush()
+        if self.active.tell() >= self.segment_bytes:
+            self.seal()
+
+    def seal(self):
+        """
+        Closes the active segment, making it available for replay.
+        """
+        if self.active is not None:
+            os.fsync(self.active.fileno())
+            self.active.close()
+            self.sealed.append(self.active_path)
+            self.active = None
+            self.active_path = None
+
+    def read(self, max_records):
+        """
+        Reads the next spilled records of the oldest segment, whole batches at a time,
+        until at least max_records are read or the segment ends.
+
+        Returns:
+            tuple: The records, the segment path and the offset to commit once they are written,
+                or None if nothing is spilled.
+        """
+        if not self.sealed:
+            self.seal()
+        if not self.sealed:
+            return None
+        path = self.sealed[0]
+        records = []
+        with open(path, 'rb') as f:
+            f.seek(self.read_offset(path))
+            while len(records) < max_records:
+                header = f.read(self.FRAME.size)
+                if len(header) < self.FRAME.size:
+                    break
+                data = f.read(self.FRAME.unpack(header)[0])
+                if len(data) < self.FRAME.unpack(header)[0]:
+                    # A frame cut short by a crash while spilling, the batch was never acknowledged
+                    f.seek(0, os.SEEK_END)
+                    break
+                records.extend(pickle.loads(data))
+            return records, path, f.tell()
+
+    def commit(self, path, offset):
+        """
+        Records that the segment was replayed up to the given offset, deleting it once fully replayed.
+        """
+        if offset >= os.path.getsize(path):
+            os.remove(path)
+            if os.path.exists(path + '.offset'):
+                os.remove(path + '.offset')
+            self.sealed.remove(path)
+        else:
+            with open(path + '.offset', 'w') as f:
+                f.write(str(offset))
+
+    def read_offset(self, path):
+        try:
+            with open(path + '.offset') as f:
+                return int(f.read())
+        except (OSError, ValueError):
+            return 0
+
+    def close(self):
+        self.seal()
+
+class SinkWriter:
+    """
+    Bounded write queue between the pipeline and a slow sink (PostgreSQL, MongoDB).
+
+    Batches are written by a worker thread, one at a time, so the reactor keeps parsing while
+    the sink works. Up to max_pending batches wait in memory; beyond that saturated() is true
+    and the pipeline applies backpressure to the engine by returning wait_for_space() from
+    process_item. If a write stalls for longer than spill_after seconds, or fails with a sink
+    error, the queued and new batches are spilled to local segment files instead, so parsing
+    continues without holding them in memory. Once a write succeeds again (failed sinks are
+    retried every retry_interval seconds) the spilled batches are replayed in bulk.
+    With retry_failures=False (best effort) the batches failing with a sink error are dropped instead.
+    """
+    def __init__(self, name, write_callback, spill, sink_errors, stats, max_pending=4, spill_after=10.0,
+                 retry_interval=5.0, replay_records=5000, retry_failures=True, written_callback=None,
+                 failed_callback=None):
+        """
+        Args:
+            name (str): The name of the sink, used in the stats and messages.
+            write_callback (callable): Writes a batch of records, called in a worker thread.
+            spill (SpillSegments): The segment files of the spilled batches.
+            sink_errors (tuple): The exception types meaning the sink is unavailable, the batch is
+                spilled and retried. Other exceptions are reported and the batch is dropped.
+            stats (scrapy.statscollectors.StatsCollector): The crawler stats.
+            max_pending (int): The number of batches queued in memory before backpressure is applied.
+            spill_after (float): The number of seconds a write may take before new batches are spilled.
+            retry_interval (float): The number of seconds between the write attempts of a failed sink.
+            replay_records (int): The maximum number of spilled records written at once when replaying.
+            retry_failures (bool): Whether the batches failing with a sink error are spilled and retried,
+                or reported and dropped.
+            written_callback (callable): Called in the reactor thread with the result of each write
+                (e.g. the records the sink rejected), if it is not empty.
+            failed_callback (callable): Called in the reactor thread with each batch that is dropped
+                (failing with another error, or with a sink error without retry_failures).
+        """
+        self.name = name
+        self.write_callback = write_callback
+        self.spill = spill
+        self.sink_errors = sink_errors
+        self.stats = stats
+        self.max_pending = max(1, max_pending)
+        self.spill_after = spill_after
+        self.retry_interval = retry_interval
+        self.replay_records = replay_records
+        self.retry_failures = retry_failures
+        self.written_callback = written_callback
+        self.failed_callback = failed_callback
+        self.pending = deque()
+        self.in_flight = False
+        self.write_started = 0.0
+        self.healthy = True
+        self.last_failure = 0.0
+        self.space_waiters = []
+        self.drain_waiters = []
+        self.drain_timeout = None
+        self.closed = False
+
+    def __len__(self):
+        return len(self.pending)
+
+    def submit(self, batch):
+        """
+        Queues a batch for writing, or spills it if the sink is failing or stalled.
+        """
+        if not self.healthy or self.stalled():
+            self.spill_batch(batch)
+        else:
+            self.pending.append(batch)
+        self.start_next()
+
+    def saturated(self):
+        """
+        Checks if the in-memory queue is full, in which case the pipeline should wait for space.
+        """
+        return len(self.pending) >= self.max_pending
+
+    def wait_for_space(self):
+        """
+        Returns a Deferred fired once the queue is below max_pending again, or once the sink
+        stalls or fails and new batches are spilled instead.
+        """
+        if not self.saturated():
+            return defer.succeed(None)
+        d = defer.Deferred()
+        self.space_waiters.append(d)
+        return d
+
+    def stalled(self):
+        return self.in_flight and time.monotonic() - self.write_started >= self.spill_after
+
+    def check(self):
+        """
+        Called periodically: spills the queue of a stalled sink and retries a failed one.
+        """
+        if self.stalled() and self.pending:
+            print(f"{self.name} write stalled for {self.spill_after}s, spilling {len(self.pending)} batches to disk")
+            self.spill_pending()
+        self.start_next()
+
+    def spill_batch(self, batch):
+        self.spill.append(batch)
+        self.stats.inc_value(f'sink/{self.name}/spilled_batches')
+        self.stats.inc_value(f'sink/{self.name}/spilled_records', len(batch))
+
+    def spill_pending(self):
+        while self.pending:
+            self.spill_batch(self.pending.popleft())
+        self.release_space_waiters()
+
+    def release_space_waiters(self):
+        waiters, self.space_waiters = self.space_waiters, []
+        for d in waiters:
+            d.callback(None)
+
+    def start_next(self):
+        """
+        Starts writing the next batch if no write is in flight: the spilled batches first once the
+        sink is healthy (or due for a retry), then the queued ones.
+        """
+        if self.in_flight or self.closed:
+            return
+        if not self.healthy and time.monotonic() - self.last_failure < self.retry_interval:
+            return self.check_drained()
+
+        if self.spill:
+            spilled = self.spill.read(self.replay_records)
+            if spilled is not None:
+                records, path, offset = spilled
+                return self.write(records, replay=(path, offset))
+        if self.pending:
+            return self.write(self.pending.popleft())
+        self.check_drained()
+
+    def write(self, batch, replay=None):
+        self.in_flight = True
+        self.write_started = time.monotonic()
+        d = threads.deferToThread(self.write_callback, batch) if batch else defer.succeed(None)
+        d.addCallbacks(self.write_succeeded, self.write_failed, callbackArgs=(replay,), errbackArgs=(batch, replay))
+        if not self.saturated():
+            self.release_space_waiters()
+
+    def write_succeeded(self, result, replay):
+        self.in_flight = False
+        if result and self.written_callback is not None:
+            self.written_callback(result)
+        if not self.healthy:
+            print(f"{self.name} recovered, replaying the spilled batches")
+            self.healthy = True
+        if replay is not None:
+            self.spill.commit(*replay)
+            self.stats.inc_value(f'sink/{self.name}/replayed_chunks')
+        if not self.saturated():
+            self.release_space_waiters()
+        self.start_next()
+
+    def write_failed(self, failure, batch, replay):
+        self.in_flight = False
+        if failure.check(*self.sink_errors) and self.retry_failures:
+            print(f"{self.name} unavailable, spilling to disk and retrying every {self.retry_interval}s: "
+                  f"{failure.getErrorMessage()}")
+            self.healthy = False
+            self.last_failure = time.monotonic()
+            # A replayed chunk stays in its segment, a queued batch is spilled with the rest of the queue
+            if replay is None:
+                self.spill_batch(batch)
+            self.spill_pending()
+        else:
+            print(f"Error writing batch of {len(batch)} records to {self.name}: {failure.getErrorMessage()}")
+            self.stats.inc_value(f'sink/{self.name}/failed_records', len(batch))
+            if replay is not None:
+                self.spill.commit(*replay)
+            if self.failed_callback is not None:
+                self.failed_callback(batch)
+        self.start_next()
+
+    def drain(self, timeout):
+        """
+        Writes the queued and spilled batches, retrying a failed sink until the timeout.
+        Whatever the sink did not take by then stays spilled and is replayed on the next run.
+        check() must keep being called periodically until the writer is drained.
+
+        Returns:
+            Deferred: Fired once the writer is drained.
+        """
+        # Imported here so that importing the pipeline does not install the default reactor
+        from twisted.internet import reactor
+        # A drained writer can be drained again, e.g. once more batches are submitted to it
+        self.closed = False
+        d = defer.Deferred()
+        self.drain_waiters.append(d)
+        self.drain_timeout = reactor.callLater(timeout, self.abort_drain)
+        self.start_next()
+        return d
+
+    def abort_drain(self):
+        print(f"{self.name} did not drain in time, the remaining batches stay spilled for the next run")
+        self.spill_pending()
+        self.healthy = False
+        self.last_failure = time.monotonic()
+        self.fire_drain_waiters()
+
+    def check_drained(self):
+        if self.drain_waiters and not self.in_flight and not self.pending and not self.spill:
+            self.fire_drain_waiters()
+
+    def fire_drain_waiters(self):
+        if self.drain_timeout.active():
+            self.drain_timeout.cancel()
+        self.closed = True
+        self.spill.close()
+        waiters, self.drain_waiters = self.drain_waiters, []
+        for d in waiters:
+            d.callback(None)
+
+class AsyncRetryQueue:
+    """
+    Per-sink retry queue of the asyncio pipeline: the writes that failed are retried in the background
+    every retry_interval seconds, up to max_attempts times, without holding back their item.
+    At most max_pending writes wait for a retry at once, beyond that submit waits for one of them to end.
+    """
+    def __init__(self, name, stats, retry_interval=5.0, max_attempts=5, max_pending=64):
+        """
+        Args:
+            name (str): The name of the sink, used in the stats and messages.
+            stats (scrapy.statscollectors.StatsCollector): The crawler stats.
+            retry_interval (float): The number of seconds between the attempts of a write.
+            max_attempts (int): The number of retries of a write before it is dropped.
+            max_pending (int): The number of writes waiting for a retry before submit waits.
+        """
+        self.name = name
+        self.stats = stats
+        self.retry_interval = retry_interval
+        self.max_attempts = max_attempts
+        self.max_pending = max(1, max_pending)
+        self.tasks = set()
+
+    async def submit(self, write):
+        """
+        Retries a failed write in the background.
+
+        Args:
+            write (callable): Returns the coroutine of the write, called once per attempt.
+        """
+        while len(self.tasks) >= self.max_pending:
+            await asyncio.wait(self.tasks, return_when=asyncio.FIRST_COMPLETED)
+        task = asyncio.ensure_future(self.retry(write))
+        self.tasks.add(task)
+        task.add_done_callback(self.tasks.discard)
+        self.stats.inc_value(f'sink/{self.name}/retried_writes')
+
+    async def retry(self, write):
+        for attempt in range(self.max_attempts):
+            await asyncio.sleep(self.retry_interval)
+            try:
+                await write()
+                return
+            except Exception as e:
+                error = e
+        print(f"Giving up on a write to {self.name} after {self.max_attempts} retries: {error}")
+        self.stats.inc_value(f'sink/{self.name}/failed_records')
+
+    async def drain(self, timeout):
+        """
+        Waits up to timeout seconds for the pending retries, the ones left are cancelled and counted as failed.
+        """
+        if not self.tasks:
+            return
+        _, pending = await asyncio.wait(set(self.tasks), timeout=timeout)
+        if pending:
+            print(f"{self.name} retries did not finish in time, dropping {len(pending)} writes")
+            self.stats.inc_value(f'sink/{self.name}/failed_records', len(pending))
+            for task in pending:
+                task.cancel()
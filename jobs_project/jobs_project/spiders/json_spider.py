@@ -1,8 +1,9 @@
+import glob
 import json
+import ijson
 import scrapy
 import os
-from jobs_project.items import JobsProjectItem
-from dateutil import parser
+from jobs_project.items import build_job_item
 
 class JobSpider(scrapy.Spider):
     name = 'job_spider'
@@ -12,21 +13,68 @@ class JobSpider(scrapy.Spider):
         },
     }
 
-    def __init__(self):
-        super(JobSpider, self).__init__()
+    def __init__(self, streaming=None, input=None, shard_index=0, shard_count=1, *args, **kwargs):
+        """
+        Args:
+            streaming (str): Overrides the JSON_STREAMING setting (-a streaming=0/1).
+            input (str): Comma-separated glob patterns or directories of the JSON files to crawl
+                (defaults to s01.json and s02.json under /usr/src/app).
+            shard_index (int): The index of the file shard crawled by this process.
+            shard_count (int): The total number of file shards.
+        """
+        super(JobSpider, self).__init__(*args, **kwargs)
+        self.streaming = streaming
+        self.input = input
+        self.shard_index = int(shard_index)
+        self.shard_count = int(shard_count)
+        if self.shard_count < 1 or not 0 <= self.shard_index < self.shard_count:
+            raise ValueError(f"Invalid shard {self.shard_index} of {self.shard_count}")
+
+    def get_input_files(self):
+        """
+        Resolves the input files and returns the ones belonging to this spider's shard.
+
+        Files are sorted before sharding so that every process computes the same assignment
+        and each file is crawled by exactly one shard.
+
+        Returns:
+            list: The paths of the JSON files to crawl.
+        """
+        files = set()
+        if not self.input:
+            root_dir = os.path.abspath(os.path.join('/', 'usr', 'src', 'app'))
+            files.update(os.path.join(root_dir, file_path) for file_path in ['s01.json', 's02.json'])
+        else:
+            for pattern in self.input.split(','):
+                pattern = pattern.strip()
+                if os.path.isdir(pattern):
+                    pattern = os.path.join(pattern, '*.json')
+                files.update(os.path.abspath(path) for path in glob.glob(pattern) if os.path.isfile(path))
+
+        return sorted(files)[self.shard_index::self.shard_count]
 
     def start_requests(self):
         """
         Reads the JSON files and yields a request object for each file.
         """
-        root_dir = os.path.abspath(os.path.join('/', 'usr', 'src', 'app'))
+        if self.streaming is None:
+            self.streaming = self.settings.getbool('JSON_STREAMING', True)
+        else:
+            self.streaming = str(self.streaming).lower() in ('1', 'true', 'yes')
 
-        # Add your local JSON file paths here
-        files = ['s01.json', 's02.json']
-        for file_path in files:
-            yield scrapy.Request(
-                url='file://' + os.path.join(root_dir, file_path),
-                callback=self.parse_page)
+        for file_path in self.get_input_files():
+            if self.streaming:
+                # The file download handler reads the whole body into memory, so in streaming
+                # mode a no-op data: request only schedules the callback, which reads the file itself
+                yield scrapy.Request(
+                    url='data:,',
+                    callback=self.parse_stream,
+                    cb_kwargs={'file_path': file_path},
+                    dont_filter=True)
+            else:
+                yield scrapy.Request(
+                    url='file://' + file_path,
+                    callback=self.parse_page)
 
 
     def parse_page(self, response):
@@ -37,54 +85,43 @@ class JobSpider(scrapy.Spider):
             response (scrapy.http.Response): The response object containing the JSON data.
         
         Yields:
-            item: A JobsProjectItem object containing the extracted job data.
+            item: A JobItem object containing the extracted job data.
         """
         # Load the JSON data
         data = json.loads(response.text)
         jobs = data.get('jobs')
 
-        # Extract the job data into JobsProjectItem objects
+        # Extract the job data into JobItem objects
         for job in jobs:
-            job_data = job.get('data', {})
-            item = JobsProjectItem()
-            item['slug'] = job_data.get('slug', '')
-            item['language'] = job_data.get('language', '')
-            item['languages'] = job_data.get('languages', [])
-            item['req_id'] = job_data.get('req_id', '')
-            item['title'] = job_data.get('title', '')
-            item['description'] = job_data.get('description', '')
-            item['street_address'] = job_data.get('street_address', '')
-            item['city'] = job_data.get('city', '')
-            item['state'] = job_data.get('state', '')
-            item['country_code'] = job_data.get('country_code', '')
-            item['postal_code'] = job_data.get('postal_code', '')
-            item['location_type'] = job_data.get('location_type', '')
-            item['latitude'] = job_data.get('latitude', 0)
-            item['longitude'] = job_data.get('longitude', 0)
-            item['categories'] = job_data.get('categories', [])
-            item['tags'] = job_data.get('tags', [])
-            item['tags5'] = job_data.get('tags5', [])
-            item['tags6'] = job_data.get('tags6', [])
-            item['brand'] = job_data.get('brand', '')
-            item['promotion_value'] = job_data.get('promotion_value', 0)
-            item['salary_currency'] = job_data.get('salary_currency', '')
-            item['salary_value'] = job_data.get('salary_value', 0)
-            item['salary_min_value'] = job_data.get('salary_min_value', 0)
-            item['salary_max_value'] = job_data.get('salary_max_value', 0)
-            item['benefits'] = job_data.get('benefits', [])
-            item['employment_type'] = job_data.get('employment_type', '')
-            item['hiring_organization'] = job_data.get('hiring_organization', '')
-            item['source'] = job_data.get('source', '')
-            item['apply_url'] = job_data.get('apply_url', '')
-            item['internal'] = job_data.get('internal', False)
-            item['searchable'] = job_data.get('searchable', False)
-            item['applyable'] = job_data.get('applyable', False)
-            item['li_easy_applyable'] = job_data.get('li_easy_applyable', False)
-            item['ats_code'] = job_data.get('ats_code', '')
-            item['meta_data'] = job_data.get('meta_data', {})
-            item['update_date'] = parser.parse(job_data.get('update_date', '')) if job_data.get('update_date') else None
-            item['create_date'] = parser.parse(job_data.get('create_date', '')) if job_data.get('create_date') else None
-            item['category'] = job_data.get('category', [])
-            item['full_location'] = job_data.get('full_location', '')
-            item['short_location'] = job_data.get('short_location', '')
-            yield item
\ No newline at end of file
+            yield self.build_item(job)
+
+    def parse_stream(self, response, file_path):
+        """
+        Incrementally parses the JSON file and extracts the job data one element of the 'jobs' array at a time.
+
+        Memory usage is bounded by the size of a single job rather than the size of the file,
+        and items are yielded to the pipeline as soon as each job is decoded.
+
+        Args:
+            response (scrapy.http.Response): The placeholder response scheduling this callback.
+            file_path (str): The path of the local JSON file to parse.
+
+        Yields:
+            item: A JobItem object containing the extracted job data.
+        """
+        with open(file_path, 'rb') as f:
+            for job in ijson.items(f, 'jobs.item', use_float=True):
+                yield self.build_item(job)
+
+    def build_item(self, job):
+        """
+        Builds a JobItem from a single element of the 'jobs' array, extracting and coercing
+        all the fields in one pass driven by the JOB_FIELDS spec.
+
+        Args:
+            job (dict): The decoded job object.
+
+        Returns:
+            JobItem: The item containing the extracted job data.
+        """
+        return build_job_item(job.get('data', {}))
@@ -0,0 +1,27 @@
+from datetime import datetime
+from functools import lru_cache
+from dateutil import parser
+
+@lru_cache(maxsize=4096)
+def parse_timestamp(value):
+    """
+    Parses a timestamp string of the job feeds.
+
+    The feeds use ISO-8601 timestamps (e.g. 2024-01-02T03:04:05+0000 or 2024-01-02T03:04:05.000Z),
+    which datetime.fromisoformat parses natively, many times faster than dateutil's generic parser.
+    Other formats fall back to dateutil. Results are memoized, as the same timestamps repeat
+    across the jobs of a feed.
+
+    Args:
+        value (str): The timestamp string.
+
+    Returns:
+        datetime: The parsed timestamp.
+
+    Raises:
+        ValueError: The timestamp could not be parsed.
+    """
+    try:
+        return datetime.fromisoformat(value)
+    except ValueError:
+        return parser.parse(value)
@@ -0,0 +1,33 @@
+import sys
+import os
+import argparse
+
+# Add the project root directory to the Python path (since I can not use __init__.py in the infra directory)
+project_root = os.path.abspath(os.path.dirname(__file__))
+sys.path.insert(0, project_root)
+
+from infra.redis_connector import RedisConnector
+from infra.redis_dedup_index import BucketedHashIndex
+
+def main():
+    arg_parser = argparse.ArgumentParser(
+        description='Moves the job:* dedup keys of Redis into the compact bucketed hashes (DEDUP_STORE = "hash").'
+    )
+    arg_parser.add_argument('--buckets', type=int, default=65536,
+                            help='Number of bucket hashes, must match DEDUP_BUCKETS')
+    arg_parser.add_argument('--retention', type=int, default=0,
+                            help='Retention of the jobs in seconds, must match DEDUP_RETENTION')
+    arg_parser.add_argument('--pattern', default='job:*', help='Pattern of the keys to migrate')
+    arg_parser.add_argument('--batch-size', type=int, default=1000, help='Number of keys moved per round trip')
+    args = arg_parser.parse_args()
+
+    rd_conn = RedisConnector()
+    try:
+        dedup_index = BucketedHashIndex(rd_conn, num_buckets=args.buckets, retention=args.retention)
+        migrated = dedup_index.migrate_keys(args.pattern, args.batch_size)
+        print(f"Migrated {migrated} keys into the Redis dedup hashes")
+    finally:
+        rd_conn.close_connection()
+
+if __name__ == '__main__':
+    main()
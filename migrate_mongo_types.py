@@ -0,0 +1,28 @@
+import sys
+import os
+import argparse
+
+# Add the project root directory to the Python path (since I can not use __init__.py in the infra directory)
+project_root = os.path.abspath(os.path.dirname(__file__))
+sys.path.insert(0, project_root)
+
+from infra.mongodb_connector import MongoDBConnector
+
+def main():
+    arg_parser = argparse.ArgumentParser(
+        description='Converts the MongoDB jobs stored with JSON-encoded list and dictionary fields and string '
+                    'timestamps to native BSON arrays, embedded documents and dates, and creates the job indexes.'
+    )
+    arg_parser.add_argument('--batch-size', type=int, default=1000, help='Number of documents updated per round trip')
+    args = arg_parser.parse_args()
+
+    mongo_conn = MongoDBConnector()
+    try:
+        updated = mongo_conn.backfill_native_types(args.batch_size)
+        print(f"Converted {updated} MongoDB documents to native BSON types")
+        mongo_conn.create_job_indexes()
+    finally:
+        mongo_conn.close_connection()
+
+if __name__ == '__main__':
+    main()
@@ -1,54 +1,168 @@
 import sys
 import os
+import argparse
+import json
 import pandas as pd
+from concurrent.futures import ThreadPoolExecutor
 
 # Add the project root directory to the Python path (since I can not use __init__.py in the infra directory)
 project_root = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
 sys.path.insert(0, project_root)
+# The Scrapy project directory, whose settings.py decides whether connections are pooled
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), 'jobs_project'))
 
 from infra.postgresql_connector import PostgreSQLConnector
 from infra.mongodb_connector import MongoDBConnector
+from infra.pooled_postgresql_connector import PooledPostgreSQLConnector, close_shared_pool as close_postgres_pool
+from infra.pooled_mongodb_connector import PooledMongoDBConnector, close_shared_client as close_mongo_client
+from infra.postgresql_connector import export_jobs_query
+from jobs_project.settings import CONNECTION_POOLING
+from infra.description_store import load_codec, restore_descriptions, restore_document_descriptions
+from columnar_export import export_mongo_columnar, export_postgres_columnar, output_path
 
-def main():
-    # Initialize PostgreSQL database connection
-    pg_conn = PostgreSQLConnector()
+def export_postgres_csv(pg_conn, path, batch_size):
+    """
+    Streams 'raw_table' to a CSV file through a server-side cursor, one batch at a time.
+
+    Args:
+        pg_conn (PostgreSQLConnector): The PostgreSQL connector.
+        path (str): The path of the CSV file.
+        batch_size (int): The number of rows fetched and written per batch.
+
+    Returns:
+        int: The number of exported rows.
+    """
+    exported = 0
+    with open(path, 'w', newline='') as f:
+        # The generated columns (e.g. the search_vector of the full-text search) are not exported,
+        # the compressed descriptions are sent compressed and restored here
+        columns = pg_conn.stored_columns()
+        codec = load_codec(pg_conn.description_dictionaries())
+        description_index = columns.index('description')
+        for _, rows in pg_conn.stream_query(export_jobs_query(f'raw_table.{column}' for column in columns),
+                                            batch_size=batch_size):
+            rows = restore_descriptions(rows, description_index, codec)
+            # JSONB fields are returned as lists and dictionaries, write them back as JSON
+            rows = [
+                [json.dumps(value) if isinstance(value, (dict, list)) else value for value in row]
+                for row in rows
+            ]
+            pd.DataFrame(rows, columns=columns).to_csv(f, header=exported == 0, index=False)
+            exported += len(rows)
+    return exported
+
+def export_mongo_csv(mongo_conn, path, batch_size):
+    """
+    Streams 'raw_collection' to a CSV file through a batched cursor, one batch at a time.
+
+    The columns are taken from the first batch, so that every batch is written with the same header.
+    The GeoJSON location of the documents is left out, as it only repeats their latitude and longitude,
+    the compressed descriptions are restored, and arrays and embedded documents are written as JSON.
+
+    Args:
+        mongo_conn (MongoDBConnector): The MongoDB connector.
+        path (str): The path of the CSV file.
+        batch_size (int): The number of documents fetched and written per batch.
+
+    Returns:
+        int: The number of exported documents.
+    """
+    exported = 0
+    columns = None
+    codec = load_codec(mongo_conn.description_dictionaries())
+    with open(path, 'w', newline='') as f:
+        for documents in mongo_conn.iter_data(batch_size=batch_size, projection={'location': False}):
+            restore_document_descriptions(documents, mongo_conn.get_descriptions, codec)
+            # Arrays and embedded documents are written as JSON, like the JSONB fields of PostgreSQL
+            documents = [
+                {key: json.dumps(value, default=str) if isinstance(value, (dict, list)) else value
+                 for key, value in document.items()}
+                for document in documents
+            ]
+            data_df = pd.DataFrame(documents)
+            if columns is None:
+                columns = list(data_df.columns)
+            data_df.reindex(columns=columns).to_csv(f, header=exported == 0, index=False)
+            exported += len(documents)
+    return exported
+
+def export_postgres(args, partition_by):
+    """
+    Exports 'raw_table' in the requested format on a PostgreSQL connection of its own, or checked out
+    from the shared pool with --pooling.
+    """
+    pg_conn = PooledPostgreSQLConnector(max_size=args.pool_size) if args.pooling else PostgreSQLConnector()
 
     try:
-        # Retrieve all processed data from 'raw_table'
-        query = "SELECT * FROM raw_table;"
-        result = pg_conn.execute_query(query)
-        
-        # Get column names from cursor description
-        columns = [desc[0] for desc in pg_conn.cursor.description]
-        
-        # Create a DataFrame from the retrieved data
-        data_df = pd.DataFrame(result, columns=columns)
-        
-        # Save DataFrame to CSV
-        data_df.to_csv('postgres_data.csv', index=False)
-        print('Data successfully exported to processed_data.csv')
+        if args.format == 'csv':
+            # Stream all processed data from 'raw_table' to CSV
+            path = 'postgres_data.csv'
+            exported = export_postgres_csv(pg_conn, path, args.batch_size)
+        else:
+            # Stream all processed data from 'raw_table' to typed record batches
+            path = output_path('postgres_data', args.format, partition_by)
+            exported = export_postgres_columnar(
+                pg_conn, path, args.batch_size, args.format, args.compression, partition_by
+            )
+        print(f'{exported} rows successfully exported to {path}')
     except Exception as e:
         print(f'An error occurred: {e}')
     finally:
         pg_conn.close_connection()
 
-    # Initialize MongoDB database connection
-    mongo_conn = MongoDBConnector()
+def export_mongo(args, partition_by):
+    """
+    Exports 'raw_collection' in the requested format through a MongoDB client of its own, or the shared
+    client with --pooling.
+    """
+    mongo_conn = PooledMongoDBConnector(max_size=args.pool_size) if args.pooling else MongoDBConnector()
 
     try:
-        # Retrieve all data from 'raw_collection' collection
-        result = mongo_conn.get_all_data()
-
-        # Create a DataFrame from the retrieved data
-        data_df = pd.DataFrame(result)
-
-        # Save DataFrame to CSV
-        data_df.to_csv('mongodb_data.csv', index=False)
-        print('Data successfully exported to raw_data.csv')
+        if args.format == 'csv':
+            # Stream all data from 'raw_collection' collection to CSV
+            path = 'mongodb_data.csv'
+            exported = export_mongo_csv(mongo_conn, path, args.batch_size)
+        else:
+            # Stream all data from 'raw_collection' collection to typed record batches
+            path = output_path('mongodb_data', args.format, partition_by)
+            exported = export_mongo_columnar(
+                mongo_conn, path, args.batch_size, args.format, args.compression, partition_by
+            )
+        print(f'{exported} documents successfully exported to {path}')
     except Exception as e:
         print(f'An error occurred: {e}')
     finally:
         mongo_conn.close_connection()
 
+def main():
+    arg_parser = argparse.ArgumentParser(description='Exports the stored jobs from PostgreSQL and MongoDB.')
+    arg_parser.add_argument('--batch-size', type=int, default=10000,
+                            help='Number of rows fetched from the databases and written per batch')
+    arg_parser.add_argument('--format', choices=['csv', 'parquet', 'feather'], default='csv',
+                            help='Output format, parquet and feather (Arrow IPC) write typed, compressed columns')
+    arg_parser.add_argument('--compression', default='zstd',
+                            help='Compression codec of the columnar formats (e.g. zstd, snappy, lz4 or none)')
+    arg_parser.add_argument('--partition-by', default='',
+                            help='Comma-separated columns to partition the columnar output by (e.g. country_code,create_month)')
+    arg_parser.add_argument('--pooling', action=argparse.BooleanOptionalAction, default=CONNECTION_POOLING,
+                            help='Check out the connections from process-wide pools (CONNECTION_POOLING by default)')
+    arg_parser.add_argument('--pool-size', type=int, default=4,
+                            help='Maximum number of pooled connections per database, with --pooling')
+    args = arg_parser.parse_args()
+    partition_by = [name.strip() for name in args.partition_by.split(',') if name.strip()]
+
+    # Export PostgreSQL and MongoDB concurrently, each on its own connection (or one checked out from the shared pools)
+    try:
+        with ThreadPoolExecutor(max_workers=2) as executor:
+            exports = [
+                executor.submit(export_postgres, args, partition_by),
+                executor.submit(export_mongo, args, partition_by),
+            ]
+            for export in exports:
+                export.result()
+    finally:
+        close_postgres_pool()
+        close_mongo_client()
+
 if __name__ == '__main__':
-    main()
\ No newline at end of file
+    main()
@@ -0,0 +1,84 @@
+import sys
+import os
+import argparse
+import json
+from datetime import datetime
+
+# Add the project root directory to the Python path (since I can not use __init__.py in the infra directory)
+project_root = os.path.abspath(os.path.dirname(__file__))
+sys.path.insert(0, project_root)
+
+from infra.postgresql_connector import PostgreSQLConnector, SEARCH_DATE_COLUMNS, SEARCH_RESULT_COLUMNS
+
+def parse_date(value):
+    """
+    Parses an ISO date (e.g. 2024-01-31) or date and time given on the command line.
+    """
+    try:
+        return datetime.fromisoformat(value)
+    except ValueError:
+        raise argparse.ArgumentTypeError(f"Invalid date: {value}")
+
+def print_results(rows):
+    """
+    Prints the matching jobs, one line each, best match first.
+    """
+    for row in rows:
+        job = dict(zip(SEARCH_RESULT_COLUMNS + ['rank'], row))
+        date = job['update_date'].date().isoformat() if job['update_date'] else ''
+        print(
+            f"{job['rank']:7.3f}  {date:10}  {job['req_id']:<14} {job['title']} - {job['hiring_organization'] or ''} "
+            f"({job['short_location'] or job['country_code'] or ''}, {job['employment_type'] or ''})"
+        )
+    print(f"{len(rows)} jobs")
+
+def main():
+    arg_parser = argparse.ArgumentParser(description='Searches the stored jobs by keywords in PostgreSQL.')
+    arg_parser.add_argument('text',
+                            help='Keywords, e.g. \'python "data engineer" -senior\' (web search syntax)')
+    arg_parser.add_argument('--country-code', help='Only the jobs of this country code (e.g. US)')
+    arg_parser.add_argument('--employment-type', help='Only the jobs of this employment type (e.g. FULL_TIME)')
+    arg_parser.add_argument('--since', type=parse_date, help='Only the jobs dated on or after this date')
+    arg_parser.add_argument('--until', type=parse_date, help='Only the jobs dated before this date')
+    arg_parser.add_argument('--date-column', choices=SEARCH_DATE_COLUMNS, default='update_date',
+                            help='The date of the --since/--until filters and of --order-by date')
+    arg_parser.add_argument('--order-by', choices=['rank', 'date'], default='rank',
+                            help='Order by relevance or most recent first')
+    arg_parser.add_argument('--limit', type=int, default=20, help='Maximum number of jobs returned')
+    arg_parser.add_argument('--offset', type=int, default=0, help='Number of jobs skipped, for paging')
+    arg_parser.add_argument('--rank-window', type=int, default=10000,
+                            help='Number of most recent matches ranked, 0 to rank all of them')
+    arg_parser.add_argument('--json', action='store_true', help='Print the jobs as JSON lines')
+    args = arg_parser.parse_args()
+
+    pg_conn = PostgreSQLConnector()
+    try:
+        if pg_conn.has_compressed_descriptions():
+            # On stderr, so that the --json output stays valid
+            print(
+                'Warning: some descriptions are stored compressed (DESCRIPTION_STORAGE = "compressed"), '
+                'their jobs are only matched on the title and hiring organization',
+                file=sys.stderr
+            )
+        rows = pg_conn.search_jobs(
+            args.text,
+            country_code=args.country_code,
+            employment_type=args.employment_type,
+            since=args.since,
+            until=args.until,
+            date_column=args.date_column,
+            order_by=args.order_by,
+            limit=args.limit,
+            offset=args.offset,
+            rank_window=args.rank_window
+        )
+        if args.json:
+            for row in rows:
+                print(json.dumps(dict(zip(SEARCH_RESULT_COLUMNS + ['rank'], row)), default=str))
+        else:
+            print_results(rows)
+    finally:
+        pg_conn.close_connection()
+
+if __name__ == '__main__':
+    main()
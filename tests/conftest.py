@@ -0,0 +1,40 @@
+import os
+import sys
+from collections import Counter
+import fakeredis
+import pytest
+
+# The tests import infra from the repository root and jobs_project from the Scrapy project directory
+root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path[:0] = [root, os.path.join(root, 'jobs_project')]
+
+class FakeRedisConnector:
+    """
+    RedisConnector over an in-process fakeredis server.
+    """
+    def __init__(self):
+        self.conn = fakeredis.FakeStrictRedis()
+
+    def get_connection(self):
+        return self.conn
+
+    def close_connection(self):
+        pass
+
+class Stats(Counter):
+    """
+    The inc_value and get_value methods of the Scrapy stats collector.
+    """
+    def inc_value(self, key, count=1):
+        self[key] += count
+
+    def get_value(self, key, default=None):
+        return self[key] if key in self else default
+
+@pytest.fixture
+def rd_conn():
+    return FakeRedisConnector()
+
+@pytest.fixture
+def stats():
+    return Stats()
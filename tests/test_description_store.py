@@ -0,0 +1,54 @@
+import pytest
+from infra.description_store import (
+    MAX_DICTIONARY_SIZE, DescriptionCodec, description_hash, dictionary_id, load_codec, restore_descriptions,
+    restore_document_descriptions, train_dictionary
+)
+
+BOILERPLATE = '<p>We are an equal opportunity employer and value diversity at our company.</p>'
+
+def descriptions(count):
+    return [f'<h2>Engineer {number}</h2><p>Build data pipelines for team {number}.</p>{BOILERPLATE}' for number in range(count)]
+
+def test_round_trip_without_dictionary():
+    codec = DescriptionCodec()
+    description = 'Développeur <b>Python</b> ' * 20
+    blob = codec.compress(description)
+    assert blob.hash == description_hash(description)
+    assert blob.dictionary_id is None
+    assert len(blob.body) < len(description.encode('utf-8'))
+    assert codec.decompress(blob.dictionary_id, blob.body) == description
+
+def test_dictionary_shrinks_shared_boilerplate():
+    samples = descriptions(50)
+    dictionary = train_dictionary(samples)
+    assert 0 < len(dictionary) <= MAX_DICTIONARY_SIZE
+    assert b'equal opportunity employer' in dictionary
+
+    codec = DescriptionCodec(dictionary)
+    description = descriptions(51)[-1]
+    blob = codec.compress(description)
+    assert blob.dictionary_id == dictionary_id(dictionary)
+    assert len(blob.body) < len(DescriptionCodec().compress(description).body)
+
+    # Decompressed by a codec loaded with the stored dictionaries
+    assert load_codec([dictionary]).decompress(blob.dictionary_id, blob.body) == description
+    with pytest.raises(KeyError):
+        DescriptionCodec().decompress(blob.dictionary_id, blob.body)
+
+def test_no_dictionary_without_shared_segments():
+    assert train_dictionary(['<p>alpha</p>', '<p>omega</p>']) == b''
+
+def test_restore_rows_and_documents():
+    codec = DescriptionCodec()
+    blob = codec.compress('Build pipelines')
+    rows = restore_descriptions([('R1', None, blob.dictionary_id, blob.body), ('R2', 'Inline', None, None)], 1, codec)
+    assert rows == [['R1', 'Build pipelines'], ['R2', 'Inline']]
+
+    fetched = []
+    def fetch_descriptions(hashes):
+        fetched.append(hashes)
+        return {blob.hash: (blob.dictionary_id, blob.body)}
+    documents = [{'description_hash': blob.hash, 'description': None} for _ in range(3)] + [{'description': 'Inline'}]
+    restore_document_descriptions(documents, fetch_descriptions, codec)
+    assert [document['description'] for document in documents] == ['Build pipelines'] * 3 + ['Inline']
+    assert fetched == [{blob.hash}]
@@ -0,0 +1,103 @@
+import gzip
+import json
+import os
+import pytest
+from jobs_project.file_sink import JsonlFileSink
+
+def read_jobs(path):
+    opener = gzip.open if path.endswith('.gz') else open
+    with opener(path, 'rt', encoding='utf-8') as f:
+        return [json.loads(line)['req_id'] for line in f]
+
+@pytest.fixture(params=['jobs.jsonl.gz', 'jobs.jsonl'])
+def path(request, tmp_path):
+    return str(tmp_path / request.param)
+
+def test_batches_read_back_as_one_stream(path):
+    sink = JsonlFileSink(path)
+    sink.write([{'req_id': 1}, {'req_id': 2}])
+    sink.write([{'req_id': 3}])
+    sink.close()
+    assert read_jobs(path) == [1, 2, 3]
+    with open(path + '.size') as f:
+        assert int(f.read()) == os.path.getsize(path)
+
+def test_reopen_truncates_incomplete_batch(path):
+    sink = JsonlFileSink(path)
+    sink.write([{'req_id': 1}])
+    sink.close()
+    complete = os.path.getsize(path)
+    # A crash in the middle of the next batch
+    with open(path, 'ab') as f:
+        f.write(gzip.compress(b'{"req_id":2}\n{"req_id":3}\n')[:-5] if path.endswith('.gz') else b'{"req_id":2}\n{"req_')
+
+    sink = JsonlFileSink(path)
+    expected = complete if path.endswith('.gz') else complete + len(b'{"req_id":2}\n')
+    assert os.path.getsize(path) == sink.size == expected
+    sink.write([{'req_id': 4}])
+    sink.close()
+    assert read_jobs(path) == ([1, 4] if path.endswith('.gz') else [1, 2, 4])
+
+def test_reopen_keeps_complete_batches_after_stale_size(path):
+    sink = JsonlFileSink(path)
+    sink.write([{'req_id': 1}])
+    stale = sink.size
+    sink.write([{'req_id': 2}, {'req_id': 3}])
+    sink.close()
+    # A crash after syncing the batch but before updating the side file
+    with open(path + '.size', 'w') as f:
+        f.write(str(stale))
+
+    sink = JsonlFileSink(path)
+    assert sink.size == os.path.getsize(path)
+    with open(path + '.size') as f:
+        assert int(f.read()) == sink.size
+    sink.write([{'req_id': 4}])
+    sink.close()
+    assert read_jobs(path) == [1, 2, 3, 4]
+
+def test_reopen_without_size_file_checks_whole_file(path):
+    sink = JsonlFileSink(path)
+    for req_id in range(100):
+        sink.write([{'req_id': req_id}])
+    sink.close()
+    complete = os.path.getsize(path)
+    os.remove(path + '.size')
+    with open(path, 'ab') as f:
+        f.write(b'\x1f\x8b\x08' if path.endswith('.gz') else b'{"req')
+
+    sink = JsonlFileSink(path)
+    sink.close()
+    assert os.path.getsize(path) == complete
+    assert read_jobs(path) == list(range(100))
+
+def test_failed_write_leaves_file_as_it_was(path, monkeypatch):
+    sink = JsonlFileSink(path)
+    sink.write([{'req_id': 1}])
+    size = sink.size
+
+    class FullDisk:
+        def __init__(self, file):
+            self.file = file
+            self.writes = 0
+
+        def write(self, data):
+            # The first write goes through partially, the next one fails
+            self.writes += 1
+            if self.writes > 1:
+                raise OSError(28, 'No space left on device')
+            return self.file.write(data[:len(data) // 2])
+
+        def fileno(self):
+            return self.file.fileno()
+
+    file = sink.file
+    monkeypatch.setattr(sink, 'file', FullDisk(file))
+    with pytest.raises(OSError):
+        sink.write([{'req_id': req_id} for req_id in range(2, 50)])
+    assert os.path.getsize(path) == sink.size == size
+
+    sink.file = file
+    sink.write([{'req_id': 50}])
+    sink.close()
+    assert read_jobs(path) == [1, 50]
@@ -0,0 +1,83 @@
+import math
+import random
+import pytest
+from infra import geo
+
+def in_ranges(geohash, ranges):
+    return any(low <= geohash < high for low, high in ranges)
+
+def brute_force_cells(south, west, north, east, precision):
+    """
+    The cells of the given precision intersecting the box, testing every cell of the grid.
+    """
+    lat_bits, lon_bits = geo.cell_bits(precision)
+    height, width = 180.0 / (1 << lat_bits), 360.0 / (1 << lon_bits)
+    longitudes = [(west, east)] if west <= east else [(west, 180.0), (-180.0, east)]
+    rows = [row for row in range(1 << lat_bits) if -90.0 + row * height <= north and -90.0 + (row + 1) * height > south]
+    columns = [
+        column for column in range(1 << lon_bits)
+        if any(-180.0 + column * width <= high and -180.0 + (column + 1) * width > low for low, high in longitudes)
+    ]
+    return {geo.cell_hash(row, column, precision) for row in rows for column in columns}
+
+def all_cells(precision):
+    lat_bits, lon_bits = geo.cell_bits(precision)
+    return (geo.cell_hash(row, column, precision) for row in range(1 << lat_bits) for column in range(1 << lon_bits))
+
+def random_boxes(count, min_size, max_size, seed=1):
+    rng = random.Random(seed)
+    boxes = []
+    for _ in range(count):
+        height, width = rng.uniform(min_size, max_size), rng.uniform(min_size, max_size)
+        south = rng.uniform(-90.0, 90.0 - height)
+        west = rng.uniform(-180.0, 180.0)
+        east = (west + width + 180.0) % 360.0 - 180.0
+        boxes.append((south, west, south + height, east))
+    return boxes
+
+@pytest.mark.parametrize(
+    'box', random_boxes(12, 5.0, 60.0) + random_boxes(6, 1.0, 4.0, seed=4) + [(10.0, 170.0, 20.0, -170.0)]
+)
+def test_cover_matches_brute_force(box):
+    ranges = geo.cover(*box, max_cells=32)
+    precision = len(ranges[0][0])
+    expected = brute_force_cells(*box, precision)
+    assert len(expected) <= 32
+    assert {cell for cell in all_cells(precision) if in_ranges(cell, ranges)} == expected
+    if precision < 3:
+        assert len(brute_force_cells(*box, precision + 1)) > 32
+
+@pytest.mark.parametrize('box', random_boxes(20, 0.001, 2.0, seed=2))
+def test_cover_contains_the_points_of_the_box(box):
+    south, west, north, east = box
+    ranges = geo.cover(*box)
+    rng = random.Random(3)
+    width = (east - west) % 360.0
+    for _ in range(200):
+        latitude = rng.uniform(south, north)
+        longitude = (west + rng.uniform(0.0, width) + 180.0) % 360.0 - 180.0
+        for precision in range(len(ranges[0][0]), geo.MAX_PRECISION + 1):
+            assert in_ranges(geo.encode(latitude, longitude, precision), ranges)
+
+def test_cover_merges_consecutive_cells():
+    ranges = geo.cover(-90.0, -180.0, 90.0, 180.0, max_cells=32)
+    assert ranges == [('0', 'z~')]
+
+def test_bounding_box_contains_the_circle():
+    for latitude, longitude, radius in ((48.85, 2.35, 50.0), (-33.9, 151.2, 500.0), (0.0, 179.9, 100.0)):
+        south, west, north, east = geo.bounding_box(latitude, longitude, radius)
+        ranges = geo.cover(south, west, north, east)
+        for bearing in range(0, 360, 15):
+            # Points just inside the circle, on every bearing
+            point_latitude, point_longitude = destination(latitude, longitude, radius * 0.999, bearing)
+            assert geo.haversine_km(latitude, longitude, point_latitude, point_longitude) <= radius
+            assert in_ranges(geo.encode(point_latitude, point_longitude), ranges)
+
+def destination(latitude, longitude, distance_km, bearing):
+    angle = distance_km / geo.EARTH_RADIUS_KM
+    lat1, lon1, theta = math.radians(latitude), math.radians(longitude), math.radians(bearing)
+    lat2 = math.asin(math.sin(lat1) * math.cos(angle) + math.cos(lat1) * math.sin(angle) * math.cos(theta))
+    lon2 = lon1 + math.atan2(
+        math.sin(theta) * math.sin(angle) * math.cos(lat1), math.cos(angle) - math.sin(lat1) * math.sin(lat2)
+    )
+    return math.degrees(lat2), (math.degrees(lon2) + 540.0) % 360.0 - 180.0
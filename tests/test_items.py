@@ -0,0 +1,37 @@
+from datetime import datetime, timezone
+from jobs_project.items import JOB_FIELD_NAMES, JobItem, build_job_item, coerce_job_values, job_item_values
+
+def test_missing_fields_get_their_defaults():
+    values = dict(zip(JOB_FIELD_NAMES, coerce_job_values({'req_id': 'R1'}.get)))
+    assert values['req_id'] == 'R1'
+    assert values['title'] == ''
+    assert values['latitude'] == 0
+    assert values['internal'] is False
+    assert values['tags'] == [] and values['meta_data'] == {}
+    assert values['update_date'] is None
+
+def test_mutable_defaults_are_not_shared():
+    first = dict(zip(JOB_FIELD_NAMES, coerce_job_values({}.get)))
+    second = dict(zip(JOB_FIELD_NAMES, coerce_job_values({}.get)))
+    first['tags'].append('python')
+    assert second['tags'] == []
+
+def test_feed_values_are_coerced():
+    values = dict(zip(JOB_FIELD_NAMES, coerce_job_values({
+        'latitude': '52.5', 'salary_value': '', 'promotion_value': '3',
+        'update_date': '2024-01-02T03:04:05Z', 'create_date': '',
+    }.get)))
+    assert values['latitude'] == 52.5
+    # Empty strings are kept, and become no timestamp
+    assert values['salary_value'] == ''
+    assert values['promotion_value'] == '3'
+    assert values['update_date'] == datetime(2024, 1, 2, 3, 4, 5, tzinfo=timezone.utc)
+    assert values['create_date'] is None
+
+def test_job_items_hold_the_values_in_field_order():
+    item = build_job_item({'req_id': 'R1', 'title': 'Engineer', 'longitude': '13.4'})
+    assert isinstance(item, JobItem)
+    assert not hasattr(item, '__dict__')
+    values = job_item_values(item)
+    assert values == tuple(coerce_job_values({'req_id': 'R1', 'title': 'Engineer', 'longitude': '13.4'}.get))
+    assert item.longitude == 13.4 and item.content_hash is None
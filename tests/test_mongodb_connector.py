@@ -0,0 +1,40 @@
+import mongomock
+import pymongo
+import pytest
+from infra.mongodb_connector import DUPLICATE_KEY_ERROR, MongoDBConnector
+
+@pytest.fixture
+def mongo_conn(monkeypatch):
+    """
+    MongoDBConnector over an in-process mongomock client.
+    """
+    monkeypatch.setenv('MONGO_PORT', '27017')
+    monkeypatch.setattr(pymongo, 'MongoClient', lambda **kwargs: mongomock.MongoClient())
+    return MongoDBConnector()
+
+def test_insert_many_reports_failed_documents_only(mongo_conn):
+    mongo_conn.collection.create_index('req_id', unique=True)
+    errors = mongo_conn.insert_many_data([{'req_id': 'R1'}, {'req_id': 'R1'}, {'req_id': 'R2'}], ordered=False)
+    # The unordered bulk write goes on after the failing document
+    assert [(error['index'], error['code']) for error in errors] == [(1, DUPLICATE_KEY_ERROR)]
+    assert sorted(document['req_id'] for document in mongo_conn.collection.find()) == ['R1', 'R2']
+
+def test_insert_many_applies_write_concern(monkeypatch):
+    monkeypatch.setenv('MONGO_PORT', '27017')
+    monkeypatch.setattr(pymongo, 'MongoClient', lambda **kwargs: mongomock.MongoClient())
+    mongo_conn = MongoDBConnector(write_concern={'w': 1, 'j': False})
+    assert mongo_conn.collection.write_concern.document == {'w': 1, 'j': False}
+    assert mongo_conn.insert_many_data([{'req_id': 'R1'}]) == []
+
+def test_upsert_keeps_the_most_recent_job(mongo_conn):
+    mongo_conn.collection.create_index('req_id', unique=True)
+    stored = {'req_id': 'R1', 'title': 'Engineer', 'update_date': 2, 'content_hash': 'b'}
+    assert mongo_conn.upsert_many_data([stored]) == []
+
+    # An older version fails on the unique index and leaves the stored job as it is
+    errors = mongo_conn.upsert_many_data([{**stored, 'title': 'Old', 'update_date': 1, 'content_hash': 'a'}])
+    assert [error['code'] for error in errors] == [DUPLICATE_KEY_ERROR]
+    assert mongo_conn.collection.find_one({'req_id': 'R1'})['title'] == 'Engineer'
+
+    assert mongo_conn.upsert_many_data([{**stored, 'title': 'New', 'update_date': 3, 'content_hash': 'c'}]) == []
+    assert [document['title'] for document in mongo_conn.collection.find()] == ['New']
@@ -0,0 +1,140 @@
+import random
+import numpy as np
+import pytest
+from jobs_project.near_duplicates import (
+    LocalLSHIndex, MinHasher, NearDuplicateDetector, RedisLSHIndex, shingle_hashes, similarity
+)
+
+WORDS = [f'word{number}' for number in range(500)]
+
+def random_text(rng, length=200):
+    return ' '.join(rng.choice(WORDS) for _ in range(length))
+
+def edit(rng, text, fraction):
+    """
+    Replaces the given fraction of the words of a text.
+    """
+    words = text.split()
+    for position in rng.sample(range(len(words)), int(len(words) * fraction)):
+        words[position] = rng.choice(WORDS)
+    return ' '.join(words)
+
+def jaccard(text, other, size=3):
+    shingles, other_shingles = set(shingle_hashes(text, size)), set(shingle_hashes(other, size))
+    return len(shingles & other_shingles) / len(shingles | other_shingles)
+
+@pytest.fixture(params=['local', 'redis'])
+def make_index(request, rd_conn):
+    def make_index(bands, bucket_size=32, num_perm=64, shingle_size=3):
+        if request.param == 'local':
+            return LocalLSHIndex(bands, bucket_size, num_perm, shingle_size)
+        return RedisLSHIndex(rd_conn, bands, bucket_size, num_perm=num_perm, shingle_size=shingle_size)
+    return make_index
+
+def test_shingles_ignore_tags_case_and_punctuation():
+    assert np.array_equal(shingle_hashes('<p>Senior Python, Developer!</p>'), shingle_hashes('senior python developer'))
+    assert not np.array_equal(shingle_hashes('a b c d'), shingle_hashes('d c b a'))
+    assert len(shingle_hashes('<br/> ...')) == 0
+
+def test_signature_estimates_jaccard_similarity():
+    rng = random.Random(1)
+    hasher = MinHasher(num_perm=256)
+    for fraction in (0.02, 0.1, 0.3):
+        text = random_text(rng)
+        other = edit(rng, text, fraction)
+        estimate = similarity(hasher.signature(text), hasher.signature(other))
+        assert abs(estimate - jaccard(text, other)) < 0.1
+
+def test_signature_is_stable():
+    text = 'Senior Python developer in Berlin'
+    assert np.array_equal(MinHasher().signature(text), MinHasher().signature(text))
+    assert MinHasher().signature('<br/> ...') is None
+
+def test_detector_rejects_bands_not_dividing_the_signature():
+    with pytest.raises(ValueError):
+        NearDuplicateDetector(MinHasher(num_perm=64), LocalLSHIndex(10), 10)
+
+def test_detector_finds_near_duplicates(make_index):
+    rng = random.Random(2)
+    detector = NearDuplicateDetector(MinHasher(), make_index(16), 16, threshold=0.8)
+    originals = [random_text(rng) for _ in range(50)]
+    for number, text in enumerate(originals):
+        assert detector.find(f'job{number}', text) is None
+    for number, text in enumerate(originals):
+        match = detector.find(f'repost{number}', edit(rng, text, 0.01))
+        assert match is not None and match[0] == f'job{number}' and match[1] >= 0.8
+        # Unrelated texts and heavily edited ones are not near-duplicates
+        assert detector.find(f'other{number}', random_text(rng)) is None
+        assert detector.find(f'rewrite{number}', edit(rng, text, 0.5)) is None
+
+def test_detector_ignores_its_own_key(make_index):
+    detector = NearDuplicateDetector(MinHasher(), make_index(16), 16)
+    text = random_text(random.Random(3))
+    assert detector.find('job', text) is None
+    assert detector.find('job', text) is None
+
+def test_detector_indexes_near_duplicates_on_request(make_index):
+    rng = random.Random(4)
+    detector = NearDuplicateDetector(MinHasher(), make_index(16), 16)
+    text = random_text(rng)
+    detector.find('job', text)
+    repost = edit(rng, text, 0.01)
+    assert detector.find('repost', repost)[0] == 'job'
+    assert detector.find('repost', repost, index_duplicates=True)[0] == 'job'
+    assert detector.find('second', repost)[0] in ('job', 'repost')
+
+def test_detector_skips_texts_without_words(make_index):
+    detector = NearDuplicateDetector(MinHasher(), make_index(16), 16)
+    assert detector.find('job', '') is None
+    assert detector.find('other', '<p> - </p>') is None
+
+def test_index_drops_evicted_signatures(rd_conn):
+    rng = random.Random(5)
+    # Single-word shingles of a few words fill the buckets quickly
+    hasher = MinHasher(shingle_size=1)
+    local = LocalLSHIndex(16, bucket_size=4, shingle_size=1)
+    shared = RedisLSHIndex(rd_conn, 16, bucket_size=4, shingle_size=1)
+    for index in (local, shared):
+        detector = NearDuplicateDetector(hasher, index, 16, threshold=1.01)
+        for number in range(2000):
+            detector.find(str(number), ' '.join(rng.sample(WORDS[:8], 3)))
+
+    indexed = {member for band in local.buckets for members in band.values() for member in members}
+    assert set(local.signatures) == set(local.refs) == indexed
+    assert len(indexed) <= sum(map(len, local.buckets)) * local.bucket_size
+    assert len(local.signatures) < 2000
+
+    conn = rd_conn.get_connection()
+    indexed = set()
+    for band_key in shared.band_keys:
+        for members in conn.hvals(band_key):
+            indexed.update(members.split(b'\n'))
+    assert set(conn.hkeys(shared.signatures_key)) == set(conn.hkeys(shared.refs_key)) == indexed
+
+def test_local_index_round_trip(tmp_path):
+    rng = random.Random(6)
+    index = LocalLSHIndex(16)
+    detector = NearDuplicateDetector(MinHasher(), index, 16)
+    text = random_text(rng)
+    detector.find('job', text)
+    index.link('repost', 'job')
+    path = str(tmp_path / 'index.lsh')
+    index.save(path)
+
+    loaded = LocalLSHIndex.load(path)
+    assert loaded.params() == (16, 64, 3)
+    assert loaded.links == {'repost': 'job'}
+    assert NearDuplicateDetector(MinHasher(), loaded, 16).find('other', edit(rng, text, 0.01))[0] == 'job'
+
+def test_local_index_rejects_other_files(tmp_path):
+    path = tmp_path / 'index.lsh'
+    path.write_bytes(b'LSH1')
+    with pytest.raises(ValueError):
+        LocalLSHIndex.load(str(path))
+
+def test_redis_index_rejects_other_parameters(rd_conn):
+    RedisLSHIndex(rd_conn, 16)
+    RedisLSHIndex(rd_conn, 16)
+    with pytest.raises(ValueError):
+        RedisLSHIndex(rd_conn, 16, num_perm=128)
+    RedisLSHIndex(rd_conn, 16, num_perm=128, prefix='lsh128')
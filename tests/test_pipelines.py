@@ -0,0 +1,296 @@
+import itertools
+import psycopg2
+import pytest
+from scrapy.settings import Settings
+from infra.memory_dedup_index import MemoryDedupIndex
+from infra.mongodb_connector import DUPLICATE_KEY_ERROR
+from infra.postgresql_connector import build_upsert_query
+from jobs_project.metrics import PipelineMetrics
+from jobs_project.pipelines import REQ_ID_INDEX, JobRollback, JobsProjectPipeline
+from jobs_project.sink_writer import SpillSegments
+
+class PostgreSQL:
+    """
+    PostgreSQL connector recording the rows written, failing the description writes with the queued errors.
+    """
+    def __init__(self, *description_errors):
+        self.description_errors = list(description_errors)
+        self.descriptions = []
+        self.rows = []
+        self.deleted = []
+
+    def ensure_connection(self):
+        pass
+
+    def insert_descriptions(self, blobs):
+        if self.description_errors:
+            raise self.description_errors.pop(0)
+        self.descriptions.extend(blob.hash for blob in blobs)
+
+    def insert_jobs_batch(self, field_names, rows):
+        self.rows.extend(rows)
+
+    def delete_jobs(self, jobs):
+        self.deleted.extend(jobs)
+
+class MongoDB:
+    """
+    MongoDB connector recording the documents written, failing the description writes with the queued errors
+    and reporting the given write errors of the documents.
+    """
+    def __init__(self, *description_errors):
+        self.description_errors = list(description_errors)
+        self.write_errors = []
+        self.documents = []
+        self.deleted = []
+
+    def insert_descriptions(self, blobs, ordered=True):
+        if self.description_errors:
+            raise self.description_errors.pop(0)
+        return []
+
+    def insert_many_data(self, documents, ordered=True):
+        self.documents.extend(documents)
+        return self.write_errors
+
+    def delete_jobs(self, jobs):
+        self.deleted.extend(jobs)
+
+class Writer:
+    """
+    Write queue of a sink recording the records submitted to it.
+    """
+    def __init__(self, name):
+        self.name = name
+        self.submitted = []
+
+    def submit(self, records):
+        self.submitted.extend(records)
+
+class FailingDedupIndex(MemoryDedupIndex):
+    """
+    In-process dedup index whose next claim fails after claiming the given number of keys, as a
+    pipelined claim interrupted by a Redis failure.
+    """
+    def __init__(self):
+        super().__init__()
+        self.fail_after = None
+
+    def claim_keys(self, keys, value=1):
+        if self.fail_after is None:
+            return super().claim_keys(keys, value)
+        super().claim_keys(keys[:self.fail_after], value)
+        self.fail_after = None
+        raise ConnectionError('Redis is unavailable')
+
+@pytest.fixture
+def make_pipeline(stats):
+    def make_pipeline(**settings):
+        """
+        Creates a pipeline with the in-process dedup index, as open_spider would without its connections.
+        """
+        settings = Settings(settings)
+        pipeline = JobsProjectPipeline()
+        pipeline.stats = stats
+        pipeline.metrics = PipelineMetrics()
+        pipeline.dedup_index = MemoryDedupIndex()
+        pipeline.description_codec = pipeline.create_description_codec(settings)
+        pipeline.upsert = settings.get('INGEST_MODE', 'insert') == 'upsert'
+        pipeline.failure_mode = pipeline.get_failure_mode(settings)
+        pipeline.rejected_jobs = set()
+        pipeline.writers = []
+        pipeline.bloom = pipeline.claim_buffer = None
+        pipeline.claim_prefix = 'c0ffee00'
+        pipeline.claim_batches = itertools.count()
+        return pipeline
+    return make_pipeline
+
+def job(req_id, **fields):
+    return {'req_id': req_id, 'title': f'Engineer {req_id}', 'description': 'Build pipelines', **fields}
+
+def claimed_record(pipeline, item):
+    """
+    Prepares and claims a job, returning its record and the compressed description to write ahead of it.
+    """
+    record = pipeline.prepare_record(item)
+    assert pipeline.dedup_index.claim_keys([record.key]) == [True]
+    blob = pipeline.compress_description(*record.description) if record.description else None
+    return record, blob
+
+def test_mongo_batch_reports_the_failed_documents(make_pipeline, stats):
+    pipeline = make_pipeline()
+    pipeline.mongo_conn = MongoDB()
+    records = [pipeline.prepare_record(job(req_id)) for req_id in ('R1', 'R2', 'R3')]
+    # Documents already stored (by a replayed batch) are not failures
+    pipeline.mongo_conn.write_errors = [
+        {'index': 0, 'code': DUPLICATE_KEY_ERROR}, {'index': 2, 'code': 2, 'errmsg': 'bad value'}
+    ]
+    assert pipeline.flush_mongo([record.document for record in records]) == ([('R3', records[2].content_hash)], [])
+    assert len(pipeline.mongo_conn.documents) == 3
+    assert stats['jobs/mongo_flushed'] == 3
+
+def test_jobs_of_failed_descriptions_are_released(make_pipeline, stats):
+    pipeline = make_pipeline(DESCRIPTION_STORAGE='compressed')
+    pipeline.pg_conn = PostgreSQL(psycopg2.DataError('value too long'))
+    record, blob = claimed_record(pipeline, job('R1'))
+
+    result = pipeline.flush_postgres([blob, record.row])
+    assert result == ([], [('R1', record.content_hash)])
+    pipeline.handle_write_result('postgres', result)
+    assert pipeline.pg_conn.rows == []
+    assert stats['jobs/released'] == 1
+
+    # The next sighting claims the job again and sends its description again
+    record, blob = claimed_record(pipeline, job('R1'))
+    assert blob is not None
+    assert pipeline.flush_postgres([blob, record.row]) == ([], [])
+    assert pipeline.pg_conn.descriptions == [blob.hash]
+    assert [values[REQ_ID_INDEX] for values in pipeline.pg_conn.rows] == ['R1']
+
+def test_jobs_of_failed_descriptions_are_released_by_mongo(make_pipeline, stats):
+    pipeline = make_pipeline(DESCRIPTION_STORAGE='compressed')
+    pipeline.mongo_conn = MongoDB(ValueError('document too large'))
+    record, blob = claimed_record(pipeline, job('R1'))
+    other, other_blob = claimed_record(pipeline, job('R2', description='Run pipelines'))
+
+    result = pipeline.flush_mongo([blob, other_blob, record.document, other.document])
+    assert result == ([], [('R1', record.content_hash), ('R2', other.content_hash)])
+    pipeline.handle_write_result('mongo', result)
+    assert pipeline.mongo_conn.documents == []
+    assert pipeline.dedup_index.claim_keys([record.key, other.key]) == [True, True]
+
+def test_jobs_sharing_a_stored_description_are_written(make_pipeline):
+    pipeline = make_pipeline(DESCRIPTION_STORAGE='compressed')
+    pipeline.pg_conn = PostgreSQL()
+    record, blob = claimed_record(pipeline, job('R1'))
+    other, other_blob = claimed_record(pipeline, job('R2'))
+    assert other_blob is None
+    assert pipeline.flush_postgres([blob, record.row, other.row]) == ([], [])
+    assert len(pipeline.pg_conn.rows) == 2
+
+@pytest.fixture
+def replaying_pipeline(make_pipeline, tmp_path):
+    """
+    Creates a pipeline whose dedup batches are spilled when their claims fail, recording the records written.
+    """
+    pipeline = make_pipeline()
+    pipeline.dedup_index = FailingDedupIndex()
+    pipeline.dedup_spill = SpillSegments(str(tmp_path), 'dedup')
+    pipeline.dedup_replay_records = 500
+    pipeline.written = []
+    pipeline.write_record = lambda record: pipeline.written.append(record.key.split(':', 1)[1])
+    return pipeline
+
+def test_replay_writes_the_claims_of_its_failed_attempt(replaying_pipeline, stats):
+    pipeline = replaying_pipeline
+    first = [pipeline.prepare_record(job(req_id)) for req_id in ('R1', 'R2', 'R3')]
+    pipeline.dedup_index.fail_after = 2
+    pipeline.flush_dedup(first)
+    assert stats['jobs/dedup_spilled'] == 3
+    assert pipeline.written == []
+
+    # Later batches of the same crawl see the keys the failed attempt claimed as taken
+    pipeline.flush_dedup([pipeline.prepare_record(job(req_id)) for req_id in ('R1', 'R3', 'R4')])
+    assert pipeline.written == ['R3', 'R4']
+    assert stats['jobs/duplicates'] == 1
+
+    pipeline.replay_dedup()
+    assert sorted(pipeline.written) == ['R1', 'R2', 'R3', 'R4']
+    assert stats['jobs/duplicates'] == 2
+    assert stats['jobs/dedup_replayed'] == 3
+    assert not pipeline.dedup_spill
+
+def test_replay_skips_keys_repeated_in_its_batch(replaying_pipeline):
+    pipeline = replaying_pipeline
+    pipeline.dedup_index.fail_after = 1
+    pipeline.flush_dedup([pipeline.prepare_record(job(req_id)) for req_id in ('R1', 'R1', 'R2')])
+    pipeline.replay_dedup()
+    assert pipeline.written == ['R1', 'R2']
+
+def test_claim_tokens_are_short_and_unique_to_the_batch(replaying_pipeline):
+    pipeline = replaying_pipeline
+    tokens = {pipeline.claim_token() for _ in range(1000)}
+    assert len(tokens) == 1000
+    assert max(map(len, tokens)) < 16
+
+    # The claims made outside dedup batches (which are not replayed) store the default value
+    record = pipeline.prepare_record(job('R1'))
+    assert pipeline.claim_records([record]) == [True]
+    assert pipeline.dedup_index.values[record.key] == 1
+
+def test_upsert_writes_new_and_changed_jobs(make_pipeline, stats):
+    pipeline = make_pipeline(INGEST_MODE='upsert')
+    first = pipeline.prepare_record(job('R1'))
+    assert pipeline.prepare_record(job('R1')).content_hash == first.content_hash
+    changed = pipeline.prepare_record(job('R1', title='Senior Engineer'))
+    assert changed.content_hash != first.content_hash
+
+    assert pipeline.claim_records([first]) == [True]
+    assert pipeline.claim_records([pipeline.prepare_record(job('R1'))]) == [False]
+    assert pipeline.claim_records([changed, pipeline.prepare_record(job('R2'))]) == [True, True]
+    assert pipeline.dedup_index.values[changed.key] == changed.content_hash
+
+def test_upsert_query_updates_changed_and_newer_rows_only():
+    query = build_upsert_query('req_id, title, update_date, content_hash', '%s')
+    assert query.startswith('INSERT INTO raw_table (req_id, title, update_date, content_hash) VALUES %s ')
+    assert 'ON CONFLICT (req_id) DO UPDATE SET title = EXCLUDED.title, update_date = EXCLUDED.update_date, ' \
+        'content_hash = EXCLUDED.content_hash ' in query
+    assert 'raw_table.content_hash IS DISTINCT FROM EXCLUDED.content_hash' in query
+    assert 'EXCLUDED.update_date >= raw_table.update_date' in query
+
+def test_records_keep_structured_values(make_pipeline):
+    pipeline = make_pipeline()
+    record = pipeline.prepare_record(job('R1', tags=['python', 'sql'], meta_data={'source': 'feed'}))
+    field_names, values = record.row
+    row = dict(zip((name.strip() for name in field_names.split(',')), values))
+    assert row['tags'] == ['python', 'sql']
+    assert row['meta_data'] == {'source': 'feed'}
+    assert row['categories'] == []
+    assert record.document['tags'] == ['python', 'sql']
+
+def test_all_or_nothing_rolls_back_the_other_databases(make_pipeline, stats):
+    pipeline = make_pipeline(WRITE_FAILURE_MODE='all_or_nothing')
+    pipeline.writers = [Writer('postgres'), Writer('mongo'), Writer('jsonl')]
+    record, _ = claimed_record(pipeline, job('R1'))
+    other, _ = claimed_record(pipeline, job('R2'))
+    failed = [('R1', record.content_hash)]
+
+    pipeline.handle_failed_jobs('postgres', failed)
+    # The file sink is append-only and the failing database has nothing to undo
+    assert [writer.submitted for writer in pipeline.writers] == [[], [JobRollback(failed)], []]
+    assert pipeline.rejected_jobs == set(failed)
+    assert pipeline.dedup_index.claim_keys([record.key, other.key]) == [True, False]
+    assert stats['jobs/rolled_back'] == 1
+
+    # The rejected job is skipped if MongoDB has not written it yet, and deleted otherwise
+    pipeline.mongo_conn = MongoDB()
+    assert pipeline.flush_mongo([record.document, other.document, JobRollback(failed)]) == ([], [])
+    assert [document['req_id'] for document in pipeline.mongo_conn.documents] == ['R2']
+    assert pipeline.mongo_conn.deleted == failed
+
+    # Jobs already undone are not handled twice
+    pipeline.handle_failed_jobs('mongo', failed)
+    assert stats['jobs/rolled_back'] == 1
+
+def test_all_or_nothing_skips_rejected_rows(make_pipeline):
+    pipeline = make_pipeline(WRITE_FAILURE_MODE='all_or_nothing')
+    pipeline.pg_conn = PostgreSQL()
+    record = pipeline.prepare_record(job('R1'))
+    other = pipeline.prepare_record(job('R2'))
+    pipeline.rejected_jobs.add(('R1', record.content_hash))
+    assert pipeline.flush_postgres([record.row, other.row, JobRollback([('R1', record.content_hash)])]) == ([], [])
+    assert [values[REQ_ID_INDEX] for values in pipeline.pg_conn.rows] == ['R2']
+    assert pipeline.pg_conn.deleted == [('R1', record.content_hash)]
+
+def test_best_effort_releases_dropped_jobs_only(make_pipeline, stats):
+    pipeline = make_pipeline(WRITE_FAILURE_MODE='best_effort')
+    pipeline.writers = [Writer('postgres'), Writer('mongo')]
+    record, _ = claimed_record(pipeline, job('R1'))
+    other, _ = claimed_record(pipeline, job('R2'))
+
+    pipeline.handle_failed_jobs('postgres', [('R1', record.content_hash)])
+    pipeline.handle_failed_jobs('postgres', [('R2', other.content_hash)], dropped=True)
+    assert [writer.submitted for writer in pipeline.writers] == [[], []]
+    assert pipeline.dedup_index.claim_keys([record.key, other.key]) == [False, True]
+    assert stats['jobs/postgres_failed'] == 2
+    assert stats['jobs/rolled_back'] == 0
@@ -0,0 +1,34 @@
+import pytest
+from psycopg2.extras import Json
+from infra.postgresql_connector import PostgreSQLConnector, adapt_json_values
+
+class QueryRecorder(PostgreSQLConnector):
+    """
+    PostgreSQLConnector recording its queries instead of running them.
+    """
+    def __init__(self):
+        self.queries = []
+
+    def execute_query(self, query, params=None):
+        self.queries.append((query, params))
+        return []
+
+def test_json_columns_are_adapted():
+    values = adapt_json_values('req_id, tags, meta_data, category', ['R1', ['python'], {'a': 1}, None])
+    assert values[0] == 'R1'
+    assert isinstance(values[1], Json) and values[1].adapted == ['python']
+    assert isinstance(values[2], Json) and values[2].adapted == {'a': 1}
+    assert values[3] is None
+    # Plain strings are stored as JSON strings
+    assert adapt_json_values('tags', ['python'])[0].adapted == 'python'
+
+def test_containment_query_uses_the_jsonb_operators():
+    pg_conn = QueryRecorder()
+    pg_conn.find_jobs_containing({'tags': ['python'], 'categories': [{'name': 'Engineering'}]}, limit=10)
+    (query, params), = pg_conn.queries
+    assert query == 'SELECT * FROM raw_table WHERE tags @> %s AND categories @> %s LIMIT %s'
+    assert [param.adapted for param in params[:2]] == [['python'], [{'name': 'Engineering'}]]
+    assert params[2] == 10
+
+    with pytest.raises(ValueError):
+        pg_conn.find_jobs_containing({'title': 'Engineer'})
@@ -0,0 +1,89 @@
+import time
+from types import SimpleNamespace
+import pytest
+from infra import redis_dedup_index
+from infra.redis_dedup_index import BucketedHashIndex, pack_value, unpack_value
+
+RETENTION = 1000
+# Generations in the future, so that the keys do not expire in the fake server's real time
+START = (int(time.time()) // RETENTION + 10) * RETENTION
+HASH = '0123456789abcdef0123456789abcdef'
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = SimpleNamespace(now=START)
+    monkeypatch.setattr(redis_dedup_index, 'time', SimpleNamespace(time=lambda: clock.now))
+    return clock
+
+def test_pack_value_round_trip():
+    assert pack_value(HASH) == bytes.fromhex(HASH)
+    assert unpack_value(pack_value(HASH)) == HASH
+    assert unpack_value(pack_value(1)) == '1'
+    assert unpack_value(pack_value('token')) == 'token'
+    assert unpack_value(None) is None
+
+def test_claim_keys(rd_conn):
+    index = BucketedHashIndex(rd_conn, num_buckets=4)
+    assert index.claim_keys(['a', 'b', 'a']) == [True, True, False]
+    assert index.claim_keys(['b', 'c']) == [False, True]
+
+def test_swap_keys(rd_conn):
+    index = BucketedHashIndex(rd_conn, num_buckets=4)
+    assert index.swap_keys(['a', 'b'], [HASH, 'x']) == [None, None]
+    assert index.swap_keys(['a', 'b'], ['y', 'z']) == [HASH, 'x']
+
+def test_release_keys(rd_conn):
+    index = BucketedHashIndex(rd_conn, num_buckets=4)
+    index.claim_keys(['a', 'b'])
+    index.release_keys(['a'])
+    assert index.claim_keys(['a', 'b']) == [True, False]
+
+def test_claim_keeps_the_value_of_the_previous_generation(rd_conn, clock):
+    index = BucketedHashIndex(rd_conn, num_buckets=4, retention=RETENTION)
+    assert index.claim_keys(['a'], 'first') == [True]
+    clock.now += RETENTION
+    assert index.claim_keys(['a'], 'second') == [False]
+    # The key was copied to the current generation with its value
+    assert index.swap_keys(['a'], ['third']) == ['first']
+
+def test_seen_keys_are_retained(rd_conn, clock):
+    index = BucketedHashIndex(rd_conn, num_buckets=4, retention=RETENTION)
+    index.claim_keys(['a', 'b'])
+    for _ in range(3):
+        clock.now += RETENTION
+        assert index.claim_keys(['a']) == [False]
+    # b was not seen for more than a generation, a keeps being copied forward
+    assert index.claim_keys(['a', 'b']) == [False, True]
+
+def test_keys_are_forgotten_after_two_generations(rd_conn, clock):
+    index = BucketedHashIndex(rd_conn, num_buckets=4, retention=RETENTION)
+    index.claim_keys(['a'])
+    clock.now += RETENTION - 1
+    index.swap_keys(['b'], [HASH])
+    # Still in the previous generation
+    clock.now += RETENTION
+    assert index.swap_keys(['b'], [HASH]) == [HASH]
+    clock.now += 2 * RETENTION
+    assert index.claim_keys(['a', 'b']) == [True, True]
+
+def test_generations_expire(rd_conn, clock):
+    index = BucketedHashIndex(rd_conn, num_buckets=1, retention=RETENTION)
+    index.claim_keys(['a'])
+    generation = START // RETENTION
+    key = f'dedup:{{0}}:{generation}'
+    assert rd_conn.conn.expiretime(key) == (generation + 2) * RETENTION
+
+def test_release_keys_forgets_every_generation(rd_conn, clock):
+    index = BucketedHashIndex(rd_conn, num_buckets=4, retention=RETENTION)
+    index.claim_keys(['a'])
+    clock.now += RETENTION
+    index.set_keys([('b', '1')])
+    index.release_keys(['a', 'b'])
+    assert index.claim_keys(['a', 'b']) == [True, True]
+
+def test_scan_members(rd_conn, clock):
+    index = BucketedHashIndex(rd_conn, num_buckets=4, retention=RETENTION)
+    index.claim_keys(['a', 'b'])
+    clock.now += RETENTION
+    index.claim_keys(['c'])
+    assert set(index.scan_members()) == {index.member(key) for key in 'abc'}
@@ -0,0 +1,174 @@
+import os
+import struct
+from types import SimpleNamespace
+import pytest
+from twisted.internet import defer
+from jobs_project import sink_writer
+from jobs_project.sink_writer import SinkWriter, SpillSegments
+
+def replay_all(spill, max_records=1000):
+    records = []
+    while spill:
+        records_read, path, offset = spill.read(max_records)
+        records.extend(records_read)
+        spill.commit(path, offset)
+    return records
+
+def test_spill_round_trip(tmp_path):
+    spill = SpillSegments(str(tmp_path), 'sink')
+    assert not spill
+    spill.append([1, 2])
+    spill.append([{'req_id': 3}])
+    assert spill
+    assert replay_all(spill) == [1, 2, {'req_id': 3}]
+    assert not spill
+    assert os.listdir(tmp_path) == []
+
+def test_spill_replays_oldest_segment_first(tmp_path):
+    spill = SpillSegments(str(tmp_path), 'sink', segment_bytes=1)
+    for batch in range(5):
+        spill.append([batch])
+    assert len(spill.sealed) == 5
+    assert replay_all(spill, max_records=1) == [0, 1, 2, 3, 4]
+
+def test_spill_reads_whole_batches(tmp_path):
+    spill = SpillSegments(str(tmp_path), 'sink')
+    spill.append([1, 2])
+    spill.append([3, 4])
+    records, path, offset = spill.read(1)
+    assert records == [1, 2]
+    spill.commit(path, offset)
+    assert os.path.exists(path + '.offset')
+    assert replay_all(spill) == [3, 4]
+
+def test_spill_resumes_after_crash(tmp_path):
+    spill = SpillSegments(str(tmp_path), 'sink')
+    spill.append([1])
+    spill.append([2])
+    records, path, offset = spill.read(1)
+    spill.commit(path, offset)
+    spill.append([3])
+    # Crash: the next run reopens the segments, the committed batch is not replayed again
+    reopened = SpillSegments(str(tmp_path), 'sink')
+    assert replay_all(reopened) == [2, 3]
+    reopened.append([4])
+    assert reopened.active_path.endswith('-00000002.seg')
+    assert replay_all(reopened) == [4]
+
+def test_spill_skips_frame_cut_short(tmp_path):
+    spill = SpillSegments(str(tmp_path), 'sink')
+    spill.append([1])
+    spill.active.write(struct.pack('>I', 100) + b'partial')
+    spill.close()
+    reopened = SpillSegments(str(tmp_path), 'sink')
+    assert replay_all(reopened) == [1]
+    assert os.listdir(tmp_path) == []
+
+def test_spill_keeps_prefixes_apart(tmp_path):
+    SpillSegments(str(tmp_path), 'postgres').append([1])
+    SpillSegments(str(tmp_path), 'mongo').append([2])
+    assert replay_all(SpillSegments(str(tmp_path), 'mongo')) == [2]
+    assert replay_all(SpillSegments(str(tmp_path), 'postgres')) == [1]
+
+class Sink:
+    """
+    Sink failing with the queued exceptions before writing.
+    """
+    def __init__(self, *errors):
+        self.errors = list(errors)
+        self.batches = []
+
+    def write(self, batch):
+        if self.errors:
+            raise self.errors.pop(0)
+        self.batches.append(list(batch))
+        return [record for record in batch if record == 'rejected']
+
+@pytest.fixture
+def make_writer(tmp_path, stats, monkeypatch):
+    # The writes run synchronously instead of in the reactor thread pool
+    monkeypatch.setattr(sink_writer, 'threads', SimpleNamespace(deferToThread=defer.maybeDeferred))
+
+    def make_writer(sink, **kwargs):
+        calls = {'written': [], 'failed': []}
+        kwargs.setdefault('retry_interval', 0)
+        writer = SinkWriter(
+            'sink', sink.write, SpillSegments(str(tmp_path), 'sink'), (ConnectionError,), stats,
+            written_callback=calls['written'].append,
+            failed_callback=calls['failed'].append, **kwargs
+        )
+        return writer, calls
+    return make_writer
+
+def test_writer_writes_batches(make_writer):
+    sink = Sink()
+    writer, calls = make_writer(sink)
+    writer.submit([1, 2])
+    writer.submit([3, 'rejected'])
+    assert sink.batches == [[1, 2], [3, 'rejected']]
+    assert calls == {'written': [['rejected']], 'failed': []}
+    assert not writer.in_flight and not writer.spill
+
+def test_writer_spills_and_replays_on_sink_error(make_writer, stats):
+    sink = Sink(ConnectionError('down'))
+    writer, calls = make_writer(sink, retry_interval=60)
+    writer.submit([1, 2])
+    assert not writer.healthy
+    writer.submit([3])
+    assert sink.batches == []
+    assert stats['sink/sink/spilled_batches'] == 2
+    writer.retry_interval = 0
+    writer.check()
+    assert sink.batches == [[1, 2, 3]]
+    assert writer.healthy and not writer.spill
+    assert stats['sink/sink/replayed_chunks'] == 1
+    assert calls['failed'] == []
+
+def test_writer_keeps_failed_replay_spilled(make_writer):
+    sink = Sink(ConnectionError('down'), ConnectionError('still down'))
+    writer, calls = make_writer(sink)
+    writer.submit([1])
+    writer.check()
+    writer.check()
+    assert sink.batches == [[1]]
+    assert not writer.spill
+
+def test_writer_drops_batches_without_retry(make_writer, stats):
+    sink = Sink(ConnectionError('down'))
+    writer, calls = make_writer(sink, retry_failures=False)
+    writer.submit([1, 2])
+    writer.submit([3])
+    assert calls['failed'] == [[1, 2]]
+    assert sink.batches == [[3]]
+    assert stats['sink/sink/failed_records'] == 2
+    assert not writer.spill
+
+def test_writer_drops_batches_failing_with_other_errors(make_writer, stats):
+    sink = Sink(ValueError('bad record'))
+    writer, calls = make_writer(sink)
+    writer.submit([1])
+    assert calls['failed'] == [[1]]
+    assert writer.healthy and not writer.spill
+
+def test_writer_drops_replayed_chunks_failing_with_other_errors(make_writer):
+    sink = Sink(ConnectionError('down'), ValueError('bad record'))
+    writer, calls = make_writer(sink)
+    writer.submit([1])
+    writer.check()
+    assert calls['failed'] == [[1]]
+    assert not writer.spill
+
+def test_writer_applies_backpressure(make_writer):
+    sink = Sink()
+    writer, calls = make_writer(sink, max_pending=1)
+    # Hold the write in flight so that the next batches queue up
+    writer.in_flight = True
+    writer.write_started = float('inf')
+    writer.submit([1])
+    assert writer.saturated()
+    waiting = writer.wait_for_space()
+    assert not waiting.called
+    writer.in_flight = False
+    writer.start_next()
+    assert waiting.called
+    assert sink.batches == [[1]]
@@ -0,0 +1,29 @@
+from datetime import datetime, timedelta, timezone
+import pytest
+from dateutil import parser
+from jobs_project.timestamps import parse_timestamp
+
+@pytest.mark.parametrize('value', [
+    '2024-01-02T03:04:05+0000',
+    '2024-01-02T03:04:05.000Z',
+    '2024-01-02T03:04:05+02:00',
+    '2024-01-02 03:04:05',
+    '2024-01-02',
+])
+def test_iso_timestamps_match_dateutil(value):
+    assert parse_timestamp(value) == parser.parse(value)
+
+def test_odd_formats_fall_back_to_dateutil():
+    assert parse_timestamp('Jan 2, 2024 3:04 PM') == datetime(2024, 1, 2, 15, 4)
+    assert parse_timestamp('2024-01-02T03:04:05 +0200').utcoffset() == timedelta(hours=2)
+
+def test_timestamps_are_memoized():
+    parse_timestamp.cache_clear()
+    first = parse_timestamp('2024-01-02T03:04:05Z')
+    assert parse_timestamp('2024-01-02T03:04:05Z') is first
+    assert first.tzinfo == timezone.utc
+    assert parse_timestamp.cache_info().hits == 1
+
+def test_invalid_timestamps_raise():
+    with pytest.raises(ValueError):
+        parse_timestamp('not a date')